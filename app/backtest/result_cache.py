@@ -0,0 +1,239 @@
+"""回测结果缓存
+
+以 输入行情指纹 + 策略参数指纹 + 引擎版本 为键缓存 `compute_indicators` 与 `generate_signals` 的结果，
+结果以 Parquet 列式存储在 `data/backtest_cache/`，按总大小与存活时间淘汰。
+
+增量续算：结果中逐K线保存行哈希与策略内部状态（检查点）。同一序列（首根K线相同）追加或修订K线后，
+找到首个发生变化的K线 k，复用缓存中 k 之前的信号，从第 k-1 根K线的检查点恢复状态后只对 k 及之后的K线逐根推进。
+指标是因果的（只依赖当前及之前的K线），向量化计算开销很小，仍对整段行情重新计算。
+
+修改信号逻辑或指标口径时需递增 `ENGINE_VERSION`，使旧结果失效。
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.turtle_algo.turtle_strategy import STATE_FIELDS
+from app.utils.metrics import metrics
+
+ENGINE_VERSION = '2'
+META_KEY = b'turtle.backtest'
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+ROW_HASH = '_row_hash'
+STATE_PREFIX = '_state_'
+
+
+def row_hashes(data: pd.DataFrame) -> np.ndarray:
+    """逐行哈希（含索引，仅取价格列）"""
+    columns = [c for c in PRICE_COLUMNS if c in data.columns]
+    return pd.util.hash_pandas_object(data[columns], index=True).to_numpy()
+
+
+def data_fingerprint(data: pd.DataFrame, hashes: Optional[np.ndarray] = None) -> str:
+    """行情指纹（逐行哈希序列的 sha256）"""
+    if hashes is None:
+        hashes = row_hashes(data)
+    return hashlib.sha256(np.ascontiguousarray(hashes).tobytes()).hexdigest()
+
+
+def params_fingerprint(strategy, equity: float) -> str:
+    """策略参数 + 初始状态 + 权益 + 引擎版本的指纹"""
+    payload = json.dumps({'params': strategy.params(), 'state': _normalize(strategy.get_state()), 'equity': equity,
+                          'engine': ENGINE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class BacktestCache:
+    """回测结果缓存
+
+    参数
+    - base_dir: 存储目录（默认项目根下 `data/backtest_cache/`）
+    - max_bytes: 缓存总大小上限，超过时按最近使用时间淘汰
+    - max_age_seconds: 条目最长保留时间（按最近使用时间计）
+    """
+    def __init__(self, base_dir: Optional[Path] = None, max_bytes: int = 512 * 1024 * 1024,
+                 max_age_seconds: int = 30 * 86400):
+        if base_dir is None:
+            base_dir = Path(__file__).resolve().parents[2] / 'data' / 'backtest_cache'
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, params_fp: str, hashes: np.ndarray) -> Path:
+        # 以首根K线的哈希区分序列：同一标的追加K线后仍落在同一文件
+        return self.base_dir / params_fp / f'{int(hashes[0]):016x}.parquet'
+
+    def run(self, strategy, data: pd.DataFrame, equity: float) -> pd.DataFrame:
+        """带缓存地计算指标并生成信号
+
+        参数
+        - strategy: `TurtleStrategy` 实例（会被推进到最后一根K线后的状态）
+        - data: 按日期索引的 OHLC
+        - equity: 账户权益
+
+        返回
+        - DataFrame：与 `generate_signals(compute_indicators(data), equity)` 相同
+        """
+        if data.empty:
+            return strategy.generate_signals(strategy.compute_indicators(data), equity)
+        hashes = row_hashes(data)
+        data_fp = data_fingerprint(data, hashes)
+        params_fp = params_fingerprint(strategy, equity)
+        path = self._path(params_fp, hashes)
+
+        cached, meta = self._load(path)
+        start = 1
+        if cached is not None:
+            if meta.get('data') == data_fp:
+                metrics.incr('backtest_cache_hit')
+                strategy.set_state(_normalize(meta['state']))
+                return self._strip(cached)
+            start = _first_change(cached[ROW_HASH].to_numpy(), hashes)
+            if start >= len(hashes):
+                # 新数据是缓存序列的前缀，结果直接截取
+                metrics.incr('backtest_cache_hit')
+                strategy.set_state(_state_at(cached, len(hashes) - 1))
+                return self._strip(cached.iloc[:len(hashes)])
+
+        df = strategy.compute_indicators(data)
+        if cached is not None and start > 1:
+            metrics.incr('backtest_cache_partial')
+            df['signal'] = None
+            df.iloc[:start, df.columns.get_loc('signal')] = cached['signal'].iloc[:start].to_numpy()
+            df['unit_size'] = np.nan
+            df.iloc[:start, df.columns.get_loc('unit_size')] = cached['unit_size'].iloc[:start].to_numpy()
+            strategy.set_state(_state_at(cached, start - 1))
+            prior = cached[[STATE_PREFIX + name for name in STATE_FIELDS]].iloc[:start]
+            prior.columns = list(STATE_FIELDS)
+        else:
+            metrics.incr('backtest_cache_miss')
+            start = 1
+            # 第 0 根K线不推进状态，记为初始状态
+            prior = pd.DataFrame([_normalize(strategy.get_state())], columns=list(STATE_FIELDS))
+        states = []
+        df = strategy.generate_signals(df, equity, start=start, states=states)
+        state_frame = pd.concat([prior, pd.DataFrame([_normalize(st) for st in states], columns=list(STATE_FIELDS))],
+                                ignore_index=True)
+        try:
+            self._store(path, df, hashes, state_frame, {'data': data_fp, 'engine': ENGINE_VERSION,
+                                                        'params': strategy.params(),
+                                                        'state': _normalize(strategy.get_state())})
+            self.evict()
+        except Exception:
+            metrics.incr('backtest_cache_error')
+        return df
+
+    def _load(self, path: Path) -> Tuple[Optional[pd.DataFrame], dict]:
+        if not path.exists():
+            return None, {}
+        try:
+            table = pq.read_table(path)
+            meta = json.loads((table.schema.metadata or {}).get(META_KEY, b'{}'))
+            if meta.get('engine') != ENGINE_VERSION:
+                return None, {}
+            os.utime(path)
+            return table.to_pandas(), meta
+        except Exception:
+            metrics.incr('backtest_cache_error')
+            return None, {}
+
+    def _store(self, path: Path, df: pd.DataFrame, hashes: np.ndarray, states: pd.DataFrame, meta: dict):
+        """写入结果（逐K线状态列 + 行哈希，元数据嵌入 schema，临时文件 + 重命名）"""
+        out = df.copy()
+        out[ROW_HASH] = hashes
+        for name in STATE_FIELDS:
+            out[STATE_PREFIX + name] = states[name].to_numpy()
+        table = pa.Table.from_pandas(out, preserve_index=True)
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: meta_bytes})
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    @staticmethod
+    def _strip(cached: pd.DataFrame) -> pd.DataFrame:
+        drop = [c for c in cached.columns if c == ROW_HASH or c.startswith(STATE_PREFIX)]
+        return cached.drop(columns=drop)
+
+    def evict(self) -> int:
+        """淘汰过期与超出总大小的条目，返回删除的文件数"""
+        now = time.time()
+        entries = []
+        for path in self.base_dir.glob('*/*.parquet'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            metrics.incr('backtest_cache_evicted', value=removed)
+        return removed
+
+    def clear(self):
+        """删除全部条目"""
+        for path in self.base_dir.glob('*/*.parquet'):
+            path.unlink()
+
+
+def _first_change(cached: np.ndarray, current: np.ndarray) -> int:
+    """首个不同的行位置；完全一致时返回较短序列的长度"""
+    n = min(len(cached), len(current))
+    diff = np.flatnonzero(cached[:n] != current[:n])
+    return int(diff[0]) if len(diff) else n
+
+
+def _normalize(state: dict) -> dict:
+    """转为可 JSON 序列化、可写入 Parquet 的基础类型"""
+    out = {}
+    for name in STATE_FIELDS:
+        value = state[name]
+        if name in ('units', 'position'):
+            out[name] = int(value)
+        elif name == 'last_trade_win':
+            out[name] = bool(value)
+        else:
+            out[name] = float(value)
+    return out
+
+
+def _state_at(cached: pd.DataFrame, i: int) -> dict:
+    """第 i 根K线处理后的策略状态"""
+    row = cached.iloc[i]
+    return _normalize({name: row[STATE_PREFIX + name] for name in STATE_FIELDS})
+
+
+_cache: Optional[BacktestCache] = None
+
+
+def run_cached(strategy, data: pd.DataFrame, equity: float) -> pd.DataFrame:
+    """使用默认目录的共享缓存运行（见 `BacktestCache.run`）"""
+    global _cache
+    if _cache is None:
+        _cache = BacktestCache()
+    return _cache.run(strategy, data, equity)
@@ -0,0 +1,418 @@
+"""稳健性分析：滚动前推（walk-forward）与蒙特卡洛
+
+- 滚动前推：将每个标的的行情切分为 训练段+检验段 的滚动窗口，对参数网格中的每组参数在整段上运行一次策略，
+  按开仓时间把交易划入样本内/样本外（段末仍持有的仓位按该段最后一根K线的收盘价估值计入，两段口径一致）；
+  每个窗口选样本内得分最高的参数，报告其样本外表现。
+- 蒙特卡洛：对交易收益序列做有放回重抽样（或随机重排），得到最大回撤与最终收益的分布。
+
+两类分析都拆成大量独立任务在进程池中执行：
+- 行情数据发布到共享内存（`app.data.shared_panel`），进程池初始化时只传递句柄，各进程以只读视图访问；任务只携带标的与行号区间
+- 每个完成的任务立即追加到 JSONL 结果文件，中断后以同一文件重新运行会跳过已完成的任务
+- 运行结束报告任务吞吐（tasks/sec）与K线吞吐（bars/sec）
+
+用法
+- `python -m app.backtest.robustness walk-forward --symbols 113001 123001 --train 250 --test 60 --grid "mode=Mode 2" entry_length_mode2=20,55 exit_length_mode2=10,20 --out data/robustness/wf.jsonl`
+- `python -m app.backtest.robustness monte-carlo --symbols 113001 --sims 100000 --out data/robustness/mc.jsonl`
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+DEFAULT_OUT_DIR = Path(__file__).resolve().parents[2] / 'data' / 'robustness'
+
+OPEN_SIGNALS = {'long': 1, 'short': -1}
+ADD_SIGNALS = {'add_long', 'add_short'}
+CLOSE_SIGNALS = {'exit', 'stop_long', 'stop_short'}
+
+
+def extract_trades(signals: pd.DataFrame, close_open: bool = True) -> pd.DataFrame:
+    """从 `generate_signals` 的结果中提取交易（以信号K线收盘价成交）
+
+    参数
+    - signals: `generate_signals` 的结果（或其前若干行）
+    - close_open: 末尾未平仓的持仓是否按最后一根K线的收盘价平仓计入（否则不计入）
+
+    返回
+    - DataFrame：`entry_date, exit_date, direction, units, entry_price（均价）, exit_price, return, open`；
+      `open` 为 True 的交易是末尾按收盘价估值的未平仓持仓
+    """
+    columns = ['entry_date', 'exit_date', 'direction', 'units', 'entry_price', 'exit_price', 'return', 'open']
+    if 'signal' not in signals or signals.empty:
+        return pd.DataFrame(columns=columns)
+    marked = signals['signal'].notna().to_numpy()
+    sig = signals['signal'].to_numpy()[marked]
+    close = signals['close'].to_numpy()[marked]
+    dates = signals.index[marked]
+    trades = []
+    direction = 0
+    for s, price, date in zip(sig, close, dates):
+        if s in OPEN_SIGNALS and direction == 0:
+            direction, units, avg, entry_date = OPEN_SIGNALS[s], 1, price, date
+        elif s in ADD_SIGNALS and direction != 0:
+            units += 1
+            avg = (avg * (units - 1) + price) / units
+        elif s in CLOSE_SIGNALS and direction != 0:
+            trades.append((entry_date, date, direction, units, avg, price, direction * (price / avg - 1), False))
+            direction = 0
+    if direction != 0 and close_open:
+        price, date = float(signals['close'].iloc[-1]), signals.index[-1]
+        trades.append((entry_date, date, direction, units, avg, price, direction * (price / avg - 1), True))
+    return pd.DataFrame(trades, columns=columns)
+
+
+def summarize(returns: Sequence[float]) -> Dict:
+    """交易收益序列的摘要：笔数、复利总收益、胜率、按交易序列计的最大回撤"""
+    r = np.asarray(returns, dtype=np.float64)
+    if len(r) == 0:
+        return {'trades': 0, 'total_return': 0.0, 'win_rate': 0.0, 'max_drawdown': 0.0}
+    equity = np.cumprod(1 + r)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    return {
+        'trades': int(len(r)),
+        'total_return': float(equity[-1] - 1),
+        'win_rate': float((r > 0).mean()),
+        'max_drawdown': float((1 - equity / peak).max()),
+    }
+
+
+def param_grid(**values: Iterable) -> List[Dict]:
+    """参数网格：`param_grid(entry_length=[20, 55], exit_length=[10, 20])` -> 4 组参数"""
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(list(v) for v in values.values()))]
+
+
+def walk_forward_windows(n_bars: int, train: int, test: int, step: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """滚动窗口 (起始行, 检验段起始行, 结束行)，步长默认等于检验段长度"""
+    step = step or test
+    return [(lo, lo + train, lo + train + test) for lo in range(0, n_bars - train - test + 1, step)]
+
+
+class RobustnessRun:
+    """一次分析的运行结果
+
+    属性
+    - records: 全部任务结果（含此前运行已写入结果文件的部分），按任务顺序排列
+    - completed: 本次执行的任务数
+    - resumed: 从结果文件恢复（跳过）的任务数
+    - elapsed: 本次墙钟耗时（秒）
+    - bars: 本次处理的K线数（蒙特卡洛为模拟的交易数）
+    """
+    def __init__(self):
+        self.records: List[Dict] = []
+        self.completed = 0
+        self.resumed = 0
+        self.elapsed = 0.0
+        self.bars = 0
+
+    @property
+    def tasks_per_sec(self) -> float:
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def bars_per_sec(self) -> float:
+        return self.bars / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        """返回可 JSON 序列化的运行摘要"""
+        return {
+            'tasks': len(self.records), 'completed': self.completed, 'resumed': self.resumed,
+            'elapsed': round(self.elapsed, 3), 'tasks_per_sec': round(self.tasks_per_sec, 1),
+            'bars_per_sec': round(self.bars_per_sec, 1),
+        }
+
+
+# 工作进程内的只读共享数据（由进程池初始化函数设置）
+_SHARED: Dict = {}
+
+
+def _init_worker(shared: Dict):
+    global _SHARED
+    from app.data.shared_panel import PanelHandle, SharedPanel
+    # 共享内存面板只传句柄，工作进程连接后得到只读视图
+    _SHARED = {k: SharedPanel.attach(v) if isinstance(v, PanelHandle) else v for k, v in shared.items()}
+
+
+def _read_records(path: Path, config: Dict) -> Dict[str, Dict]:
+    """读取已有结果；配置不一致时报错，避免把不同分析的结果混在一起"""
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下半行
+                continue
+            if i == 0 and record.get('type') == 'header':
+                if record['config'] != config:
+                    raise ValueError(f"{path} was written by a different analysis configuration")
+                continue
+            done[record['id']] = record
+    return done
+
+
+def _run_tasks(tasks: List[Tuple[str, tuple]], func: Callable, shared: Dict, out: Path, config: Dict,
+               workers: Optional[int], log) -> RobustnessRun:
+    """在进程池中执行任务并逐条追加写入结果文件（支持断点续跑）"""
+    run = RobustnessRun()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    done = _read_records(out, config)
+    pending = [(tid, args) for tid, args in tasks if tid not in done]
+    run.resumed = len(tasks) - len(pending)
+    run.records = [done[tid] for tid, _ in tasks if tid in done]
+    if run.resumed:
+        log.info(f'resuming {out}: {run.resumed}/{len(tasks)} tasks already done')
+    t0 = time.perf_counter()
+    with open(out, 'a', encoding='utf-8') as f:
+        if f.tell() == 0:
+            f.write(json.dumps({'type': 'header', 'config': config}, ensure_ascii=False) + '\n')
+        elif not out.read_bytes().endswith(b'\n'):
+            # 上次中断留下的半行单独成行，不与新结果拼接
+            f.write('\n')
+
+        def record(tid: str, result: Dict):
+            result['id'] = tid
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+            f.flush()
+            run.records.append(result)
+            run.completed += 1
+            run.bars += result.get('bars', 0)
+            metrics.incr('robustness_tasks')
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            _init_worker(shared)
+            for tid, args in pending:
+                record(tid, func(*args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+                queue = iter(pending)
+                inflight = {}
+                # 限制在途任务数，避免一次性提交数万个 future
+                for tid, args in itertools.islice(queue, workers * 4):
+                    inflight[pool.submit(func, *args)] = tid
+                while inflight:
+                    finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        record(inflight.pop(fut), fut.result())
+                        for tid, args in itertools.islice(queue, 1):
+                            inflight[pool.submit(func, *args)] = tid
+    run.elapsed = time.perf_counter() - t0
+    # 按任务顺序排列，汇总结果与完成顺序、进程数无关
+    by_id = {r['id']: r for r in run.records}
+    run.records = [by_id[tid] for tid, _ in tasks if tid in by_id]
+    log.info(f'{run.completed} tasks in {run.elapsed:.2f}s: {run.tasks_per_sec:,.1f} tasks/sec, '
+             f'{run.bars_per_sec:,.0f} bars/sec')
+    return run
+
+
+def _data_fingerprint(df: pd.DataFrame) -> Dict:
+    """行情指纹（首末日期、行数与 OHLC 哈希），行情更新后续跑不会复用旧结果"""
+    columns = [c for c in ('open', 'high', 'low', 'close') if c in df]
+    values = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64))
+    digest = hashlib.sha256(pd.DatetimeIndex(df.index).asi8.tobytes() + values.tobytes()).hexdigest()[:16]
+    return {'first': str(df.index[0]) if len(df) else None, 'last': str(df.index[-1]) if len(df) else None,
+            'rows': int(len(df)), 'ohlc': digest}
+
+
+def _config_id(config: Dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def _wf_task(symbol: str, lo: int, mid: int, hi: int, params: Dict, equity: float) -> Dict:
+    from app.turtle_algo.turtle_strategy import TurtleStrategy
+    data = _SHARED['prices'][symbol].iloc[lo:hi]
+    strategy = TurtleStrategy(**params)
+    signals = strategy.generate_signals(strategy.compute_indicators(data), equity)
+    split = data.index[mid - lo]
+    # 两段同一口径：段末仍未平仓的持仓按该段最后一根K线的收盘价平仓计入，
+    # 样本内开仓、跨过分界的持仓只计到样本内末根K线
+    is_trades = extract_trades(signals.iloc[:mid - lo])
+    trades = extract_trades(signals)
+    oos_trades = trades[trades['entry_date'] >= split]
+    return {
+        'symbol': symbol, 'window': [lo, mid, hi], 'params': params, 'bars': hi - lo,
+        'is': summarize(is_trades['return']),
+        'oos': summarize(oos_trades['return']),
+        'oos_returns': oos_trades['return'].tolist(),
+    }
+
+
+def walk_forward(prices: Dict[str, pd.DataFrame], grid: List[Dict], train: int = 250, test: int = 60,
+                 step: Optional[int] = None, equity: float = 10000.0, out: Optional[Path] = None,
+                 workers: Optional[int] = None) -> RobustnessRun:
+    """滚动前推分析
+
+    参数
+    - prices: 代码 -> 按日期索引的 OHLC
+    - grid: 参数组列表（`TurtleStrategy` 关键字参数，见 `param_grid`）
+    - train/test/step: 训练段、检验段与滚动步长（K线数）
+    - equity: 账户权益
+    - out: JSONL 结果文件（默认 `data/robustness/wf_<配置指纹>.jsonl`），已存在时续跑；
+      配置含各标的的行情指纹，行情变化后默认文件名随之改变，指定的文件则因配置不一致报错
+    - workers: 进程数，默认 CPU 数；1 表示在当前进程执行
+
+    返回
+    - RobustnessRun：`records` 每条对应一个 (标的, 窗口, 参数) 任务；用 `select_walk_forward` 汇总
+    """
+    config = {'analysis': 'walk_forward', 'symbols': sorted(prices), 'grid': grid, 'train': train, 'test': test,
+              'step': step or test, 'equity': equity, 'open_positions': 'mark_to_market',
+              'data': {s: _data_fingerprint(prices[s]) for s in sorted(prices)}}
+    out = Path(out) if out else DEFAULT_OUT_DIR / f'wf_{_config_id(config)}.jsonl'
+    tasks = []
+    for symbol in sorted(prices):
+        for lo, mid, hi in walk_forward_windows(len(prices[symbol]), train, test, step):
+            for i, params in enumerate(grid):
+                tasks.append((f'{symbol}|{lo}|{i}', (symbol, lo, mid, hi, params, equity)))
+    if (workers or os.cpu_count() or 1) == 1:
+        return _run_tasks(tasks, _wf_task, {'prices': prices}, out, config, workers, get_logger('robustness'))
+    from app.data.shared_panel import SharedPanel
+    with SharedPanel.create(prices) as panel:
+        return _run_tasks(tasks, _wf_task, {'prices': panel.handle}, out, config, workers, get_logger('robustness'))
+
+
+def select_walk_forward(records: List[Dict], objective: str = 'total_return') -> pd.DataFrame:
+    """每个 (标的, 窗口) 选样本内 `objective` 最高的参数，返回其样本内与样本外表现
+
+    返回
+    - DataFrame：`symbol, window_start, params, is_<指标>, oos_<指标>`，按标的与窗口排序
+    """
+    best: Dict[Tuple[str, int], Dict] = {}
+    for r in records:
+        key = (r['symbol'], r['window'][0])
+        if key not in best or r['is'][objective] > best[key]['is'][objective]:
+            best[key] = r
+    rows = []
+    for (symbol, start), r in sorted(best.items()):
+        row = {'symbol': symbol, 'window_start': start, 'params': json.dumps(r['params'], sort_keys=True)}
+        row.update({f'is_{k}': v for k, v in r['is'].items()})
+        row.update({f'oos_{k}': v for k, v in r['oos'].items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _mc_task(chunk: int, n_sims: int, seed: int, method: str) -> Dict:
+    returns = _SHARED['returns']
+    rng = np.random.default_rng([seed, chunk])
+    n = len(returns)
+    if method == 'bootstrap':
+        sims = returns[rng.integers(0, n, size=(n_sims, n))]
+    else:
+        sims = rng.permuted(np.broadcast_to(returns, (n_sims, n)), axis=1)
+    equity = np.cumprod(1 + sims, axis=1)
+    peak = np.maximum.accumulate(np.concatenate([np.ones((n_sims, 1)), equity], axis=1), axis=1)[:, 1:]
+    return {
+        'chunk': chunk, 'bars': n_sims * n,
+        'max_drawdown': np.round((1 - equity / peak).max(axis=1), 6).tolist(),
+        'final_return': np.round(equity[:, -1] - 1, 6).tolist(),
+    }
+
+
+def monte_carlo(returns: Sequence[float], n_sims: int = 10000, chunk_size: int = 1000, method: str = 'bootstrap',
+                seed: int = 0, out: Optional[Path] = None, workers: Optional[int] = None) -> RobustnessRun:
+    """交易序列蒙特卡洛
+
+    参数
+    - returns: 单笔交易收益序列（如 `extract_trades(...)['return']` 或滚动前推的样本外收益）
+    - n_sims: 模拟次数
+    - chunk_size: 每个任务的模拟次数
+    - method: 'bootstrap'（有放回抽样）或 'shuffle'（随机重排，最终收益不变，仅回撤路径不同）
+    - seed: 随机种子（各块由 (seed, 块号) 派生，结果与进程数无关）
+    - out/workers: 同 `walk_forward`
+
+    返回
+    - RobustnessRun：`records` 每条为一块模拟的最大回撤与最终收益；用 `mc_quantiles` 汇总
+    """
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        raise ValueError("Monte Carlo needs at least one trade return")
+    config = {'analysis': 'monte_carlo', 'returns': hashlib.sha256(returns.tobytes()).hexdigest()[:16],
+              'trades': int(len(returns)), 'n_sims': n_sims, 'chunk_size': chunk_size, 'method': method, 'seed': seed}
+    out = Path(out) if out else DEFAULT_OUT_DIR / f'mc_{_config_id(config)}.jsonl'
+    tasks = [(f'mc|{i}', (i, min(chunk_size, n_sims - start), seed, method))
+             for i, start in enumerate(range(0, n_sims, chunk_size))]
+    return _run_tasks(tasks, _mc_task, {'returns': returns}, out, config, workers, get_logger('robustness'))
+
+
+def mc_quantiles(records: List[Dict], quantiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+    """蒙特卡洛结果的分位数（行：分位，列：max_drawdown / final_return）"""
+    dd = np.concatenate([r['max_drawdown'] for r in records]) if records else np.array([])
+    fr = np.concatenate([r['final_return'] for r in records]) if records else np.array([])
+    if len(dd) == 0:
+        return pd.DataFrame(columns=['max_drawdown', 'final_return'])
+    return pd.DataFrame({'max_drawdown': np.quantile(dd, quantiles), 'final_return': np.quantile(fr, quantiles)},
+                        index=pd.Index(quantiles, name='quantile'))
+
+
+def _parse_grid(items: List[str]) -> List[Dict]:
+    values = {}
+    for item in items:
+        name, _, raw = item.partition('=')
+        values[name] = [v if name == 'mode' else (float(v) if '.' in v else int(v)) for v in raw.split(',')]
+    return param_grid(**values)
+
+
+def _load_prices(symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    from app.bond.bond_data import BondData
+    bond = BondData()
+    start = (pd.Timestamp.now() - pd.Timedelta(days=365 * 5)).strftime('%Y-%m-%d')
+    prices = {s: bond.fetch_bond_data(s, start_date=start, save_csv=False) for s in symbols}
+    return {s: df for s, df in prices.items() if not df.empty}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward and Monte Carlo robustness analysis")
+    parser.add_argument("analysis", choices=["walk-forward", "monte-carlo"], help="分析类型")
+    parser.add_argument("--symbols", nargs="+", required=True, help="可转债代码")
+    # Mode 1 在首笔盈利交易之前不会开仓，默认网格使用 Mode 2 及其进出场长度
+    parser.add_argument("--grid", nargs="*", default=["mode=Mode 2", "entry_length_mode2=20,55", "exit_length_mode2=10,20"],
+                        help="参数网格，如 entry_length_mode2=20,55（蒙特卡洛使用第一组参数）")
+    parser.add_argument("--train", type=int, default=250, help="训练段K线数")
+    parser.add_argument("--test", type=int, default=60, help="检验段K线数")
+    parser.add_argument("--sims", type=int, default=10000, help="蒙特卡洛模拟次数")
+    parser.add_argument("--method", choices=["bootstrap", "shuffle"], default="bootstrap", help="重抽样方式")
+    parser.add_argument("--equity", type=float, default=10000.0, help="初始权益")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    parser.add_argument("--out", type=str, default=None, help="JSONL 结果文件（已存在时续跑）")
+    args = parser.parse_args()
+
+    prices = _load_prices(args.symbols)
+    if not prices:
+        print("无法获取数据")
+        return
+    if args.analysis == 'walk-forward':
+        run = walk_forward(prices, _parse_grid(args.grid), args.train, args.test, equity=args.equity,
+                           out=args.out, workers=args.workers)
+        print(select_walk_forward(run.records).to_string(index=False))
+    else:
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        params = _parse_grid(args.grid)[0]
+        print(f"参数：{json.dumps(params, ensure_ascii=False, sort_keys=True)}")
+        returns = []
+        for df in prices.values():
+            strategy = TurtleStrategy(**params)
+            returns.extend(extract_trades(strategy.generate_signals(strategy.compute_indicators(df), args.equity))['return'])
+        if not returns:
+            print("没有交易")
+            return
+        run = monte_carlo(returns, args.sims, method=args.method, out=args.out, workers=args.workers)
+        print(mc_quantiles(run.records).to_string())
+    print(json.dumps(run.summary(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 """可转债数据处理
 
 基于 AKShare 获取与处理沪深可转债相关数据，提供列表与单券历史行情拉取，并支持本地 CSV 缓存。
+代码的交易所前缀与上市状态来自代码主表（`app/bond/reference.py`），未上市或已退市的代码不发起请求。
+akshare 调用经 `app.data.provider`（可录制到本地归档并离线回放），akshare 导入开销较大，仅在真正发起请求时导入。
 """
 
-import akshare as ak
 import pandas as pd
 from pathlib import Path
 import os
 from datetime import datetime, timedelta
+from app.bond.reference import SymbolMaster, get_master
+from app.utils.metrics import metrics
 
 class BondData:
     """可转债数据处理类
@@ -15,37 +18,44 @@ class BondData:
     使用 AKShare 接口获取可转债列表与历史行情，并提供 CSV 持久化选项。
     """
 
-    def __init__(self, data_dir: str = None):
+    def __init__(self, data_dir: str = None, reference: SymbolMaster = None):
         """初始化
 
         参数
         - data_dir: 数据存储根目录（默认 `data/bond/`）
+        - reference: 代码主表（默认进程内共享实例）
         """
         if data_dir is None:
             data_dir = Path(__file__).parent.parent.parent / 'data' / 'bond'
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.reference = reference if reference is not None else get_master()
 
-    def get_all_bonds(self, save_path: str = None) -> pd.DataFrame:
-        """获取所有可转债列表
+    @metrics.timed('bond_list_fetch')
+    def get_all_bonds(self, save_path: str = None, refresh: bool = False) -> pd.DataFrame:
+        """获取所有已上市可转债列表
+
+        列表来自代码主表，仅在主表过期（下一个收盘后）或 `refresh=True` 时重新拉取。
 
         参数
         - save_path: 可选 CSV 保存路径
+        - refresh: 是否强制刷新主表
 
         返回
         - DataFrame：基础信息字段包含 `bond_id, bond_name, listing_date, issue_size, credit_rating`
         """
         try:
-            bond_df = ak.bond_zh_cov()
-            bond_df = bond_df[['债券代码', '债券简称', '上市时间', '发行规模', '信用评级']]
-            bond_df = bond_df.rename(columns={
-                '债券代码': 'bond_id',
-                '债券简称': 'bond_name',
-                '上市时间': 'listing_date',
-                '发行规模': 'issue_size',
-                '信用评级': 'credit_rating'
+            if refresh:
+                self.reference.refresh()
+            else:
+                self.reference.ensure_fresh()
+            bond_df = self.reference.to_frame()
+            if bond_df.empty:
+                return pd.DataFrame()
+            bond_df = bond_df[['symbol', 'name', 'listing_date', 'issue_size', 'credit_rating']].rename(columns={
+                'symbol': 'bond_id',
+                'name': 'bond_name',
             })
-            bond_df = bond_df[bond_df['listing_date'].notna() & (bond_df['listing_date'] != '')]
 
             if save_path:
                 save_dir = os.path.dirname(save_path)
@@ -58,31 +68,32 @@ class BondData:
             print(f"Error getting bonds: {str(e)}")
             return pd.DataFrame()
 
+    @metrics.timed('bond_fetch')
     def fetch_bond_data(self, symbol: str, start_date: str = None, end_date: str = None, save_csv: bool = True) -> pd.DataFrame:
         """获取单券历史行情（日频）
 
         参数
-        - symbol: 债券代码（11* 为上交所，12* 为深交所）
+        - symbol: 债券代码（交易所按代码主表确定，主表中没有时 11* 为上交所，12* 为深交所）
         - start_date: 起始日期（YYYY-MM-DD，默认近 180 天）
         - end_date: 结束日期（YYYY-MM-DD，默认当天）
         - save_csv: 是否保存到 CSV（`data/bond/csv/`）
 
         返回
-        - DataFrame：按日期索引的 OHLC 数据
+        - DataFrame：按日期索引的 OHLC 数据；区间内未上市或已退市时为空（不发起请求）
         """
         if start_date is None:
             start_date = (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
         if end_date is None:
             end_date = datetime.now().strftime('%Y-%m-%d')
 
+        if self.reference.is_listed(symbol, start_date, end_date) is False:
+            metrics.incr('bond_reference_skipped')
+            return pd.DataFrame()
+
         try:
-            if symbol.startswith('11'):
-                symbol_prefixed = f"sh{symbol}"
-            elif symbol.startswith('12'):
-                symbol_prefixed = f"sz{symbol}"
-            else:
-                raise ValueError(f"Unsupported bond code: {symbol}")
+            symbol_prefixed = self.reference.prefixed(symbol)
 
+            from app.data.provider import ak
             df = ak.bond_zh_hs_cov_daily(symbol=symbol_prefixed)
             if df.empty:
                 return pd.DataFrame()
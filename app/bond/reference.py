@@ -0,0 +1,281 @@
+"""可转债参考数据（代码主表）
+
+将沪深可转债的 代码 -> 交易所、简称、上市/退市日期、发行规模、信用评级、正股代码 常驻内存（字典，O(1) 查找），
+持久化为 `data/bond/reference.parquet`，供行情拉取与批量任务在发起请求前完成代码前缀判断与上市状态过滤。
+
+增量刷新：按交易日历的日频口径判断过期（下一个收盘后才需要刷新），刷新时拉取一次 `bond_zh_cov` 并与已有记录合并——
+新出现的代码加入，上市日期、规模、评级等变化的字段更新，上游列表中消失的已上市代码保留并记为退市（退市日期取首次缺失的日期），
+只有内容发生变化时才重写文件。刷新失败时保留已有记录并计数 `bond_reference_error`。
+
+主表中没有的代码按代码段推断交易所：11xxxx 为上交所，12xxxx 为深交所。
+"""
+
+import os
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+from app.utils.metrics import metrics
+
+COLUMNS = ('symbol', 'name', 'exchange', 'listing_date', 'delisting_date', 'issue_size', 'credit_rating', 'stock_code')
+
+# bond_zh_cov 列 -> 主表字段
+_SOURCE_COLUMNS = {
+    '债券代码': 'symbol', '债券简称': 'name', '上市时间': 'listing_date', '发行规模': 'issue_size',
+    '信用评级': 'credit_rating', '正股代码': 'stock_code',
+}
+# 比较变化时使用的字段（退市日期由合并逻辑维护）
+_COMPARED = ('name', 'listing_date', 'issue_size', 'credit_rating', 'stock_code')
+_EXCHANGES = {'11': 'sh', '12': 'sz'}
+
+
+def exchange_of(symbol: str) -> Optional[str]:
+    """按代码段推断交易所（'sh'/'sz'），无法识别时返回 None"""
+    return _EXCHANGES.get(str(symbol)[:2])
+
+
+def _to_date(value) -> Optional[date]:
+    if value is None or value == '' or pd.isna(value):
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _window(start, end):
+    end = _to_date(end) or date.today()
+    return _to_date(start) or end, end
+
+
+def _fetch_list() -> pd.DataFrame:
+    from app.data.provider import ak
+    return ak.bond_zh_cov()
+
+
+class SymbolMaster:
+    """可转债代码主表
+
+    参数
+    - path: 持久化文件（默认 `data/bond/reference.parquet`）
+    - fetch: 拉取全量列表的函数（默认 `ak.bond_zh_cov`，列名同 akshare）
+    - calendar: 交易日历（判断是否需要刷新），默认进程内共享日历
+    """
+    def __init__(self, path: Optional[Path] = None, fetch=None, calendar=None):
+        if path is None:
+            path = Path(__file__).resolve().parents[2] / 'data' / 'bond' / 'reference.parquet'
+        self.path = Path(path)
+        self.fetch = fetch or _fetch_list
+        if calendar is None:
+            from app.data.trading_calendar import default_calendar
+            calendar = default_calendar()
+        self.calendar = calendar
+        self._records: Dict[str, Dict] = {}
+        self._refreshed_at = 0.0
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, symbol: str) -> bool:
+        return str(symbol) in self._records
+
+    def load(self) -> int:
+        """从本地文件加载，返回记录数（文件不存在或损坏时为 0）"""
+        self._records = {}
+        self._refreshed_at = 0.0
+        if not self.path.exists():
+            return 0
+        try:
+            df = pd.read_parquet(self.path)
+            self._refreshed_at = self.path.stat().st_mtime
+        except Exception:
+            metrics.incr('bond_reference_error')
+            return 0
+        df = df.astype(object).where(df.notna(), None)
+        for row in df.to_dict('records'):
+            record = {name: row.get(name) for name in COLUMNS}
+            record['listing_date'] = _to_date(record['listing_date'])
+            record['delisting_date'] = _to_date(record['delisting_date'])
+            self._records[record['symbol']] = record
+        return len(self._records)
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        """是否需要刷新（从未刷新，或已过写入后的下一个收盘）"""
+        if not self._records:
+            return True
+        now = time.time() if now is None else now
+        return now >= self.calendar.expires_at(self._refreshed_at, 'daily')
+
+    def ensure_fresh(self) -> bool:
+        """过期时刷新，返回主表是否可用（非空）"""
+        if self.is_stale():
+            self.refresh()
+        return bool(self._records)
+
+    @metrics.timed('bond_reference_refresh')
+    def refresh(self, today: Optional[date] = None) -> Dict[str, int]:
+        """拉取全量列表并与已有记录合并
+
+        参数
+        - today: 记录退市日期使用的日期（默认当天）
+
+        返回
+        - dict：`added/updated/delisted` 计数；拉取失败时为空字典
+        """
+        today = today or date.today()
+        try:
+            incoming = self._normalize(self.fetch())
+        except Exception:
+            metrics.incr('bond_reference_error')
+            return {}
+        if not incoming:
+            # 空列表视为上游异常，不据此把全部代码记为退市
+            metrics.incr('bond_reference_error')
+            return {}
+        counts = {'added': 0, 'updated': 0, 'delisted': 0}
+        for symbol, record in incoming.items():
+            current = self._records.get(symbol)
+            if current is None:
+                self._records[symbol] = record
+                counts['added'] += 1
+            elif any(current[name] != record[name] for name in _COMPARED) or current['delisting_date'] is not None:
+                # 重新出现在列表中的代码撤销退市标记
+                current.update({name: record[name] for name in _COMPARED}, delisting_date=None)
+                counts['updated'] += 1
+        for symbol, current in self._records.items():
+            if symbol not in incoming and current['listing_date'] is not None and current['delisting_date'] is None:
+                current['delisting_date'] = today
+                counts['delisted'] += 1
+        if any(counts.values()) or not self.path.exists():
+            self._save()
+        else:
+            self.path.touch()
+        self._refreshed_at = time.time()
+        return counts
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> Dict[str, Dict]:
+        df = df[[c for c in _SOURCE_COLUMNS if c in df.columns]].rename(columns=_SOURCE_COLUMNS)
+        out = {}
+        for row in df.to_dict('records'):
+            symbol = str(row['symbol']).strip()
+            issue_size = pd.to_numeric(row.get('issue_size'), errors='coerce')
+            out[symbol] = {
+                'symbol': symbol,
+                'name': row.get('name') or None,
+                'exchange': exchange_of(symbol),
+                'listing_date': _to_date(row.get('listing_date')),
+                'delisting_date': None,
+                'issue_size': None if pd.isna(issue_size) else float(issue_size),
+                'credit_rating': row.get('credit_rating') or None,
+                'stock_code': None if pd.isna(row.get('stock_code')) else str(row.get('stock_code')),
+            }
+        return out
+
+    def _save(self):
+        """原子写入（临时文件 + 重命名）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f'.{self.path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            self.to_frame(listed_only=False).to_parquet(tmp, index=False)
+            os.replace(tmp, self.path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    # ---- 查询 ----
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """单个代码的记录（不存在时为 None）"""
+        return self._records.get(str(symbol))
+
+    def exchange(self, symbol: str) -> Optional[str]:
+        """交易所（'sh'/'sz'），主表中没有时按代码段推断"""
+        record = self._records.get(str(symbol))
+        if record is not None and record['exchange']:
+            return record['exchange']
+        return exchange_of(symbol)
+
+    def prefixed(self, symbol: str) -> str:
+        """带交易所前缀的代码（如 `sh113001`），无法识别交易所时抛出 ValueError"""
+        exchange = self.exchange(symbol)
+        if exchange is None:
+            raise ValueError(f"Unsupported bond code: {symbol}")
+        return f'{exchange}{symbol}'
+
+    def is_listed(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> Optional[bool]:
+        """区间 [start, end] 内是否处于上市状态（默认当天）
+
+        返回
+        - True/False；主表中没有该代码时为 None（无法判断）
+        """
+        start, end = _window(start, end)
+        return self._listed(str(symbol), start, end)
+
+    def _listed(self, symbol: str, start: date, end: date) -> Optional[bool]:
+        record = self._records.get(symbol)
+        if record is None:
+            return None
+        listing, delisting = record['listing_date'], record['delisting_date']
+        if listing is None or listing > end:
+            return False
+        return delisting is None or delisting > start
+
+    def tradable(self, symbols: Iterable[str], start=None, end=None) -> List[str]:
+        """过滤出区间内处于上市状态的代码（保持顺序）；主表中没有的代码保留，由调用方的请求决定"""
+        start, end = _window(start, end)
+        symbols = list(symbols)
+        kept = [symbol for symbol in symbols if self._listed(str(symbol), start, end) is not False]
+        skipped = len(symbols) - len(kept)
+        if skipped:
+            metrics.incr('bond_reference_skipped', value=skipped)
+        return kept
+
+    def to_frame(self, listed_only: bool = True) -> pd.DataFrame:
+        """主表（`listed_only` 时仅含已上市未退市的代码）"""
+        records = self._records.values()
+        if listed_only:
+            records = [r for r in records if r['listing_date'] is not None and r['delisting_date'] is None]
+        df = pd.DataFrame(list(records), columns=list(COLUMNS))
+        for name in ('listing_date', 'delisting_date'):
+            df[name] = pd.to_datetime(df[name])
+        return df.sort_values('symbol', ignore_index=True)
+
+
+_master: Optional[SymbolMaster] = None
+
+
+def get_master() -> SymbolMaster:
+    """返回进程内共享的主表（仅加载本地文件，不访问网络；需要时调用 `ensure_fresh`）"""
+    global _master
+    if _master is None:
+        _master = SymbolMaster()
+    return _master
+
+
+def prefixed_symbol(symbol: str) -> str:
+    """带交易所前缀的代码（见 `SymbolMaster.prefixed`）"""
+    return get_master().prefixed(symbol)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Convertible bond symbol master")
+    parser.add_argument("symbols", nargs='*', help="查询的代码")
+    parser.add_argument("--refresh", action="store_true", help="强制刷新")
+    args = parser.parse_args()
+
+    master = get_master()
+    if args.refresh:
+        print(master.refresh())
+    else:
+        master.ensure_fresh()
+    print(f"{len(master)} symbols, {len(master.to_frame())} listed")
+    for symbol in args.symbols:
+        print(symbol, master.get(symbol) or f'not in master, exchange {master.exchange(symbol)}')
+
+
+if __name__ == "__main__":
+    main()
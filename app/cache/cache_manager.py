@@ -1,25 +1,68 @@
 """TTL 缓存管理
 
 将 DataFrame 以 Parquet 形式持久化，并记录元数据（时间戳），支持按分类与键读取，提供简单的 TTL 过期判断。
+
+`get_or_fetch` 在此基础上提供：
+- stale-while-revalidate：条目过期但未超过最大陈旧时长时立即返回旧数据，并在后台线程刷新
+- refresh-ahead：短时间内被频繁读取的热点键在接近过期时提前后台刷新
+同一键的后台刷新在进程内去重。
+
+写入是原子的：元数据嵌入 Parquet 文件的 schema metadata，先写临时文件再 `os.replace`，数据与元数据一次提交，
+读者不会看到半写文件；旁路的 `.meta.json` 同样原子写入，仅为兼容旧文件与外部工具保留。
+缓存未命中需要拉取时，进程先获取该键的跨进程文件锁，并在拿到锁后复查缓存，
+因此多个进程同时未命中同一键时只有一个进程访问数据源，其余进程等待并复用其结果。
+
+除固定 TTL 外，`read`/`get_or_fetch` 可接收 `expires_at`（写入时间戳 -> 过期时间戳），
+用于按交易日历计算过期时间，见 `app.data.trading_calendar`。
 """
 
 import json
+import os
+import threading
 import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.cache.file_lock import FileLock
+from app.utils.metrics import metrics
+
+META_KEY = b'turtle.cache'
 
 class CacheManager:
     """缓存管理器
 
     参数
     - base_dir: 缓存根目录（默认项目根下 `data/cache/`）
+    - stale_while_revalidate: `get_or_fetch` 是否默认返回过期数据并后台刷新
+    - max_stale_seconds: 过期后仍可返回旧数据的最长时间（秒），超过则阻塞拉取
+    - refresh_ahead: 热点键的提前刷新点（占 TTL 的比例，0 表示关闭）
+    - hot_reads/hot_window_seconds: 在 `hot_window_seconds` 内被读取至少 `hot_reads` 次即视为热点键
+    - refresh_workers: 后台刷新线程数
+    - lock_timeout: 等待其他进程拉取同一键的最长时间（秒），超时后自行拉取
     """
-    def __init__(self, base_dir: Optional[Path] = None):
+    def __init__(self, base_dir: Optional[Path] = None, stale_while_revalidate: bool = False, max_stale_seconds: int = 3600,
+                 refresh_ahead: float = 0.8, hot_reads: int = 5, hot_window_seconds: int = 300, refresh_workers: int = 2,
+                 lock_timeout: float = 120.0):
         if base_dir is None:
             base_dir = Path(__file__).resolve().parents[2] / 'data' / 'cache'
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale_seconds = max_stale_seconds
+        self.refresh_ahead = refresh_ahead
+        self.hot_reads = hot_reads
+        self.hot_window_seconds = hot_window_seconds
+        self.refresh_workers = refresh_workers
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._reads: Dict[Tuple[str, str], deque] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
 
     def _paths(self, category: str, key: str):
         """返回数据与元数据路径"""
@@ -29,29 +72,198 @@ class CacheManager:
         meta_path = cat_dir / f'{key}.meta.json'
         return data_path, meta_path
 
-    def read(self, category: str, key: str, ttl_seconds: int) -> Optional[pd.DataFrame]:
+    def _key_lock(self, category: str, key: str) -> FileLock:
+        return FileLock(self.base_dir / category / f'{key}.lock')
+
+    def _timestamp(self, category: str, key: str) -> Optional[float]:
+        """返回条目写入时间戳（仅读取 Parquet 尾部元数据），不存在时返回 None"""
+        data_path, meta_path = self._paths(category, key)
+        if not data_path.exists():
+            return None
+        try:
+            meta = pq.read_schema(data_path).metadata or {}
+            if META_KEY in meta:
+                return json.loads(meta[META_KEY]).get('timestamp', 0)
+            # 旧格式：时间戳仅记录在旁路元数据文件
+            if not meta_path.exists():
+                return None
+            return json.loads(meta_path.read_text(encoding='utf-8')).get('timestamp', 0)
+        except Exception:
+            return None
+
+    def _load(self, category: str, key: str) -> pd.DataFrame:
+        data_path, _ = self._paths(category, key)
+        with metrics.timer('cache_read', category=category):
+            return pd.read_parquet(data_path)
+
+    @staticmethod
+    def _expiry(ts: float, ttl_seconds: int, expires_at: Optional[Callable[[float], float]]) -> float:
+        return expires_at(ts) if expires_at is not None else ts + ttl_seconds
+
+    def read(self, category: str, key: str, ttl_seconds: int,
+             expires_at: Optional[Callable[[float], float]] = None) -> Optional[pd.DataFrame]:
         """读取缓存，如过期或不存在返回 None
 
         参数
         - category: 分类目录名
         - key: 数据键
-        - ttl_seconds: 过期时间（秒），<=0 表示总是过期
+        - ttl_seconds: 过期时间（秒），<=0 表示不检查过期
+        - expires_at: 可选的过期函数（写入时间戳 -> 过期时间戳），提供时替代 `ttl_seconds`
         """
-        data_path, meta_path = self._paths(category, key)
-        if not data_path.exists() or not meta_path.exists():
+        ts = self._timestamp(category, key)
+        if ts is None:
+            metrics.incr('cache_miss', category=category)
+            return None
+        if (ttl_seconds > 0 or expires_at is not None) and time.time() > self._expiry(ts, ttl_seconds, expires_at):
+            metrics.incr('cache_expired', category=category)
             return None
         try:
-            meta = json.loads(meta_path.read_text(encoding='utf-8'))
-            ts = meta.get('timestamp', 0)
-            if ttl_seconds > 0 and time.time() - ts > ttl_seconds:
-                return None
-            return pd.read_parquet(data_path)
+            df = self._load(category, key)
         except Exception:
+            metrics.incr('cache_error', category=category)
             return None
+        metrics.incr('cache_hit', category=category)
+        return df
 
     def write(self, category: str, key: str, df: pd.DataFrame):
-        """写入缓存（Parquet + 元数据时间戳）"""
+        """原子写入缓存（Parquet 内嵌元数据，临时文件 + 重命名一次提交）"""
         data_path, meta_path = self._paths(category, key)
-        df.to_parquet(data_path, index=False)
-        meta = {'timestamp': int(time.time())}
-        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
\ No newline at end of file
+        meta = {'timestamp': time.time()}
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        with metrics.timer('cache_write', category=category):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: meta_bytes})
+            tmp = data_path.with_name(f'.{data_path.name}.{uuid.uuid4().hex}.tmp')
+            try:
+                pq.write_table(table, tmp)
+                _replace(tmp, data_path)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            _atomic_write_bytes(meta_path, meta_bytes)
+
+    def get_or_fetch(self, category: str, key: str, fetch: Callable[[], pd.DataFrame], ttl_seconds: int,
+                     stale_while_revalidate: Optional[bool] = None, max_stale_seconds: Optional[int] = None,
+                     expires_at: Optional[Callable[[float], float]] = None) -> pd.DataFrame:
+        """读取缓存，必要时调用 `fetch` 拉取并写入
+
+        参数
+        - category/key: 分类与数据键
+        - fetch: 无参拉取函数
+        - ttl_seconds: 过期时间（秒），<=0 表示总是阻塞拉取
+        - stale_while_revalidate/max_stale_seconds: 覆盖实例默认值
+        - expires_at: 可选的过期函数（写入时间戳 -> 过期时间戳），提供时替代 `ttl_seconds` 判断新鲜度
+
+        返回
+        - DataFrame：新鲜数据；或在允许范围内的过期数据（同时已安排后台刷新）
+        """
+        if stale_while_revalidate is None:
+            stale_while_revalidate = self.stale_while_revalidate
+        if max_stale_seconds is None:
+            max_stale_seconds = self.max_stale_seconds
+        ts = self._timestamp(category, key) if ttl_seconds > 0 else None
+        if ts is not None:
+            now = time.time()
+            expiry = self._expiry(ts, ttl_seconds, expires_at)
+            hot = self._record_read(category, key)
+            fresh = now <= expiry
+            serve_stale = stale_while_revalidate and not fresh and now - expiry <= max_stale_seconds
+            if fresh or serve_stale:
+                try:
+                    df = self._load(category, key)
+                except Exception:
+                    metrics.incr('cache_error', category=category)
+                else:
+                    if fresh:
+                        metrics.incr('cache_hit', category=category)
+                        if hot and self.refresh_ahead > 0 and now - ts >= (expiry - ts) * self.refresh_ahead:
+                            self._schedule_refresh(category, key, fetch)
+                    else:
+                        metrics.incr('cache_stale_served', category=category)
+                        self._schedule_refresh(category, key, fetch)
+                    return df
+            else:
+                metrics.incr('cache_expired', category=category)
+        else:
+            metrics.incr('cache_miss', category=category)
+        with self._key_lock(category, key).hold(self.lock_timeout) as acquired:
+            if not acquired:
+                metrics.incr('cache_lock_timeout', category=category)
+            elif ttl_seconds > 0:
+                # 等锁期间其他进程可能已完成拉取
+                new_ts = self._timestamp(category, key)
+                if (new_ts is not None and (ts is None or new_ts > ts)
+                        and time.time() <= self._expiry(new_ts, ttl_seconds, expires_at)):
+                    try:
+                        df = self._load(category, key)
+                    except Exception:
+                        metrics.incr('cache_error', category=category)
+                    else:
+                        metrics.incr('cache_lock_shared', category=category)
+                        return df
+            df = fetch()
+            self.write(category, key, df)
+        return df
+
+    def _record_read(self, category: str, key: str) -> bool:
+        """记录一次读取，返回该键当前是否为热点"""
+        now = time.time()
+        with self._lock:
+            reads = self._reads.get((category, key))
+            if reads is None:
+                reads = self._reads[(category, key)] = deque(maxlen=max(1, self.hot_reads))
+            reads.append(now)
+            return len(reads) >= self.hot_reads and now - reads[0] <= self.hot_window_seconds
+
+    def _schedule_refresh(self, category: str, key: str, fetch: Callable[[], pd.DataFrame]) -> bool:
+        """安排后台刷新（同一键同时只有一个刷新任务），返回是否新安排"""
+        with self._lock:
+            if (category, key) in self._inflight:
+                return False
+            self._inflight.add((category, key))
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix='cache-refresh')
+        metrics.incr('cache_refresh_scheduled', category=category)
+        self._pool.submit(self._refresh, category, key, fetch)
+        return True
+
+    def _refresh(self, category: str, key: str, fetch: Callable[[], pd.DataFrame]):
+        try:
+            # 其他进程正在拉取同一键时跳过，避免重复请求
+            with self._key_lock(category, key).hold(0) as acquired:
+                if acquired:
+                    self.write(category, key, fetch())
+        except Exception:
+            metrics.incr('cache_refresh_failed', category=category)
+        finally:
+            with self._lock:
+                self._inflight.discard((category, key))
+
+    def wait_refreshes(self):
+        """等待已安排的后台刷新全部结束（用于进程退出前或测试）"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def _replace(src: Path, dst: Path, retries: int = 10):
+    """原子替换；Windows 上目标文件被读者占用时短暂重试"""
+    for i in range(retries):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if i == retries - 1:
+                raise
+            time.sleep(0.05 * (i + 1))
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        tmp.write_bytes(data)
+        _replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
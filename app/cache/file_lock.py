@@ -0,0 +1,108 @@
+"""跨进程文件锁
+
+基于锁文件的独占锁：POSIX 使用 `fcntl.flock`，Windows 使用 `msvcrt.locking`。
+锁随文件描述符关闭自动释放，持锁进程异常退出不会遗留死锁。
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """独占文件锁
+
+    参数
+    - path: 锁文件路径（不存在时自动创建）
+    - poll_interval: 等待锁时的轮询间隔（秒）
+
+    示例
+        with FileLock(path).hold(timeout=30) as acquired:
+            if acquired:
+                ...
+    """
+    def __init__(self, path, poll_interval: float = 0.05):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """获取锁
+
+        参数
+        - timeout: 最长等待秒数；None 表示一直等待，0 表示仅尝试一次
+
+        返回
+        - bool：是否获得锁
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"FileLock {self.path} is already held by this object")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                return False
+            time.sleep(self.poll_interval)
+        self._fd = fd
+        return True
+
+    def release(self):
+        """释放锁"""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def hold(self, timeout: Optional[float] = None) -> '_Held':
+        """以上下文管理器形式获取锁，`as` 得到是否获得锁"""
+        return _Held(self, timeout)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class _Held:
+    def __init__(self, lock: FileLock, timeout: Optional[float]):
+        self.lock = lock
+        self.timeout = timeout
+        self.acquired = False
+
+    def __enter__(self) -> bool:
+        self.acquired = self.lock.acquire(self.timeout)
+        return self.acquired
+
+    def __exit__(self, *exc):
+        if self.acquired:
+            self.lock.release()
+        return False
@@ -0,0 +1,444 @@
+"""报表与仪表盘的预计算聚合
+
+收盘后流水线增量维护若干小表，报表与仪表盘只读取这些表，不再对原始行情重跑 `TurtleStrategy`/`BondAnalyzer`：
+- signals：每个标的一行的最新信号（`SignalDaemon` 信号字典的字段，含突破幅度 `breakout`）
+- equity：策略 × 标的 的交易汇总（交易数、累计收益、胜率、最大回撤；未平仓持仓按最新收盘价估值计入），
+  只重算行情有变化的标的
+- strategies：按策略汇总 equity
+- temperature：按日的市场温度——涨停家数、融资余额变化、两市成交额与上涨占比的滚动 z 分数均值经 EWMA 平滑，
+  映射为 `50 + 10·z` 并截断到 [0, 100]；每个缓存分类各自记录文件修改时间水位，只读取之后新增或重写的文件
+- news：每个标的最新的若干篇相关文档（正文提及代码或简称），只扫描上次水位之后入库的文档
+
+各表为 `data/aggregates/` 下 zstd 压缩的 Parquet，临时文件 + 重命名原子替换；增量水位记录在 `state.json`。
+读取按文件修改时间缓存在进程内，报表生成只涉及几个小表的读取与筛选，耗时与标的总数基本无关。
+
+用法：`python -m app.dashboard.aggregates report`（`rebuild-news` 重新扫描全部文档）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.metrics import metrics
+
+TABLES = ('signals', 'equity', 'strategies', 'temperature', 'news')
+SIGNAL_COLUMNS = ('symbol', 'date', 'signal', 'close', 'atr', 'breakout', 'position', 'units', 'unit_size',
+                  'last_signal', 'last_signal_date')
+TEMPERATURE_COMPONENTS = ('limit_up', 'margin_change', 'turnover', 'breadth')
+NEWS_COLUMNS = ('symbol', 'doc_id', 'url', 'title', 'published_at', 'sentiment')
+
+
+def strategy_id(strategy) -> str:
+    """策略标识：类名 + 参数指纹"""
+    payload = json.dumps(strategy.params(), sort_keys=True)
+    return f'{type(strategy).__name__}:{hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8]}'
+
+
+def breakout_strength(df: pd.DataFrame) -> Optional[float]:
+    """最后一根K线的突破幅度：`(close - 参考价) / ATR`
+
+    参考价为上一根K线上该信号突破的通道：进场/加仓取进场通道（`entry_long`/`entry_short`），
+    出场取被跌破/升破的出场通道（`exit_long`/`exit_short`）。止损按移动止损价触发、不是通道突破，
+    与最后一根K线无信号或数据不足时一样为 None。
+    """
+    if len(df) < 2 or 'signal' not in df:
+        return None
+    last, prev = df.iloc[-1], df.iloc[-2]
+    signal = last['signal']
+    if signal in ('long', 'add_long'):
+        ref = prev['entry_long']
+    elif signal in ('short', 'add_short'):
+        ref = prev['entry_short']
+    elif signal == 'exit':
+        ref = prev['exit_long'] if last['close'] < prev['exit_long'] else prev['exit_short']
+    else:
+        return None
+    value = (last['close'] - ref) / last['atr']
+    return float(value) if np.isfinite(value) else None
+
+
+def temperature_score(components: pd.DataFrame, window: int = 250, min_periods: int = 20, span: int = 5) -> pd.Series:
+    """由按日的温度分量计算温度
+
+    参数
+    - components: 按日期索引，列为 `TEMPERATURE_COMPONENTS` 中的分量（可缺失）
+    - window/min_periods: 滚动 z 分数的窗口与最少样本数
+    - span: EWMA 平滑跨度
+
+    返回
+    - Series：[0, 100] 的温度，样本不足时为 NaN
+    """
+    frame = components.reindex(columns=list(TEMPERATURE_COMPONENTS)).astype(float)
+    rolling = frame.rolling(window, min_periods=min_periods)
+    z = (frame - rolling.mean()) / rolling.std()
+    mean = z.replace([np.inf, -np.inf], np.nan).mean(axis=1)
+    return (50 + 10 * mean.ewm(span=span, adjust=False, ignore_na=True).mean()).clip(0, 100)
+
+
+class AggregateStore:
+    """预计算聚合表
+
+    参数
+    - base_dir: 存储目录（默认项目根下 `data/aggregates/`）
+    - top_news: 每个标的保留的文档数
+    """
+    def __init__(self, base_dir: Optional[Path] = None, top_news: int = 5):
+        if base_dir is None:
+            base_dir = Path(__file__).resolve().parents[2] / 'data' / 'aggregates'
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.top_news = top_news
+        self._memo: Dict[str, tuple] = {}
+
+    # ---- 读写 ----
+
+    def read(self, name: str) -> pd.DataFrame:
+        """读取一张表（按文件修改时间缓存；不存在时为空表）"""
+        path = self.base_dir / f'{name}.parquet'
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return pd.DataFrame()
+        memo = self._memo.get(name)
+        if memo is None or memo[0] != mtime:
+            memo = self._memo[name] = (mtime, pd.read_parquet(path))
+        return memo[1]
+
+    def _write(self, name: str, df: pd.DataFrame):
+        path = self.base_dir / f'{name}.parquet'
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            df.to_parquet(tmp, index=False, compression='zstd')
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self._memo.pop(name, None)
+
+    def state(self) -> Dict:
+        path = self.base_dir / 'state.json'
+        return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+    def _set_state(self, **values):
+        path = self.base_dir / 'state.json'
+        state = {**self.state(), **values}
+        tmp = path.with_name(f'.state.{uuid.uuid4().hex}.tmp')
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _upsert(old: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        if old.empty:
+            return new.sort_values(keys, ignore_index=True)
+        merged = pd.concat([old[~old.set_index(keys).index.isin(new.set_index(keys).index)], new], ignore_index=True)
+        return merged.sort_values(keys, ignore_index=True)
+
+    # ---- 增量更新 ----
+
+    @metrics.timed('aggregate_update', table='signals')
+    def update_signals(self, signals: Dict[str, Dict]) -> int:
+        """以最新信号字典（代码 -> `SignalDaemon` 信号）更新 signals 表，返回更新的标的数"""
+        if not signals:
+            return 0
+        rows = pd.DataFrame([{name: s.get(name) for name in SIGNAL_COLUMNS} for s in signals.values()],
+                            columns=list(SIGNAL_COLUMNS))
+        rows['updated_at'] = int(time.time())
+        self._write('signals', self._upsert(self.read('signals'), rows, ['symbol']))
+        return len(rows)
+
+    @metrics.timed('aggregate_update', table='equity')
+    def update_equity(self, strategy, frames: Dict[str, pd.DataFrame]) -> int:
+        """以行情有变化的标的的信号结果更新 equity 与 strategies 表
+
+        未平仓的持仓按最后一根K线的收盘价估值计入汇总，并单独记录方向与浮动收益（`open_direction`/`open_return`，
+        无持仓时为 0 与 NaN）；`last_exit` 只取已平仓的交易。
+
+        参数
+        - strategy: 生成信号的策略实例（`params()` 决定策略标识）
+        - frames: 代码 -> `generate_signals` 的结果
+
+        返回
+        - int：更新的标的数
+        """
+        from app.backtest.robustness import extract_trades, summarize
+        sid = strategy_id(strategy)
+        rows = []
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            trades = extract_trades(df)
+            closed = trades[~trades['open'].astype(bool)]
+            held = trades[trades['open'].astype(bool)]
+            row = {'strategy': sid, 'symbol': symbol, **summarize(trades['return'].to_numpy(dtype=float)),
+                   'open_direction': int(held['direction'].iloc[0]) if len(held) else 0,
+                   'open_return': float(held['return'].iloc[0]) if len(held) else np.nan,
+                   'last_exit': closed['exit_date'].iloc[-1] if len(closed) else None, 'bars': len(df),
+                   'as_of': df.index[-1]}
+            rows.append(row)
+        if not rows:
+            return 0
+        new = pd.DataFrame(rows)
+        new['last_exit'] = pd.to_datetime(new['last_exit'])
+        new['as_of'] = pd.to_datetime(new['as_of'])
+        equity = self._upsert(self.read('equity'), new, ['strategy', 'symbol'])
+        self._write('equity', equity)
+
+        params = {sid: json.dumps(strategy.params(), sort_keys=True)}
+        old = self.read('strategies')
+        if not old.empty:
+            params = {**dict(zip(old['strategy'], old['params'])), **params}
+        weighted = equity.assign(wins=equity['win_rate'] * equity['trades'])
+        rollup = weighted.groupby('strategy').agg(symbols=('symbol', 'size'), trades=('trades', 'sum'),
+                                                  wins=('wins', 'sum'), mean_return=('total_return', 'mean'),
+                                                  median_return=('total_return', 'median'),
+                                                  worst_drawdown=('max_drawdown', 'max'), as_of=('as_of', 'max'))
+        rollup['win_rate'] = (rollup.pop('wins') / rollup['trades'].where(rollup['trades'] > 0)).fillna(0.0)
+        rollup = rollup.reset_index()
+        rollup['params'] = rollup['strategy'].map(params)
+        self._write('strategies', rollup)
+        return len(rows)
+
+    @metrics.timed('aggregate_update', table='temperature')
+    def update_temperature(self, cache=None, as_of: Optional[date] = None) -> int:
+        """从缓存读取上次之后新增或重写的涨停池与融资融券数据，并把当前的全市场快照记为 `as_of` 的成交额与上涨占比
+
+        每个分类各自记录已读取文件的最大修改时间（`state.json` 的 `temperature_mtimes`），
+        同一交易日的文件在盘后被重新写入时也会被再次读取。
+
+        参数
+        - cache: `CacheManager` 实例（默认项目缓存目录）
+        - as_of: 全市场快照对应的交易日（默认最近一个交易日）；None 且无快照时只更新前两项
+
+        返回
+        - int：新增或更新的日期数
+        """
+        if cache is None:
+            from app.cache.cache_manager import CacheManager
+            cache = CacheManager()
+        if as_of is None:
+            from app.data.trading_calendar import default_calendar
+            as_of = default_calendar().prev_trading_day(date.today(), include=True)
+        old = self.read('temperature')
+        watermarks = dict(self.state().get('temperature_mtimes', {}))
+        rows: Dict[pd.Timestamp, Dict] = {}
+
+        limit_up_keys, limit_up_mtime = self._new_keys(cache, 'zt_pool_em', watermarks.get('zt_pool_em', 0))
+        for key in limit_up_keys:
+            df = cache.read('zt_pool_em', key, 0)
+            if df is not None:
+                rows.setdefault(pd.Timestamp(key), {})['limit_up'] = len(df)
+        margin_keys, margin_mtime = self._new_keys(cache, 'margin_sse', watermarks.get('margin_sse', 0))
+        margin = []
+        for key in margin_keys:
+            df = cache.read('margin_sse', key, 0)
+            if df is not None and '融资余额' in df:
+                margin.append(df[['信用交易日期', '融资余额']])
+        if margin:
+            balance = pd.concat(margin).assign(date=lambda d: pd.to_datetime(d['信用交易日期'].astype(str)))
+            for day, value in balance.groupby('date')['融资余额'].last().items():
+                rows.setdefault(day, {})['margin_balance'] = float(value)
+        spot = cache.read('a_spot_em', 'all', 0)
+        if spot is not None and not spot.empty and {'成交额', '涨跌幅'} <= set(spot.columns):
+            rows.setdefault(pd.Timestamp(as_of), {}).update(
+                turnover=float(pd.to_numeric(spot['成交额'], errors='coerce').sum()),
+                breadth=float((pd.to_numeric(spot['涨跌幅'], errors='coerce') > 0).mean()))
+        if not rows:
+            return 0
+
+        new = pd.DataFrame.from_dict(rows, orient='index')
+        new.index.name = 'date'
+        frame = old.set_index('date') if not old.empty else pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+        frame = frame.drop(columns=['margin_change', 'score'], errors='ignore')
+        frame = new.combine_first(frame).sort_index()
+        frame = frame.reindex(columns=['limit_up', 'margin_balance', 'turnover', 'breadth'])
+        frame['margin_change'] = frame['margin_balance'].pct_change(fill_method=None)
+        frame['score'] = temperature_score(frame)
+        self._write('temperature', frame.reset_index())
+        for category, mtime in (('zt_pool_em', limit_up_mtime), ('margin_sse', margin_mtime)):
+            watermarks[category] = max(watermarks.get(category, 0), mtime)
+        self._set_state(temperature_mtimes=watermarks)
+        return len(new)
+
+    @staticmethod
+    def _new_keys(cache, category: str, since: int) -> Tuple[List[str], int]:
+        """分类下修改时间（纳秒）晚于 since 的缓存键，以及其中最大的修改时间（无新文件时为 since）"""
+        keys, latest = [], since
+        for path in (Path(cache.base_dir) / category).glob('*.parquet'):
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime > since:
+                keys.append(path.stem)
+                latest = max(latest, mtime)
+        return sorted(keys), latest
+
+    @metrics.timed('aggregate_update', table='news')
+    def update_news(self, storage=None, aliases: Optional[Dict[str, Iterable[str]]] = None, rebuild: bool = False) -> int:
+        """扫描水位之后入库的文档，更新每个标的最新的相关文档
+
+        参数
+        - storage: `TextStorage` 实例（默认 `data/text.db`）
+        - aliases: 代码 -> 别名（简称等）；默认取 signals 表中的标的，简称来自代码主表
+        - rebuild: 忽略水位，重新扫描全部文档
+
+        返回
+        - int：本次扫描的文档数
+        """
+        if storage is None:
+            from app.data.storage import TextStorage
+            storage = TextStorage(dedup=False)
+        if aliases is None:
+            aliases = self._default_aliases()
+        names = {}
+        for symbol, extra in aliases.items():
+            for name in (symbol, *extra):
+                if name:
+                    names[name] = symbol
+        if not names:
+            return 0
+        pattern = re.compile('|'.join(re.escape(n) for n in sorted(names, key=len, reverse=True)))
+        watermark = 0 if rebuild else int(self.state().get('news_watermark', 0))
+
+        con = sqlite3.connect(storage.db_path)
+        try:
+            has_enrichment = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'enrichment'").fetchone() is not None
+            select = ('SELECT d.id, d.url, d.title, d.published_at, d.content, {} FROM documents d {} '
+                      'WHERE d.id > ? ORDER BY d.id').format(
+                'e.sentiment' if has_enrichment else 'NULL',
+                'LEFT JOIN enrichment e ON e.doc_id = d.id' if has_enrichment else '')
+            found, scanned, last_id = [], 0, watermark
+            for doc_id, url, title, published_at, content, sentiment in con.execute(select, (watermark,)):
+                scanned += 1
+                last_id = doc_id
+                for symbol in {names[m] for m in pattern.findall(f'{title or ""}\n{content or ""}')}:
+                    found.append((symbol, doc_id, url, title, published_at, sentiment))
+        finally:
+            con.close()
+
+        if found or rebuild:
+            new = pd.DataFrame(found, columns=list(NEWS_COLUMNS))
+            old = self.read('news')
+            merged = new if rebuild or old.empty else pd.concat([old, new], ignore_index=True)
+            merged = merged.drop_duplicates(['symbol', 'doc_id'], keep='last')
+            merged = merged.sort_values(['symbol', 'published_at', 'doc_id'], ascending=[True, False, False])
+            merged = merged.groupby('symbol', sort=False).head(self.top_news).reset_index(drop=True)
+            self._write('news', merged)
+        self._set_state(news_watermark=last_id)
+        return scanned
+
+    def _default_aliases(self) -> Dict[str, List[str]]:
+        signals = self.read('signals')
+        if signals.empty:
+            return {}
+        from app.bond.reference import get_master
+        master = get_master()
+        out = {}
+        for symbol in signals['symbol']:
+            record = master.get(symbol)
+            out[symbol] = [record['name']] if record and record['name'] else []
+        return out
+
+    # ---- 报表 ----
+
+    @metrics.timed('aggregate_report')
+    def report(self, top: int = 20) -> Dict:
+        """由预计算表生成日报数据
+
+        返回
+        - Dict：`date`、`temperature`（最新值与 5 日变化）、`fired`（最新交易日触发信号的标的，
+          按突破幅度 `|breakout|`（(收盘 - 突破参考价)/ATR）降序、无突破幅度的排在最后，附最新文档）、`holding`（持仓标的数）、`strategies`（策略汇总）
+        """
+        signals = self.read('signals')
+        out = {'date': None, 'temperature': None, 'fired': [], 'holding': 0, 'strategies': []}
+        temperature = self.read('temperature')
+        if not temperature.empty:
+            score = temperature.set_index('date')['score'].dropna()
+            if len(score):
+                out['temperature'] = {'date': score.index[-1].strftime('%Y-%m-%d'), 'score': round(float(score.iloc[-1]), 1),
+                                      'change_5d': round(float(score.iloc[-1] - score.iloc[max(len(score) - 6, 0)]), 1)}
+        if not signals.empty:
+            latest = signals['date'].max()
+            out['date'] = latest
+            out['holding'] = int((signals['position'] != 0).sum())
+            fired = signals[(signals['date'] == latest) & signals['signal'].notna()]
+            if 'breakout' in fired:
+                strength = pd.to_numeric(fired['breakout'], errors='coerce').abs()
+                fired = fired.assign(_strength=strength).sort_values(['_strength', 'symbol'], ascending=[False, True],
+                                                                    na_position='last').drop(columns='_strength')
+            news = self.read('news')
+            by_symbol = {s: g for s, g in news.groupby('symbol')} if not news.empty else {}
+            for row in fired.head(top).to_dict('records'):
+                docs = by_symbol.get(row['symbol'])
+                row['news'] = [] if docs is None else docs[['title', 'url', 'published_at']].to_dict('records')
+                out['fired'].append(row)
+        strategies = self.read('strategies')
+        if not strategies.empty:
+            out['strategies'] = strategies.drop(columns=['params']).to_dict('records')
+        return out
+
+
+def render_markdown(report: Dict) -> str:
+    """把 `AggregateStore.report` 的结果渲染为 Markdown 日报"""
+    lines = [f"# 日报 {report['date'] or ''}"]
+    t = report['temperature']
+    if t:
+        lines.append(f"市场温度 {t['score']}（{t['date']}，5 日变化 {t['change_5d']:+}）")
+    lines.append(f"持仓标的 {report['holding']}，今日信号 {len(report['fired'])}")
+    for row in report['fired']:
+        breakout = row.get('breakout')
+        strength = f" 突破 {breakout:+.2f} ATR" if breakout is not None and breakout == breakout else ''
+        lines.append(f"- {row['symbol']} {row['signal']} 收盘 {row['close']} ATR {row['atr']}{strength}")
+        for doc in row['news']:
+            lines.append(f"  - {doc['published_at'] or ''} {doc['title'] or ''} {doc['url']}")
+    for s in report['strategies']:
+        lines.append(f"策略 {s['strategy']}：{s['symbols']} 个标的，{s['trades']} 笔交易，胜率 {s['win_rate']:.0%}，"
+                     f"平均收益 {s['mean_return']:.2%}，最大回撤 {s['worst_drawdown']:.2%}")
+    return '\n'.join(lines)
+
+
+_store: Optional[AggregateStore] = None
+
+
+def _get_store() -> AggregateStore:
+    global _store
+    if _store is None:
+        _store = AggregateStore()
+    return _store
+
+
+def report(top: int = 20) -> Dict:
+    """使用默认目录的共享聚合表生成日报数据（见 `AggregateStore.report`）"""
+    return _get_store().report(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard aggregates")
+    parser.add_argument("command", choices=["report", "rebuild-news"], help="操作")
+    parser.add_argument("--top", type=int, default=20, help="列出的信号数")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    store = _get_store()
+    if args.command == 'rebuild-news':
+        print(f"scanned {store.update_news(rebuild=True)} documents")
+        return
+    t0 = time.perf_counter()
+    data = store.report(args.top)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps(data, ensure_ascii=False, default=str, indent=2) if args.json else render_markdown(data))
+    print(f"({elapsed * 1e3:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
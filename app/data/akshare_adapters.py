@@ -3,96 +3,246 @@
 封装常用 A 股数据接口，统一加入本地 TTL 缓存与简单日志记录，便于上层分析与策略模块复用。
 
 函数返回值均为 `pandas.DataFrame`，字段命名保持 akshare 原始输出，避免不必要的转换。
+
+akshare 调用经 `app.data.provider`（在线 / 录制 / 回放，见该模块），在首次发起网络请求时才导入；模块级函数共享的客户端在首次调用时创建，导入本模块不产生目录、日志等副作用。
+缓存命中时不发起请求。
+
+缓存过期默认按交易日历计算（见 `EXPIRY_POLICIES`）：日频数据在下一个收盘前有效，
+实时快照在非交易时段保持有效，周末、节假日与夜间不会重复请求；`ttl_seconds` 仍作为盘中快照的 TTL，<=0 时强制刷新。
+
+写入缓存前按分类转换为紧凑类型（见 `app.data.schema`）：日期列解析为 datetime64，代码列为字符串，
+价格与涨跌幅为 float32，重复字符串为 category，内存与 Parquet 体积均明显减小。
+
+`AkshareClient.refresh` 在线程池中并发执行一组声明的接口调用，总耗时取决于最慢的接口而非各接口之和。
 """
 
-import akshare as ak
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 from app.cache.cache_manager import CacheManager
+from app.data.schema import optimize
+from app.data.trading_calendar import TradingCalendar, default_calendar
 from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+# 分类 -> 过期策略（'daily'/'spot'/'ttl'，见 `TradingCalendar.expires_at`）
+EXPIRY_POLICIES = {
+    'index_spot_em': 'spot',
+    'index_daily': 'daily',
+    'industry_fund_flow': 'spot',
+    'individual_fund_flow': 'spot',
+    'a_spot_em': 'spot',
+    'margin_sse': 'daily',
+    'margin_szse': 'daily',
+    'zt_pool_em': 'daily',
+}
+
+def _ak():
+    """akshare 调用入口（经 `app.data.provider`，按 `TURTLE_DATA_MODE` 在线拉取、录制或回放；akshare 按需导入）"""
+    from app.data.provider import get_provider
+    return get_provider()
+
+class RefreshResult:
+    """并发刷新结果
+
+    属性
+    - results: 成功的调用名 -> DataFrame
+    - errors: 失败或超时的调用名 -> 错误描述
+    - timings: 调用名 -> 耗时（秒，超时调用记为其超时时长）
+    - elapsed: 总墙钟耗时（秒）
+    """
+    def __init__(self):
+        self.results: Dict[str, pd.DataFrame] = {}
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
 
 class AkshareClient:
     """Akshare 数据客户端（面向对象）
 
     提供常用 A 股数据查询方法，并内置 TTL 缓存与日志。
+
+    参数
+    - cache: 缓存管理器；如需对仪表盘类高频读取启用 stale-while-revalidate，
+      可传入 `CacheManager(stale_while_revalidate=True)`
+    - calendar: 交易日历，默认使用内置节假日表；传入 False 时退回固定 TTL
+    - compact_dtypes: 是否在写入缓存前转换为紧凑类型
     """
 
-    def __init__(self):
-        self.cache = CacheManager()
+    def __init__(self, cache: Optional[CacheManager] = None, calendar: Optional[TradingCalendar] = None,
+                 compact_dtypes: bool = True):
+        self.cache = cache if cache is not None else CacheManager()
+        self.calendar = default_calendar() if calendar is None else calendar
+        self.compact_dtypes = compact_dtypes
         self.log = get_logger('akshare_adapters')
 
-    def _store(self, category: str, key: str, df: pd.DataFrame, use_cache: bool, ttl_seconds: int) -> pd.DataFrame:
+    def _cached(self, category: str, key: str, fetch: Callable[[], pd.DataFrame], use_cache: bool, ttl_seconds: int) -> pd.DataFrame:
+        """先查缓存，未命中或过期时调用 `fetch` 拉取并写入缓存"""
+        def timed_fetch() -> pd.DataFrame:
+            with metrics.timer('akshare_fetch', endpoint=category):
+                df = fetch()
+            metrics.incr('akshare_requests', endpoint=category)
+            return optimize(df, category) if self.compact_dtypes else df
+
         if use_cache:
-            cached = self.cache.read(category, key, ttl_seconds)
-            if cached is not None:
-                return cached
+            expires_at = None
+            if self.calendar:
+                expires_at = self.calendar.expiry(EXPIRY_POLICIES.get(category, 'ttl'), ttl_seconds)
+            return self.cache.get_or_fetch(category, key, timed_fetch, ttl_seconds, expires_at=expires_at)
+        df = timed_fetch()
         self.cache.write(category, key, df)
         return df
 
     def index_spot_em(self, symbol_group: str = '沪深重要指数', use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
         key = f'{symbol_group}'.replace('/', '_')
-        df = ak.stock_zh_index_spot_em(symbol=symbol_group)
-        return self._store('index_spot_em', key, df, use_cache, ttl_seconds)
+        return self._cached('index_spot_em', key, lambda: _ak().stock_zh_index_spot_em(symbol=symbol_group), use_cache, ttl_seconds)
 
     def index_daily(self, symbol: str, use_cache: bool = True, ttl_seconds: int = 3600) -> pd.DataFrame:
         key = f'{symbol}'.replace('/', '_')
-        df = ak.stock_zh_index_daily(symbol=symbol)
-        return self._store('index_daily', key, df, use_cache, ttl_seconds)
+        return self._cached('index_daily', key, lambda: _ak().stock_zh_index_daily(symbol=symbol), use_cache, ttl_seconds)
 
     def industry_fund_flow(self, use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
         key = 'latest'
-        df = ak.stock_fund_flow_industry()
-        return self._store('industry_fund_flow', key, df, use_cache, ttl_seconds)
+        return self._cached('industry_fund_flow', key, lambda: _ak().stock_fund_flow_industry(), use_cache, ttl_seconds)
 
     def individual_fund_flow(self, stock: str, market: Optional[str] = None, use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
         if market is None:
             market = 'sh' if stock.startswith('6') else 'sz'
         key = f'{market}_{stock}'
-        df = ak.stock_individual_fund_flow(stock=stock, market=market)
-        return self._store('individual_fund_flow', key, df, use_cache, ttl_seconds)
+        return self._cached('individual_fund_flow', key, lambda: _ak().stock_individual_fund_flow(stock=stock, market=market), use_cache, ttl_seconds)
 
     def a_spot_em(self, use_cache: bool = True, ttl_seconds: int = 60) -> pd.DataFrame:
         key = 'all'
-        df = ak.stock_zh_a_spot_em()
-        return self._store('a_spot_em', key, df, use_cache, ttl_seconds)
+        return self._cached('a_spot_em', key, lambda: _ak().stock_zh_a_spot_em(), use_cache, ttl_seconds)
 
     def margin_sse(self, start_date: str, end_date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
         key = f'{start_date}_{end_date}'
-        df = ak.stock_margin_sse(start_date=start_date, end_date=end_date)
-        return self._store('margin_sse', key, df, use_cache, ttl_seconds)
+        return self._cached('margin_sse', key, lambda: _ak().stock_margin_sse(start_date=start_date, end_date=end_date), use_cache, ttl_seconds)
 
     def margin_szse(self, start_date: str, end_date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
         key = f'{start_date}_{end_date}'
-        df = ak.stock_margin_szse(start_date=start_date, end_date=end_date)
-        return self._store('margin_szse', key, df, use_cache, ttl_seconds)
+        return self._cached('margin_szse', key, lambda: _ak().stock_margin_szse(start_date=start_date, end_date=end_date), use_cache, ttl_seconds)
 
     def zt_pool_em(self, date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
         key = f'{date}'
-        df = ak.stock_zt_pool_em(date=date)
-        return self._store('zt_pool_em', key, df, use_cache, ttl_seconds)
-
-_client = AkshareClient()
+        return self._cached('zt_pool_em', key, lambda: _ak().stock_zt_pool_em(date=date), use_cache, ttl_seconds)
+
+    def refresh(self, calls: Dict[str, Tuple[str, Dict]], timeout: float = 30.0, timeouts: Optional[Dict[str, float]] = None,
+                max_workers: Optional[int] = None) -> RefreshResult:
+        """并发执行一组接口调用
+
+        参数
+        - calls: 调用名 -> (方法名, 关键字参数)，方法名为本类的公开查询方法，如 `('margin_sse', {'start_date': ..., 'end_date': ...})`
+        - timeout: 默认的单接口超时（秒），自提交时起计
+        - timeouts: 按调用名覆盖的超时
+        - max_workers: 线程数，默认等于调用数
+
+        返回
+        - RefreshResult：成功结果与失败/超时明细；单个接口失败不影响其他接口
+
+        说明：超时的调用不会被强行中断，其线程在后台结束后结果被丢弃（若成功仍会写入缓存）。
+        """
+        timeouts = timeouts or {}
+        result = RefreshResult()
+        if not calls:
+            return result
+        for name, (method, _) in calls.items():
+            if method.startswith('_') or not callable(getattr(self, method, None)):
+                raise ValueError(f"Unknown AkshareClient method for {name}: {method}")
+        t0 = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=max_workers or len(calls), thread_name_prefix='akshare')
+        try:
+            pending = {}
+            for name, (method, kwargs) in calls.items():
+                fut = pool.submit(self._timed_call, getattr(self, method), kwargs)
+                pending[fut] = (name, t0 + timeouts.get(name, timeout))
+            while pending:
+                now = time.perf_counter()
+                for fut, (name, deadline) in list(pending.items()):
+                    if not fut.done() and now >= deadline:
+                        result.errors[name] = f'timeout after {deadline - t0:.1f}s'
+                        result.timings[name] = deadline - t0
+                        self.log.warning(f'refresh {name} timed out')
+                        del pending[fut]
+                if not pending:
+                    break
+                next_deadline = min(deadline for _, deadline in pending.values())
+                done, _ = wait(pending, timeout=max(0.0, next_deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name, _ = pending.pop(fut)
+                    try:
+                        df, elapsed = fut.result()
+                        result.results[name] = df
+                        result.timings[name] = elapsed
+                    except Exception as e:
+                        result.errors[name] = f'{type(e).__name__}: {e}'
+                        result.timings[name] = time.perf_counter() - t0
+                        self.log.error(f'refresh {name} failed: {e}')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        result.elapsed = time.perf_counter() - t0
+        self.log.info(f'refresh {len(result.results)}/{len(calls)} ok in {result.elapsed:.2f}s')
+        return result
+
+    @staticmethod
+    def _timed_call(func: Callable, kwargs: Dict):
+        t0 = time.perf_counter()
+        df = func(**kwargs)
+        return df, time.perf_counter() - t0
+
+def post_close_calls(date: str) -> Dict[str, Tuple[str, Dict]]:
+    """收盘后刷新的默认接口集合
+
+    参数
+    - date: 交易日（YYYYMMDD）
+    """
+    return {
+        'index_spot_em': ('index_spot_em', {}),
+        'industry_fund_flow': ('industry_fund_flow', {}),
+        'a_spot_em': ('a_spot_em', {}),
+        'margin_sse': ('margin_sse', {'start_date': date, 'end_date': date}),
+        'margin_szse': ('margin_szse', {'start_date': date, 'end_date': date}),
+        'zt_pool_em': ('zt_pool_em', {'date': date}),
+    }
+
+_client: Optional[AkshareClient] = None
+
+def _get_client() -> AkshareClient:
+    """返回模块级共享客户端（首次使用时创建）"""
+    global _client
+    if _client is None:
+        _client = AkshareClient()
+    return _client
 
 def index_spot_em(symbol_group: str = '沪深重要指数', use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
-    return _client.index_spot_em(symbol_group, use_cache, ttl_seconds)
+    return _get_client().index_spot_em(symbol_group, use_cache, ttl_seconds)
 
 def index_daily(symbol: str, use_cache: bool = True, ttl_seconds: int = 3600) -> pd.DataFrame:
-    return _client.index_daily(symbol, use_cache, ttl_seconds)
+    return _get_client().index_daily(symbol, use_cache, ttl_seconds)
 
 def industry_fund_flow(use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
-    return _client.industry_fund_flow(use_cache, ttl_seconds)
+    return _get_client().industry_fund_flow(use_cache, ttl_seconds)
 
 def individual_fund_flow(stock: str, market: Optional[str] = None, use_cache: bool = True, ttl_seconds: int = 300) -> pd.DataFrame:
-    return _client.individual_fund_flow(stock, market, use_cache, ttl_seconds)
+    return _get_client().individual_fund_flow(stock, market, use_cache, ttl_seconds)
 
 def a_spot_em(use_cache: bool = True, ttl_seconds: int = 60) -> pd.DataFrame:
-    return _client.a_spot_em(use_cache, ttl_seconds)
+    return _get_client().a_spot_em(use_cache, ttl_seconds)
 
 def margin_sse(start_date: str, end_date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
-    return _client.margin_sse(start_date, end_date, use_cache, ttl_seconds)
+    return _get_client().margin_sse(start_date, end_date, use_cache, ttl_seconds)
 
 def margin_szse(start_date: str, end_date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
-    return _client.margin_szse(start_date, end_date, use_cache, ttl_seconds)
+    return _get_client().margin_szse(start_date, end_date, use_cache, ttl_seconds)
 
 def zt_pool_em(date: str, use_cache: bool = True, ttl_seconds: int = 86400) -> pd.DataFrame:
-    return _client.zt_pool_em(date, use_cache, ttl_seconds)
\ No newline at end of file
+    return _get_client().zt_pool_em(date, use_cache, ttl_seconds)
+
+def refresh(calls: Dict[str, Tuple[str, Dict]], timeout: float = 30.0, timeouts: Optional[Dict[str, float]] = None,
+            max_workers: Optional[int] = None) -> RefreshResult:
+    return _get_client().refresh(calls, timeout, timeouts, max_workers)
\ No newline at end of file
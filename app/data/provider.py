@@ -0,0 +1,215 @@
+"""akshare 数据提供者（在线 / 录制 / 回放）
+
+行情与参考数据的拉取（`AkshareClient`、`BondData`、代码主表、交易日历、demo 中的 `BondAnalyzer`）统一经
+`DataProvider` 调用 akshare 函数，按模式决定数据来源：
+- live：直接调用 akshare（默认）
+- record：调用 akshare，并把响应写入本地归档后返回归档中的版本（与回放得到的数据完全一致）
+- replay：只从归档读取，不导入 akshare、不访问网络；归档中没有的调用抛出 `ReplayMissError`
+
+模式由环境变量 `TURTLE_DATA_MODE`（live/record/replay）选择，归档目录由 `TURTLE_DATA_ARCHIVE` 指定
+（默认项目根下 `data/archive/`）。一次调用的归档键为 函数名 + 参数 的 sha256，
+每个响应存为 `<函数名>/<键>.parquet`（zstd 压缩，参数写在 Parquet 元数据中），Arrow 无法表示的对象列退回 pickle。
+回放时同一进程内的重复调用直接返回内存中的副本。
+
+调用方式与 akshare 模块相同：`from app.data.provider import ak` 后 `ak.bond_zh_hs_cov_daily(symbol='sh113001')`。
+
+用法：`python -m app.data.provider list`（列出归档中的函数、调用数与体积）
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.utils.metrics import metrics
+
+ENV_MODE = 'TURTLE_DATA_MODE'
+ENV_ARCHIVE = 'TURTLE_DATA_ARCHIVE'
+MODES = ('live', 'record', 'replay')
+META_KEY = b'turtle_call'
+
+
+class ReplayMissError(LookupError):
+    """回放模式下归档中没有对应的调用"""
+
+
+def call_key(func: str, args: tuple = (), kwargs: Optional[Dict] = None) -> str:
+    """调用的归档键：函数名 + 位置参数 + 关键字参数（排序后）的 sha256"""
+    payload = json.dumps({'func': func, 'args': list(args), 'kwargs': kwargs or {}}, sort_keys=True,
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _akshare():
+    import akshare
+    return akshare
+
+
+class DataProvider:
+    """按模式调用 akshare 或读写本地归档
+
+    参数
+    - mode: 'live'/'record'/'replay'（默认环境变量 `TURTLE_DATA_MODE` 或 live）
+    - archive_dir: 归档目录（默认环境变量 `TURTLE_DATA_ARCHIVE` 或 `data/archive/`）
+    - source: 在线数据源（提供与 akshare 同名函数的对象，默认按需导入 akshare）
+    """
+    def __init__(self, mode: Optional[str] = None, archive_dir: Optional[Path] = None, source=None):
+        mode = (mode or os.environ.get(ENV_MODE) or 'live').lower()
+        if mode not in MODES:
+            raise ValueError(f"Unknown data mode: {mode} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        if archive_dir is None:
+            archive_dir = os.environ.get(ENV_ARCHIVE) or Path(__file__).resolve().parents[2] / 'data' / 'archive'
+        self.archive_dir = Path(archive_dir)
+        self._source = source
+        self._memo: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def bound(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        bound.__name__ = name
+        return bound
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = _akshare()
+        return self._source
+
+    def call(self, func: str, *args, **kwargs) -> pd.DataFrame:
+        """按模式执行一次 akshare 调用
+
+        参数
+        - func: akshare 函数名（如 `bond_zh_hs_cov_daily`）
+        - args/kwargs: 传给该函数的参数
+
+        返回
+        - DataFrame：响应；回放模式下归档中没有时抛出 `ReplayMissError`
+        """
+        if self.mode == 'live':
+            return getattr(self.source, func)(*args, **kwargs)
+        key = call_key(func, args, kwargs)
+        if self.mode == 'replay':
+            return self._replay(func, key, args, kwargs)
+        with metrics.timer('provider_fetch', func=func):
+            df = getattr(self.source, func)(*args, **kwargs)
+        self._record(func, key, args, kwargs, df)
+        metrics.incr('provider_recorded', func=func)
+        with self._lock:
+            self._memo.pop(key, None)
+        return self._replay(func, key, args, kwargs)
+
+    def _paths(self, func: str, key: str):
+        base = self.archive_dir / func
+        return base / f'{key}.parquet', base / f'{key}.pkl'
+
+    def _record(self, func: str, key: str, args: tuple, kwargs: Dict, df: pd.DataFrame):
+        """原子写入归档（临时文件 + 重命名）；Arrow 无法转换时写 pickle"""
+        parquet_path, pickle_path = self._paths(func, key)
+        parquet_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({'func': func, 'args': list(args), 'kwargs': kwargs}, ensure_ascii=False, default=str)
+        tmp = parquet_path.with_name(f'.{key}.{uuid.uuid4().hex}.tmp')
+        try:
+            try:
+                table = pa.Table.from_pandas(df)
+                table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: meta.encode('utf-8')})
+                pq.write_table(table, tmp, compression='zstd')
+                target, stale = parquet_path, pickle_path
+            except (pa.ArrowException, TypeError, ValueError):
+                metrics.incr('provider_pickle_fallback', func=func)
+                with open(tmp, 'wb') as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+                target, stale = pickle_path, parquet_path
+            os.replace(tmp, target)
+            if stale.exists():
+                stale.unlink()
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _replay(self, func: str, key: str, args: tuple, kwargs: Dict) -> pd.DataFrame:
+        with self._lock:
+            df = self._memo.get(key)
+        if df is None:
+            parquet_path, pickle_path = self._paths(func, key)
+            if parquet_path.exists():
+                df = pd.read_parquet(parquet_path)
+            elif pickle_path.exists():
+                with open(pickle_path, 'rb') as f:
+                    df = pickle.load(f)
+            else:
+                metrics.incr('provider_replay_miss', func=func)
+                raise ReplayMissError(f"No recorded response for {func}(args={list(args)}, kwargs={kwargs}) "
+                                      f"in {self.archive_dir}")
+            with self._lock:
+                self._memo[key] = df
+        metrics.incr('provider_replayed', func=func)
+        # 调用方可能原地修改返回值
+        return df.copy()
+
+    def entries(self) -> pd.DataFrame:
+        """归档概览：每个函数的调用数与体积（字节）"""
+        rows = []
+        if self.archive_dir.exists():
+            for func_dir in sorted(p for p in self.archive_dir.iterdir() if p.is_dir()):
+                files = [p for p in func_dir.iterdir() if p.suffix in ('.parquet', '.pkl')]
+                rows.append({'func': func_dir.name, 'calls': len(files), 'bytes': sum(p.stat().st_size for p in files)})
+        return pd.DataFrame(rows, columns=['func', 'calls', 'bytes'])
+
+
+_provider: Optional[DataProvider] = None
+
+
+def get_provider() -> DataProvider:
+    """返回进程内共享的提供者（首次使用时按环境变量创建）"""
+    global _provider
+    if _provider is None:
+        _provider = DataProvider()
+    return _provider
+
+
+def set_provider(provider: Optional[DataProvider]):
+    """替换共享的提供者（None 时下次使用按环境变量重新创建），供基准与参数扫描切换模式或归档"""
+    global _provider
+    _provider = provider
+
+
+class _SharedProvider:
+    """与 akshare 模块同样调用的代理，每次调用时转发给当前的共享提供者"""
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(get_provider(), name)
+
+
+ak = _SharedProvider()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="akshare record/replay provider")
+    parser.add_argument("command", choices=["list"], help="操作")
+    args = parser.parse_args()
+
+    provider = get_provider()
+    entries = provider.entries()
+    print(f"mode {provider.mode}, archive {provider.archive_dir}")
+    if entries.empty:
+        print("archive is empty")
+    else:
+        print(entries.to_string(index=False))
+        print(f"total {entries['calls'].sum()} calls, {entries['bytes'].sum() / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
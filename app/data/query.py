@@ -0,0 +1,265 @@
+"""嵌入式分析查询层（DuckDB）
+
+把缓存的 Parquet、可转债历史 CSV 与文本库注册为 DuckDB 视图，用 SQL 直接做跨数据集分析，
+列裁剪与日期过滤下推到存储层，不必先把整份数据读成 DataFrame：
+- 缓存分类：`data/cache/<分类>/*.parquet` 注册为同名视图，附加 `_key`（缓存键，即文件名）与 `_date`
+  （键末尾的 YYYYMMDD 解析出的日期，如 `zt_pool_em` 的交易日、`margin_sse` 的结束日期；无日期时为 NULL）
+- 可转债历史：`data/bond/csv/<代码>_<结束日期>.csv` 注册为 `bond_daily(symbol, date, open, high, low, close)`，
+  同一代码同一天出现在多个文件中时取结束日期最新的文件
+- 文本：`data/text.db` 中的 `documents`（及存在时的 `enrichment`、`duplicates`）
+
+缓存分类通常由大量小文件组成（每个交易日一个），逐个打开的开销远大于扫描本身。默认将每个分类合并为
+`data/query/<分类>.parquet` 快照（按 `_key` 排序，行组统计支持按键/日期跳读），源目录或文件有更新时自动重建；
+`compact=False` 时直接扫描源文件（按文件名过滤仍可跳过文件）。
+
+文本库优先通过 DuckDB 的 sqlite 扩展直接挂载（需已安装扩展）；扩展不可用时导出为 Parquet 快照。
+
+示例（近两年融资余额变化与涨停家数）：
+    SELECT z._date AS d, m.融资余额 - lag(m.融资余额) OVER (ORDER BY z._date) AS margin_change, z.n AS limit_up
+    FROM (SELECT _date, count(*) AS n FROM zt_pool_em WHERE _date >= current_date - INTERVAL 2 YEAR GROUP BY 1) z
+    JOIN margin_sse m ON CAST(m.信用交易日期 AS DATE) = z._date ORDER BY d
+
+用法：`python -m app.data.query "SELECT count(*) FROM zt_pool_em"`、`python -m app.data.query --list`
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.utils.metrics import metrics
+
+_ROOT = Path(__file__).resolve().parents[2] / 'data'
+_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+TEXT_TABLES = ('documents', 'enrichment', 'duplicates')
+BOND_COLUMNS = "{'date': 'DATE', 'open': 'DOUBLE', 'high': 'DOUBLE', 'low': 'DOUBLE', 'close': 'DOUBLE'}"
+_ARROW_TYPES = {'INTEGER': pa.int64(), 'REAL': pa.float64(), 'TEXT': pa.string(), 'BLOB': pa.binary()}
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("duckdb is required for the query layer: pip install duckdb") from e
+    return duckdb
+
+
+def _quote(path: Path) -> str:
+    """SQL 字符串字面量（路径中的单引号转义）"""
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _latest_mtime(directory: Path, pattern: str) -> Optional[float]:
+    """目录及其中匹配文件的最新修改时间；没有匹配文件时返回 None"""
+    files = list(directory.glob(pattern))
+    if not files:
+        return None
+    return max([directory.stat().st_mtime] + [f.stat().st_mtime for f in files])
+
+
+class QueryEngine:
+    """DuckDB 查询引擎（单个连接，不要在多个线程间共享）
+
+    参数
+    - cache_dir: 缓存根目录，默认 `data/cache/`
+    - bond_dir: 可转债数据目录，默认 `data/bond/`（读取其中的 `csv/`）
+    - text_db: 文本库路径，默认 `data/text.db`
+    - snapshot_dir: 合并快照目录，默认 `data/query/`
+    - compact: 是否将缓存分类与可转债历史合并为快照后查询
+    - threads: DuckDB 线程数，默认由 DuckDB 决定
+    """
+    def __init__(self, cache_dir: Optional[Path] = None, bond_dir: Optional[Path] = None, text_db: Optional[Path] = None,
+                 snapshot_dir: Optional[Path] = None, compact: bool = True, threads: Optional[int] = None):
+        duckdb = _duckdb()
+        self.cache_dir = Path(cache_dir or _ROOT / 'cache')
+        self.bond_dir = Path(bond_dir or _ROOT / 'bond')
+        self.text_db = Path(text_db or _ROOT / 'text.db')
+        self.snapshot_dir = Path(snapshot_dir or _ROOT / 'query')
+        self.compact = compact
+        self.con = duckdb.connect(':memory:')
+        if threads:
+            self.con.execute(f'SET threads = {int(threads)}')
+        self._views: Dict[str, str] = {}
+        self._sqlite_attached = False
+        self.refresh()
+
+    # ---- 注册 ----
+
+    def refresh(self) -> List[str]:
+        """重新扫描数据目录并注册视图（有更新的快照会重建），返回视图名"""
+        self._views = {}
+        if self.cache_dir.is_dir():
+            for directory in sorted(p for p in self.cache_dir.iterdir() if p.is_dir()):
+                if _NAME.match(directory.name) and any(directory.glob('*.parquet')):
+                    self._register_category(directory)
+        if (self.bond_dir / 'csv').is_dir() and any((self.bond_dir / 'csv').glob('*.csv')):
+            self._register_bonds(self.bond_dir / 'csv')
+        if self.text_db.exists():
+            self._register_text()
+        return self.views()
+
+    def views(self) -> List[str]:
+        """已注册的视图名"""
+        return sorted(self._views)
+
+    def _create_view(self, name: str, select: str):
+        self.con.execute(f'CREATE OR REPLACE VIEW "{name}" AS {select}')
+        self._views[name] = select
+
+    def _snapshot(self, name: str, sources: Path, pattern: str, select: str) -> Path:
+        """将 select 的结果写为快照（源更新时重建，临时文件 + 重命名）"""
+        path = self.snapshot_dir / f'{name}.parquet'
+        latest = _latest_mtime(sources, pattern)
+        if path.exists() and latest is not None and path.stat().st_mtime >= latest:
+            return path
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            with metrics.timer('query_snapshot', view=name):
+                self.con.execute(f'COPY ({select}) TO {_quote(tmp)} (FORMAT parquet, ROW_GROUP_SIZE 16384)')
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return path
+
+    def _register_category(self, directory: Path):
+        files = _quote(directory / '*.parquet')
+        select = (
+            f"SELECT * EXCLUDE (filename), regexp_extract(filename, '([^/\\\\]+)\\.parquet$', 1) AS _key, "
+            f"CAST(try_strptime(regexp_extract(filename, '(\\d{{8}})\\.parquet$', 1), '%Y%m%d') AS DATE) AS _date "
+            f"FROM read_parquet({files}, union_by_name = true, filename = true)"
+        )
+        if self.compact:
+            path = self._snapshot(directory.name, directory, '*.parquet', select + ' ORDER BY _key')
+            select = f'SELECT * FROM read_parquet({_quote(path)})'
+        self._create_view(directory.name, select)
+
+    def _register_bonds(self, directory: Path):
+        files = _quote(directory / '*.csv')
+        # 列固定为 `fetch_bond_data` 的输出；显式声明列类型，跳过逐文件的格式探测（探测占读取耗时的绝大部分）
+        # 同一代码多次保存时区间重叠，按文件名（含结束日期）取最新的一份
+        select = (
+            f"SELECT regexp_extract(filename, '([^/\\\\_]+)_[^/\\\\]*\\.csv$', 1) AS symbol, date, open, high, low, close "
+            f"FROM read_csv({files}, header = true, auto_detect = false, filename = true, columns = {BOND_COLUMNS}) "
+            f"QUALIFY row_number() OVER (PARTITION BY symbol, date ORDER BY filename DESC) = 1"
+        )
+        if self.compact:
+            path = self._snapshot('bond_daily', directory, '*.csv', select + ' ORDER BY symbol, date')
+            select = f'SELECT * FROM read_parquet({_quote(path)})'
+        self._create_view('bond_daily', select)
+
+    def _register_text(self):
+        tables = self._text_tables()
+        if not self._sqlite_attached:
+            try:
+                # 只使用已安装的扩展，不在查询时联网下载
+                self.con.execute('SET autoinstall_known_extensions = false')
+                self.con.execute('LOAD sqlite')
+                self.con.execute(f'ATTACH {_quote(self.text_db)} AS text_db (TYPE sqlite, READ_ONLY)')
+                self._sqlite_attached = True
+            except Exception:
+                metrics.incr('query_sqlite_unavailable')
+        for table in tables:
+            if self._sqlite_attached:
+                self._create_view(table, f'SELECT * FROM text_db."{table}"')
+            else:
+                path = self._export_text(table)
+                self._create_view(table, f'SELECT * FROM read_parquet({_quote(path)})')
+
+    def _text_tables(self) -> List[str]:
+        con = sqlite3.connect(self.text_db)
+        try:
+            names = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            con.close()
+        return [t for t in TEXT_TABLES if t in names]
+
+    def _export_text(self, table: str, chunk_size: int = 10000) -> Path:
+        """将文本库中的表分块导出为 Parquet 快照（文本库更新后重建）"""
+        path = self.snapshot_dir / f'text_{table}.parquet'
+        latest = max(p.stat().st_mtime for p in self.text_db.parent.glob(self.text_db.name + '*'))
+        if path.exists() and path.stat().st_mtime >= latest:
+            return path
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        con = sqlite3.connect(self.text_db)
+        try:
+            # 按声明类型建立 schema，避免分块推断出不一致的类型（如整块为 NULL）
+            info = con.execute(f'PRAGMA table_info("{table}")').fetchall()
+            schema = pa.schema([(row[1], _ARROW_TYPES.get((row[2] or '').upper(), pa.string())) for row in info])
+            columns = ', '.join(f'"{row[1]}"' for row in info)
+            cur = con.execute(f'SELECT {columns} FROM "{table}"')
+            with pq.ParquetWriter(tmp, schema) as writer:
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)], schema=schema))
+            os.replace(tmp, path)
+        finally:
+            con.close()
+            if tmp.exists():
+                tmp.unlink()
+        return path
+
+    # ---- 查询 ----
+
+    def query(self, sql: str, params: Optional[list] = None) -> pd.DataFrame:
+        """执行 SQL，返回 DataFrame"""
+        with metrics.timer('query_sql'):
+            return self.con.execute(sql, params or []).df()
+
+    def arrow(self, sql: str, params: Optional[list] = None):
+        """执行 SQL，返回 pyarrow.Table（大结果集避免转换为 DataFrame 的开销）"""
+        with metrics.timer('query_sql'):
+            return self.con.execute(sql, params or []).fetch_arrow_table()
+
+    def explain(self, sql: str) -> str:
+        """返回带实际执行统计的查询计划（可查看读取的文件数与下推的过滤条件）"""
+        return '\n'.join(row[1] for row in self.con.execute(f'EXPLAIN ANALYZE {sql}').fetchall())
+
+    def close(self):
+        self.con.close()
+
+
+_engine: Optional[QueryEngine] = None
+
+
+def query(sql: str, params: Optional[list] = None) -> pd.DataFrame:
+    """使用默认目录的共享引擎执行 SQL（见 `QueryEngine.query`）"""
+    global _engine
+    if _engine is None:
+        _engine = QueryEngine()
+    return _engine.query(sql, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL over cached market data and stored documents")
+    parser.add_argument("sql", nargs="?", default=None, help="SQL 语句")
+    parser.add_argument("--list", action="store_true", help="列出可用视图及其列")
+    parser.add_argument("--explain", action="store_true", help="输出查询计划")
+    parser.add_argument("--no-compact", action="store_true", help="不使用合并快照，直接扫描源文件")
+    args = parser.parse_args()
+
+    engine = QueryEngine(compact=not args.no_compact)
+    if args.list or not args.sql:
+        for name in engine.views():
+            columns = engine.query(f'DESCRIBE "{name}"')
+            print(f"{name}: {', '.join(columns['column_name'])}")
+        return
+    if args.explain:
+        print(engine.explain(args.sql))
+        return
+    with pd.option_context('display.max_rows', 100, 'display.width', 200):
+        print(engine.query(args.sql))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""缓存数据的紧凑类型
+
+akshare 返回的数据默认为 float64/object 列，多份快照同时驻留内存或写入 Parquet 时体积偏大。
+本模块按分类声明列类型，在写入缓存前统一转换一次：
+- 日期列解析为 datetime64
+- 代码列保持字符串（保留前导零），使用 Arrow 字符串
+- 价格、涨跌幅等精度要求不高的浮点列转为 float32；成交额、市值等大数值保持 float64
+- 取值为整数的列（含以浮点返回的成交量）在范围允许时降为 int32
+- 重复度高的字符串列转为 category，其余字符串转为 Arrow 字符串
+
+未声明的分类仅做通用转换（整数降级与字符串压缩）。转换失败的列保持原样。
+"""
+
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# 去重后取值数不超过行数的该比例时转为 category
+CATEGORY_RATIO = 0.5
+
+# Arrow 字符串（`pd.ArrowDtype`），经 Parquet 往返后仍为 Arrow 类型
+ARROW_STRING = pd.ArrowDtype(pa.string())
+
+DATE_COLUMNS = ('date', '日期', 'trade_date', '信用交易日期')
+CODE_COLUMNS = ('代码', '股票代码', 'code', 'symbol')
+_QUOTE_FLOAT32 = ('最新价', '涨跌幅', '涨跌额', '振幅', '最高', '最低', '今开', '昨收', '量比')
+
+
+class FrameSchema:
+    """单个分类的列类型声明
+
+    参数
+    - dates: 日期列
+    - codes: 代码列（保持字符串）
+    - float32: 可降为 float32 的浮点列
+    - categories: 强制转为 category 的列
+    """
+    def __init__(self, dates: Iterable[str] = DATE_COLUMNS, codes: Iterable[str] = CODE_COLUMNS,
+                 float32: Iterable[str] = (), categories: Iterable[str] = ()):
+        self.dates = tuple(dates)
+        self.codes = tuple(codes)
+        self.float32 = tuple(float32)
+        self.categories = tuple(categories)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """返回转换后的新 DataFrame（不修改输入）"""
+        out = {}
+        for i, col in enumerate(df.columns):
+            s = df.iloc[:, i]
+            try:
+                out[i] = self._convert(col, s)
+            except (TypeError, ValueError, OverflowError):
+                out[i] = s
+        result = pd.DataFrame(out, index=df.index)
+        result.columns = df.columns
+        return result
+
+    def _convert(self, col, s: pd.Series) -> pd.Series:
+        if col in self.dates:
+            return _to_datetime(s)
+        if col in self.codes:
+            return _to_string(s, codes=True)
+        if col in self.categories:
+            return s.astype('category')
+        if pd.api.types.is_bool_dtype(s):
+            return s
+        if pd.api.types.is_integer_dtype(s):
+            return _downcast_int(s)
+        if pd.api.types.is_float_dtype(s):
+            if col in self.float32:
+                return s.astype(np.float32)
+            if _integral(s):
+                return _downcast_int(s)
+            return s
+        if s.dtype == object:
+            return _to_string(s)
+        return s
+
+
+def _to_datetime(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    converted = pd.to_datetime(s, errors='coerce')
+    # 存在无法解析的非空值时保持原样，避免静默丢失数据
+    if converted.isna().sum() > s.isna().sum():
+        return s
+    return converted
+
+
+def _to_string(s: pd.Series, codes: bool = False) -> pd.Series:
+    if s.dtype != object or pd.api.types.infer_dtype(s, skipna=True) != 'string':
+        return s
+    n = len(s)
+    if not codes and n and s.nunique(dropna=True) <= n * CATEGORY_RATIO:
+        return s.astype('category')
+    return s.astype(ARROW_STRING)
+
+
+def _integral(s: pd.Series) -> bool:
+    values = s.to_numpy()
+    return len(values) > 0 and bool(np.isfinite(values).all()) and bool((values == np.round(values)).all())
+
+
+def _downcast_int(s: pd.Series) -> pd.Series:
+    # 只降到 int32：更窄或无符号类型在后续算术中容易溢出
+    info = np.iinfo(np.int32)
+    if s.min() >= info.min and s.max() <= info.max:
+        return s.astype(np.int32)
+    return s.astype(np.int64)
+
+
+_SPOT = FrameSchema(float32=_QUOTE_FLOAT32 + ('换手率', '市盈率-动态', '市净率', '涨速', '5分钟涨跌', '60日涨跌幅', '年初至今涨跌幅'))
+
+SCHEMAS: Dict[str, FrameSchema] = {
+    'a_spot_em': _SPOT,
+    'index_spot_em': _SPOT,
+    'index_daily': FrameSchema(float32=('open', 'high', 'low', 'close')),
+    'industry_fund_flow': FrameSchema(float32=('行业指数', '行业-涨跌幅', '领涨股-涨跌幅', '当前价')),
+    'individual_fund_flow': FrameSchema(float32=('收盘价', '涨跌幅', '主力净流入-净占比', '超大单净流入-净占比',
+                                                 '大单净流入-净占比', '中单净流入-净占比', '小单净流入-净占比')),
+    'margin_sse': FrameSchema(),
+    'margin_szse': FrameSchema(),
+    'zt_pool_em': FrameSchema(float32=('涨跌幅', '最新价', '换手率'), categories=('所属行业', '涨停统计')),
+}
+
+_DEFAULT = FrameSchema()
+
+
+def get_schema(category: Optional[str]) -> FrameSchema:
+    """返回分类对应的类型声明，未声明时返回通用声明"""
+    return SCHEMAS.get(category, _DEFAULT)
+
+
+def optimize(df: pd.DataFrame, category: Optional[str] = None) -> pd.DataFrame:
+    """按分类声明转换为紧凑类型
+
+    参数
+    - df: 原始 DataFrame
+    - category: 缓存分类名（如 `a_spot_em`）
+
+    返回
+    - DataFrame：转换后的新 DataFrame；输入为空或 None 时原样返回
+    """
+    if df is None or df.empty:
+        return df
+    return get_schema(category).apply(df)
+
+
+def footprint(df: pd.DataFrame) -> int:
+    """返回 DataFrame 的内存占用（字节，含字符串内容）"""
+    return int(df.memory_usage(deep=True, index=True).sum())
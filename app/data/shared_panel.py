@@ -0,0 +1,199 @@
+"""共享内存行情面板
+
+多进程按标的并行时，进程池把 pandas 行情逐进程（或逐任务）pickle 传递，每个工作进程各持一份副本。
+`SharedPanel` 把多个标的的 OHLC 与指标列一次写入一段 `multiprocessing.shared_memory`，
+工作进程按名称连接后得到只读的零拷贝视图：
+
+- 布局：`dates`（int64 纳秒时间戳，长度 N）之后是 字段×N 的 float64 矩阵；各标的的行按代码依次连续存放，
+  `offsets` 记录每个标的的 [起始行, 结束行)，因此单个标的的全部字段是矩阵中一段连续列，取出即为视图
+- 句柄：`PanelHandle`（段名、字段、代码与行区间）很小，可随任务或进程池初始化参数传递
+- 视图：`panel[symbol]` / `panel.frame(symbol, start, end)` 返回按日期索引的 DataFrame，底层数组只读，
+  `TurtleStrategy.compute_indicators`、`BondAnalyzer` 等会先复制再写入的代码可直接使用
+- 生命周期：创建方是段的所有者，`close()` 时释放映射并删除段（也可用作上下文管理器；进程退出时兜底清理）；
+  连接方 `close()` 只释放自己的映射
+
+用法
+    with SharedPanel.create(frames, fields=('open', 'high', 'low', 'close')) as panel:
+        with ProcessPoolExecutor(initializer=init, initargs=(panel.handle,)) as pool: ...
+    # 工作进程：panel = SharedPanel.attach(handle); df = panel['113001']
+"""
+
+import sys
+import uuid
+import weakref
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.metrics import metrics
+
+
+@dataclass(frozen=True)
+class PanelHandle:
+    """连接共享面板所需的信息（可 pickle）"""
+    name: str
+    fields: Tuple[str, ...]
+    symbols: Tuple[str, ...]
+    offsets: Tuple[Tuple[int, int], ...]
+    rows: int
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * self.rows * (len(self.fields) + 1)
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    try:
+        shm.close()
+    except BufferError:
+        # 仍有视图引用映射时无法关闭，进程退出时由系统回收
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedPanel:
+    """共享内存中的多标的行情（只读）
+
+    通过 `SharedPanel.create` 发布、`SharedPanel.attach` 连接，不直接构造。
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, handle: PanelHandle, owner: bool):
+        self._shm = shm
+        self.handle = handle
+        self.owner = owner
+        self._index = {symbol: i for i, symbol in enumerate(handle.symbols)}
+        buf = np.ndarray((handle.rows * (len(handle.fields) + 1),), dtype=np.float64, buffer=shm.buf)
+        self.dates = buf[:handle.rows].view(np.int64)
+        self.values = buf[handle.rows:].reshape(len(handle.fields), handle.rows)
+        if not owner:
+            self.dates.flags.writeable = False
+            self.values.flags.writeable = False
+        # 所有者进程退出时兜底删除段
+        self._finalizer = weakref.finalize(self, _unlink, shm) if owner else None
+
+    @classmethod
+    @metrics.timed('shared_panel_create')
+    def create(cls, frames: Dict[str, pd.DataFrame], fields: Optional[Sequence[str]] = None) -> 'SharedPanel':
+        """把多个标的的行情写入一段新的共享内存
+
+        参数
+        - frames: 代码 -> 按日期升序索引的行情（可含指标列）；空表跳过
+        - fields: 发布的列（默认各表共有的数值列，按首个表的列顺序）
+
+        返回
+        - SharedPanel：所有者实例（负责删除段）
+        """
+        frames = {str(s): df for s, df in frames.items() if df is not None and not df.empty}
+        if fields is None:
+            common = None
+            for df in frames.values():
+                numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+                common = numeric if common is None else [c for c in common if c in set(numeric)]
+            fields = common or []
+        fields = tuple(fields)
+        symbols = tuple(sorted(frames))
+        offsets, row = [], 0
+        for symbol in symbols:
+            offsets.append((row, row + len(frames[symbol])))
+            row += len(frames[symbol])
+        handle_rows = row
+        shm = shared_memory.SharedMemory(create=True, size=max(8 * handle_rows * (len(fields) + 1), 1),
+                                         name=f'turtle_{uuid.uuid4().hex[:16]}')
+        handle = PanelHandle(shm.name, fields, symbols, tuple(offsets), handle_rows)
+        panel = cls(shm, handle, owner=True)
+        for symbol, (lo, hi) in zip(symbols, offsets):
+            df = frames[symbol]
+            panel.dates[lo:hi] = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+            panel.values[:, lo:hi] = df[list(fields)].to_numpy(dtype=np.float64).T
+        panel.dates.flags.writeable = False
+        panel.values.flags.writeable = False
+        metrics.incr('shared_panel_bytes', value=handle.nbytes)
+        return panel
+
+    @classmethod
+    def attach(cls, handle: PanelHandle) -> 'SharedPanel':
+        """按句柄连接已发布的面板（只读，不负责删除段）"""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=handle.name, track=False)
+        else:
+            # 进程池工作进程与创建方共用 resource tracker，重复登记不会导致提前删除
+            shm = shared_memory.SharedMemory(name=handle.name)
+        return cls(shm, handle, owner=False)
+
+    def __len__(self) -> int:
+        return len(self.handle.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return str(symbol) in self._index
+
+    def __iter__(self):
+        return iter(self.handle.symbols)
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        return self.frame(symbol)
+
+    def __enter__(self) -> 'SharedPanel':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def symbols(self) -> Tuple[str, ...]:
+        return self.handle.symbols
+
+    def rows(self, symbol: str) -> Tuple[int, int]:
+        """标的在面板中的行区间 [起始, 结束)，不存在时抛出 KeyError"""
+        return self.handle.offsets[self._index[str(symbol)]]
+
+    def array(self, symbol: str, field: str) -> np.ndarray:
+        """单个字段的只读视图"""
+        lo, hi = self.rows(symbol)
+        return self.values[self.handle.fields.index(field), lo:hi]
+
+    def frame(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """按日期索引的只读 DataFrame 视图（不复制数据）
+
+        参数
+        - symbol: 代码
+        - start/end: 可选的日期区间（闭区间）
+        """
+        lo, hi = self.rows(symbol)
+        dates = self.dates[lo:hi]
+        if start is not None:
+            lo += int(np.searchsorted(dates, pd.Timestamp(start).value, side='left'))
+        if end is not None:
+            hi = self.rows(symbol)[0] + int(np.searchsorted(dates, pd.Timestamp(end).value, side='right'))
+        index = pd.DatetimeIndex(self.dates[lo:hi].view('M8[ns]'), name='date')
+        return pd.DataFrame(self.values[:, lo:hi].T, index=index, columns=list(self.handle.fields), copy=False)
+
+    def frames(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """多个标的的视图（默认全部）"""
+        return {s: self.frame(s) for s in (self.handle.symbols if symbols is None else symbols)}
+
+    def close(self):
+        """释放映射；所有者同时删除共享内存段"""
+        if self._shm is None:
+            return
+        self.dates = self.values = None
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            try:
+                self._shm.close()
+            except BufferError:
+                pass
+        self._shm = None
+
+
+def publish(frames: Dict[str, pd.DataFrame], fields: Optional[Sequence[str]] = None) -> SharedPanel:
+    """发布行情到共享内存（见 `SharedPanel.create`）"""
+    return SharedPanel.create(frames, fields)
+
+
+def attach(handle: PanelHandle) -> SharedPanel:
+    """连接已发布的面板（见 `SharedPanel.attach`）"""
+    return SharedPanel.attach(handle)
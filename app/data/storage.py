@@ -1,6 +1,9 @@
 """文本数据存储
 
 使用 SQLite 轻量持久化抓取到的公告与新闻文本，支持简单的关键字检索。
+
+写入时默认做近似重复检测（见 `app.nlp.dedup`）：正文与已入库文档的 MinHash 相似度不低于阈值时，
+只在 `duplicates` 表记录其 URL 等元数据并归入代表文档的簇，不再存储正文，后续 NLP 处理也只针对代表文档。
 """
 
 import sqlite3
@@ -13,12 +16,16 @@ class TextStorage:
 
     参数
     - db_path: SQLite 数据库路径，默认 `data/text.db`
+    - dedup: 是否在写入时做近似重复检测
+    - dedup_threshold: 判为近似重复的最小 Jaccard 相似度
     """
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, dedup: bool = True, dedup_threshold: float = 0.8):
         if db_path is None:
             db_path = Path(__file__).resolve().parents[2] / 'data' / 'text.db'
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
         self._init()
 
     def _init(self):
@@ -28,25 +35,80 @@ class TextStorage:
         cur.execute(
             'CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, url TEXT UNIQUE, title TEXT, published_at TEXT, content TEXT, created_at INTEGER)'
         )
+        if self.dedup:
+            from app.nlp.dedup import NearDuplicateIndex
+            index = NearDuplicateIndex(con, self.dedup_threshold)
+            # 为启用去重前已入库的文档补建索引
+            index.backfill()
         con.commit()
         con.close()
 
-    def save_documents(self, docs: List[Dict]):
+    def save_documents(self, docs: List[Dict]) -> Dict[str, int]:
         """批量保存文档
 
         参数
         - docs: 字典列表，包含 `source, url, title, published_at, content`
+
+        返回
+        - Dict：`inserted`（新文档）、`duplicates`（归入已有簇）、`skipped`（URL 已存在）的条数
         """
         con = sqlite3.connect(self.db_path)
         cur = con.cursor()
         now = int(time.time())
+        counts = {'inserted': 0, 'duplicates': 0, 'skipped': 0}
+        index = None
+        if self.dedup:
+            from app.nlp.dedup import NearDuplicateIndex, minhash
+            index = NearDuplicateIndex(con, self.dedup_threshold)
         for d in docs:
+            signature = None
+            if index is not None:
+                cur.execute('SELECT 1 FROM duplicates WHERE url = ?', (d.get('url'),))
+                if cur.fetchone():
+                    counts['skipped'] += 1
+                    continue
+                signature = minhash(d.get('content') or '')
+                match = index.lookup(signature) if signature is not None else None
+                if match is not None:
+                    cur.execute('SELECT 1 FROM documents WHERE url = ?', (d.get('url'),))
+                    if cur.fetchone():
+                        counts['skipped'] += 1
+                    else:
+                        index.add_duplicate(d, match[0], match[1], now)
+                        counts['duplicates'] += 1
+                    continue
             cur.execute(
                 'INSERT OR IGNORE INTO documents (source, url, title, published_at, content, created_at) VALUES (?,?,?,?,?,?)',
                 (d.get('source'), d.get('url'), d.get('title'), d.get('published_at'), d.get('content'), now)
             )
+            if cur.rowcount == 0:
+                counts['skipped'] += 1
+                continue
+            counts['inserted'] += 1
+            if index is not None:
+                index.add(cur.lastrowid, signature)
         con.commit()
         con.close()
+        return counts
+
+    def duplicates(self, url: str) -> List[Dict]:
+        """返回与给定文档同簇的近似重复文档（URL 可为代表文档或任一重复文档）
+
+        返回
+        - List[Dict]：包含 `source, url, title, published_at, similarity`（与代表文档的估计相似度）
+        """
+        if not self.dedup:
+            return []
+        con = sqlite3.connect(self.db_path)
+        cur = con.cursor()
+        cur.execute('SELECT id FROM documents WHERE url = ? UNION SELECT doc_id FROM duplicates WHERE url = ?', (url, url))
+        row = cur.fetchone()
+        rows = []
+        if row:
+            cur.execute('SELECT source, url, title, published_at, similarity FROM duplicates WHERE doc_id = ? ORDER BY created_at', (row[0],))
+            rows = cur.fetchall()
+        con.close()
+        return [{'source': r[0], 'url': r[1], 'title': r[2], 'published_at': r[3], 'similarity': r[4]} for r in rows]
 
     def query(self, keyword: str, limit: int = 50) -> List[Dict]:
         """关键词查询
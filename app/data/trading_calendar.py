@@ -0,0 +1,173 @@
+"""A 股交易日历与缓存过期策略
+
+交易日判定优先使用本地缓存的完整交易日列表（可通过 `TradingCalendar.load(refresh=True)` 从 akshare 拉取一次并缓存），
+否则回退到随代码分发的节假日表 `trading_holidays.json`（工作日且不在休市表中即为交易日）。默认不发起网络请求。
+
+交易时段（北京时间）：09:30-11:30、13:00-15:00。
+
+过期策略
+- ttl：写入后固定秒数过期
+- daily：日频数据在写入后的下一个收盘（加数据发布延迟）前一直有效，周末、节假日与夜间不再重复拉取
+- spot：盘中按 TTL 过期；非交易时段写入的快照在下一个开盘前一直有效
+"""
+
+import json
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+CN_TZ = timezone(timedelta(hours=8), 'Asia/Shanghai')
+SESSIONS = ((dtime(9, 30), dtime(11, 30)), (dtime(13, 0), dtime(15, 0)))
+HOLIDAYS_PATH = Path(__file__).resolve().parent / 'trading_holidays.json'
+
+# akshare 数据在收盘后一段时间才会更新
+DEFAULT_SETTLE_SECONDS = 30 * 60
+
+
+class TradingCalendar:
+    """A 股交易日历
+
+    参数
+    - holidays: 工作日休市日期
+    - trade_dates: 完整交易日列表（覆盖的年份内以此为准）
+    """
+    def __init__(self, holidays: Iterable[date] = (), trade_dates: Optional[Iterable[date]] = None):
+        self.holidays: Set[date] = set(holidays)
+        self.trade_dates: Set[date] = set(trade_dates or ())
+        self._covered_years = {d.year for d in self.trade_dates}
+
+    @classmethod
+    def load(cls, refresh: bool = False, cache=None) -> 'TradingCalendar':
+        """加载日历
+
+        参数
+        - refresh: 是否（在本地缓存缺失或过期时）从 akshare 拉取完整交易日列表
+        - cache: `CacheManager` 实例，默认项目缓存目录
+
+        返回
+        - TradingCalendar：已加载的日历；拉取失败时回退到内置节假日表
+        """
+        data = json.loads(HOLIDAYS_PATH.read_text(encoding='utf-8'))
+        holidays = [date.fromisoformat(d) for days in data['holidays'].values() for d in days]
+        trade_dates = None
+        if cache is not None or refresh:
+            if cache is None:
+                from app.cache.cache_manager import CacheManager
+                cache = CacheManager()
+            df = None
+            if refresh:
+                try:
+                    df = cache.get_or_fetch('trade_calendar', 'sina', _fetch_trade_dates, 30 * 86400)
+                except Exception:
+                    df = None
+            if df is None:
+                # ttl_seconds <= 0 时不检查过期，直接使用已有的本地缓存
+                df = cache.read('trade_calendar', 'sina', 0)
+            if df is not None and not df.empty:
+                trade_dates = _to_dates(df['trade_date'])
+        return cls(holidays, trade_dates)
+
+    def is_trading_day(self, day: date) -> bool:
+        """是否为交易日"""
+        if day.year in self._covered_years:
+            return day in self.trade_dates
+        return day.weekday() < 5 and day not in self.holidays
+
+    def next_trading_day(self, day: date, include: bool = False) -> date:
+        """下一个交易日（`include=True` 时包含当天）"""
+        d = day if include else day + timedelta(days=1)
+        while not self.is_trading_day(d):
+            d += timedelta(days=1)
+        return d
+
+    def prev_trading_day(self, day: date, include: bool = False) -> date:
+        """上一个交易日（`include=True` 时包含当天）"""
+        d = day if include else day - timedelta(days=1)
+        while not self.is_trading_day(d):
+            d -= timedelta(days=1)
+        return d
+
+    def is_open(self, moment: datetime) -> bool:
+        """给定时刻是否处于交易时段"""
+        moment = _as_cn(moment)
+        if not self.is_trading_day(moment.date()):
+            return False
+        t = moment.time()
+        return any(start <= t < end for start, end in SESSIONS)
+
+    def next_close(self, moment: datetime) -> datetime:
+        """给定时刻之后（不含）的下一个收盘时间"""
+        moment = _as_cn(moment)
+        day = moment.date()
+        close = SESSIONS[-1][1]
+        if self.is_trading_day(day) and moment.time() < close:
+            return datetime.combine(day, close, CN_TZ)
+        return datetime.combine(self.next_trading_day(day), close, CN_TZ)
+
+    def next_open(self, moment: datetime) -> datetime:
+        """给定时刻之后（不含）的下一个时段开始时间（含午后开盘）"""
+        moment = _as_cn(moment)
+        day = moment.date()
+        if self.is_trading_day(day):
+            for start, _ in SESSIONS:
+                if moment.time() < start:
+                    return datetime.combine(day, start, CN_TZ)
+        return datetime.combine(self.next_trading_day(day), SESSIONS[0][0], CN_TZ)
+
+    def expires_at(self, written_at: float, policy: str, ttl_seconds: int = 0,
+                   settle_seconds: int = DEFAULT_SETTLE_SECONDS) -> float:
+        """按策略计算缓存过期时间
+
+        参数
+        - written_at: 写入时间戳（秒）
+        - policy: 'ttl'/'daily'/'spot'
+        - ttl_seconds: ttl 与 spot（盘中）策略使用的秒数
+        - settle_seconds: daily 策略的收盘后数据发布延迟
+
+        返回
+        - float：过期时间戳（秒）
+        """
+        if policy == 'ttl':
+            return written_at + ttl_seconds
+        moment = datetime.fromtimestamp(written_at, CN_TZ)
+        if policy == 'daily':
+            # 收盘后 settle 之前写入的数据可能尚未更新，视为上一交易日的数据
+            shifted = moment - timedelta(seconds=settle_seconds)
+            return self.next_close(shifted).timestamp() + settle_seconds
+        if policy == 'spot':
+            if self.is_open(moment):
+                return written_at + ttl_seconds
+            return max(written_at + ttl_seconds, self.next_open(moment).timestamp())
+        raise ValueError(f"Unknown expiry policy: {policy}")
+
+    def expiry(self, policy: str, ttl_seconds: int = 0, settle_seconds: int = DEFAULT_SETTLE_SECONDS):
+        """返回供 `CacheManager` 使用的过期函数（写入时间戳 -> 过期时间戳）"""
+        return lambda written_at: self.expires_at(written_at, policy, ttl_seconds, settle_seconds)
+
+
+def _as_cn(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return moment.astimezone(CN_TZ)
+
+
+def _to_dates(values) -> List[date]:
+    import pandas as pd
+    return list(pd.to_datetime(values).date)
+
+
+def _fetch_trade_dates():
+    from app.data.provider import ak
+    return ak.tool_trade_date_hist_sina()
+
+
+_default: Optional[TradingCalendar] = None
+
+
+def default_calendar() -> TradingCalendar:
+    """返回进程内共享的日历（仅使用内置节假日表与已有本地缓存，不访问网络）"""
+    global _default
+    if _default is None:
+        from app.cache.cache_manager import CacheManager
+        _default = TradingCalendar.load(cache=CacheManager())
+    return _default
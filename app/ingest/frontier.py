@@ -0,0 +1,338 @@
+"""持久化抓取队列（crawl frontier）
+
+将待抓取的 URL 保存在与 `TextStorage` 同库的 `frontier` 表中，进程退出或崩溃后从库中的状态继续：
+- 状态：pending（待抓取）/ fetched（已抓取）/ failed（重试耗尽）；正在抓取的 URL 以租约标记，
+  租约过期（进程崩溃）后自动回到可领取状态
+- 优先级：数值越大越先抓取；同优先级按到期时间先后
+- 礼貌间隔：`frontier_hosts` 记录每个站点下次允许请求的时间，同一站点两次请求至少间隔 `delay` 秒
+- 失败重试：按指数退避推迟下次抓取时间，超过 `max_attempts` 次后记为 failed
+- 列表页：抓取后不结束，按 `interval` 重新排期；每次只把页面中新出现的文章链接加入队列（URL 主键去重）
+
+`FrontierCrawler` 用现有爬虫的 `fetch/parse` 驱动队列，解析结果分批写入 `TextStorage`，写入成功后才标记为已抓取，
+崩溃时最多重复抓取未提交的一批（`TextStorage` 按 URL 去重）。
+
+用法：`python -m app.ingest.frontier --listing gov https://www.csrc.gov.cn/csrc/c100028/common_list.shtml --max-pages 200`
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urldefrag, urljoin, urlsplit
+from bs4 import BeautifulSoup
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+PENDING = 'pending'
+FETCHED = 'fetched'
+FAILED = 'failed'
+ARTICLE = 'article'
+LISTING = 'listing'
+
+
+def host_of(url: str) -> str:
+    """URL 的站点（小写主机名）"""
+    return (urlsplit(url).hostname or '').lower()
+
+
+def extract_links(base_url: str, html: str, pattern: Optional[str] = None, same_host: bool = True) -> List[str]:
+    """提取页面中的文章链接
+
+    参数
+    - base_url: 页面地址（用于解析相对链接）
+    - html: 页面 HTML
+    - pattern: 只保留匹配该正则的链接
+    - same_host: 只保留与页面同站点的链接
+
+    返回
+    - List[str]：去除锚点后的绝对链接（保持页面顺序，去重）
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    regex = re.compile(pattern) if pattern else None
+    host = host_of(base_url)
+    seen, links = set(), []
+    for a in soup.find_all('a', href=True):
+        url = urldefrag(urljoin(base_url, a['href'].strip()))[0]
+        if not url.startswith(('http://', 'https://')) or url in seen:
+            continue
+        if same_host and host_of(url) != host:
+            continue
+        if regex is not None and not regex.search(url):
+            continue
+        seen.add(url)
+        links.append(url)
+    return links
+
+
+class CrawlFrontier:
+    """SQLite 抓取队列
+
+    参数
+    - db_path: 数据库路径，默认与 `TextStorage` 相同的 `data/text.db`
+    - delay: 同一站点两次请求的最小间隔（秒）
+    - max_attempts: 最大尝试次数，超过后记为 failed
+    - retry_backoff: 首次失败后的重试等待（秒），之后每次加倍
+    - lease: 领取后的租约时长（秒），超时未标记结果的 URL 可被重新领取
+    """
+    def __init__(self, db_path: Optional[Path] = None, delay: float = 1.0, max_attempts: int = 3,
+                 retry_backoff: float = 300.0, lease: float = 600.0):
+        if db_path is None:
+            db_path = Path(__file__).resolve().parents[2] / 'data' / 'text.db'
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self.con = sqlite3.connect(self.db_path, timeout=30)
+        self._init()
+
+    def _init(self):
+        """初始化数据库结构"""
+        cur = self.con.cursor()
+        # 每次领取都要提交；WAL + NORMAL 下提交不等待 fsync，进程崩溃不丢已提交的状态（仅掉电可能丢最后几次提交）
+        cur.execute('PRAGMA journal_mode=WAL')
+        cur.execute('PRAGMA synchronous=NORMAL')
+        cur.execute(
+            'CREATE TABLE IF NOT EXISTS frontier (url TEXT PRIMARY KEY, host TEXT NOT NULL, source TEXT, kind TEXT NOT NULL, '
+            'state TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_fetch_at REAL NOT NULL, leased_until REAL NOT NULL DEFAULT 0, fetched_at REAL, interval REAL, '
+            'pattern TEXT, discovered_from TEXT, error TEXT, created_at REAL)'
+        )
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_frontier_due ON frontier (state, priority DESC, next_fetch_at)')
+        cur.execute('CREATE TABLE IF NOT EXISTS frontier_hosts (host TEXT PRIMARY KEY, next_allowed_at REAL NOT NULL)')
+        self.con.commit()
+
+    def close(self):
+        self.con.close()
+
+    def add(self, urls: Iterable[str], source: str, priority: int = 0, discovered_from: Optional[str] = None) -> int:
+        """加入文章 URL（已存在的忽略），返回新加入的条数"""
+        now = time.time()
+        rows = [(u, host_of(u), source, ARTICLE, PENDING, priority, now, discovered_from, now) for u in urls]
+        with self.con:
+            before = self.con.total_changes
+            self.con.executemany(
+                'INSERT OR IGNORE INTO frontier (url, host, source, kind, state, priority, next_fetch_at, discovered_from, created_at) '
+                'VALUES (?,?,?,?,?,?,?,?,?)', rows
+            )
+            added = self.con.total_changes - before
+        if added:
+            metrics.incr('frontier_added', value=added, source=source)
+        return added
+
+    def add_listing(self, url: str, source: str, interval: float = 3600.0, pattern: Optional[str] = None,
+                    priority: int = 10):
+        """加入或更新列表页（按 interval 秒重复抓取，pattern 过滤文章链接）"""
+        now = time.time()
+        with self.con:
+            self.con.execute(
+                'INSERT INTO frontier (url, host, source, kind, state, priority, next_fetch_at, interval, pattern, created_at) '
+                'VALUES (?,?,?,?,?,?,?,?,?,?) ON CONFLICT(url) DO UPDATE SET kind = excluded.kind, source = excluded.source, '
+                'interval = excluded.interval, pattern = excluded.pattern, priority = excluded.priority',
+                (url, host_of(url), source, LISTING, PENDING, priority, now, interval, pattern, now)
+            )
+
+    def claim(self, now: Optional[float] = None) -> Optional[Dict]:
+        """领取一个到期且站点允许请求的 URL（按优先级），并预约该站点的下次请求时间
+
+        返回
+        - Dict：`url, source, kind, attempts, pattern`；当前没有可领取的 URL 时返回 None
+        """
+        now = time.time() if now is None else now
+        with self.con:
+            row = self.con.execute(
+                'SELECT f.url, f.host, f.source, f.kind, f.attempts, f.pattern FROM frontier f '
+                'LEFT JOIN frontier_hosts h ON h.host = f.host '
+                'WHERE f.state = ? AND f.next_fetch_at <= ? AND f.leased_until <= ? AND COALESCE(h.next_allowed_at, 0) <= ? '
+                'ORDER BY f.priority DESC, f.next_fetch_at LIMIT 1',
+                (PENDING, now, now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            url, host, source, kind, attempts, pattern = row
+            self.con.execute('UPDATE frontier SET leased_until = ? WHERE url = ?', (now + self.lease, url))
+            self.con.execute('INSERT OR REPLACE INTO frontier_hosts (host, next_allowed_at) VALUES (?, ?)',
+                             (host, now + self.delay))
+        return {'url': url, 'source': source, 'kind': kind, 'attempts': attempts, 'pattern': pattern}
+
+    def next_due(self) -> Optional[float]:
+        """最早可领取的时间（考虑租约与站点间隔），没有待抓取的 URL 时返回 None"""
+        row = self.con.execute(
+            'SELECT MIN(MAX(f.next_fetch_at, f.leased_until, COALESCE(h.next_allowed_at, 0))) FROM frontier f '
+            'LEFT JOIN frontier_hosts h ON h.host = f.host WHERE f.state = ?', (PENDING,)
+        ).fetchone()
+        return row[0]
+
+    def mark_fetched(self, urls: Iterable[str], now: Optional[float] = None):
+        """标记抓取成功：文章记为 fetched，列表页按间隔重新排期"""
+        now = time.time() if now is None else now
+        urls = list(urls)
+        with self.con:
+            self.con.executemany(
+                'UPDATE frontier SET state = CASE WHEN kind = ? THEN ? ELSE ? END, attempts = 0, leased_until = 0, '
+                'fetched_at = ?, error = NULL, next_fetch_at = CASE WHEN kind = ? THEN ? + COALESCE(interval, 0) ELSE next_fetch_at END '
+                'WHERE url = ?', [(LISTING, PENDING, FETCHED, now, LISTING, now, u) for u in urls]
+            )
+        metrics.incr('frontier_fetched', value=len(urls))
+
+    def mark_failed(self, url: str, error: str = '', now: Optional[float] = None):
+        """标记抓取失败：按指数退避推迟重试，尝试次数耗尽的文章记为 failed（列表页到下个周期再抓）"""
+        now = time.time() if now is None else now
+        with self.con:
+            row = self.con.execute('SELECT kind, attempts, interval FROM frontier WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return
+            kind, attempts, interval = row
+            attempts += 1
+            if attempts < self.max_attempts:
+                state, next_at = PENDING, now + self.retry_backoff * 2 ** (attempts - 1)
+            elif kind == LISTING:
+                state, next_at, attempts = PENDING, now + (interval or 0), 0
+            else:
+                state, next_at = FAILED, now
+            self.con.execute('UPDATE frontier SET state = ?, attempts = ?, next_fetch_at = ?, leased_until = 0, error = ? '
+                             'WHERE url = ?', (state, attempts, next_at, error[:500], url))
+        metrics.incr('frontier_failed')
+
+    def release_leases(self) -> int:
+        """收回全部未到期的租约（上次进程崩溃时正在抓取的 URL），返回条数"""
+        with self.con:
+            cur = self.con.execute('UPDATE frontier SET leased_until = 0 WHERE leased_until > 0')
+        return cur.rowcount
+
+    def retry_failed(self) -> int:
+        """将 failed 的 URL 重新置为待抓取，返回条数"""
+        with self.con:
+            cur = self.con.execute('UPDATE frontier SET state = ?, attempts = 0, next_fetch_at = ? WHERE state = ?',
+                                   (PENDING, time.time(), FAILED))
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的 URL 数（列表页单独计为 `listing`）"""
+        counts = {PENDING: 0, FETCHED: 0, FAILED: 0, LISTING: 0}
+        for kind, state, n in self.con.execute('SELECT kind, state, COUNT(*) FROM frontier GROUP BY kind, state'):
+            counts[LISTING if kind == LISTING else state] += n
+        return counts
+
+
+class FrontierCrawler:
+    """以抓取队列驱动爬虫并写入文本存储
+
+    参数
+    - frontier: 抓取队列
+    - storage: `TextStorage` 实例
+    - spiders: 来源 -> 提供 `fetch(url)` 与 `parse(url, html)` 的爬虫，默认 gov/news
+    - batch_size: 文档每累计多少篇写入一次存储
+    - max_wait: 下一个可领取的 URL 在该秒数内到期时等待，否则结束本轮
+    - exclusive: 同一数据库只有这一个爬虫时为 True，启动时收回上次崩溃遗留的租约，立即续跑
+    """
+    def __init__(self, frontier: CrawlFrontier, storage, spiders: Optional[Dict] = None, batch_size: int = 50,
+                 max_wait: float = 30.0, exclusive: bool = True):
+        if spiders is None:
+            from app.ingest.gov_spider import GovSpider
+            from app.ingest.news_spider import NewsSpider
+            spiders = {'gov': GovSpider(), 'news': NewsSpider()}
+        self.frontier = frontier
+        self.storage = storage
+        self.spiders = spiders
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.exclusive = exclusive
+        self.log = get_logger('frontier')
+
+    def run(self, max_pages: Optional[int] = None) -> Dict[str, int]:
+        """抓取到期的 URL，直到队列中没有在 `max_wait` 秒内到期的 URL 或达到 max_pages
+
+        返回
+        - Dict：`pages`（请求数）、`documents`（写入的文档数）、`discovered`（列表页新发现的链接数）、`failed`
+        """
+        stats = {'pages': 0, 'documents': 0, 'discovered': 0, 'failed': 0}
+        if self.exclusive:
+            released = self.frontier.release_leases()
+            if released:
+                self.log.info(f'released {released} leases left by an interrupted run')
+        docs: List[Dict] = []
+        try:
+            while max_pages is None or stats['pages'] < max_pages:
+                item = self.frontier.claim()
+                if item is None:
+                    due = self.frontier.next_due()
+                    wait = None if due is None else due - time.time()
+                    if wait is None or wait > self.max_wait:
+                        break
+                    time.sleep(max(wait, 0.0))
+                    continue
+                stats['pages'] += 1
+                self._process(item, docs, stats)
+                if len(docs) >= self.batch_size:
+                    stats['documents'] += self._flush(docs)
+        finally:
+            stats['documents'] += self._flush(docs)
+        self.log.info(f"crawl finished: {stats}, frontier {self.frontier.stats()}")
+        return stats
+
+    def _process(self, item: Dict, docs: List[Dict], stats: Dict[str, int]):
+        url = item['url']
+        spider = self.spiders.get(item['source'])
+        if spider is None:
+            self.frontier.mark_failed(url, f"no spider for source {item['source']}")
+            stats['failed'] += 1
+            return
+        html = spider.fetch(url)
+        if not html:
+            self.frontier.mark_failed(url, 'empty response')
+            stats['failed'] += 1
+            return
+        if item['kind'] == LISTING:
+            links = extract_links(url, html, item['pattern'])
+            stats['discovered'] += self.frontier.add(links, item['source'], discovered_from=url)
+            self.frontier.mark_fetched([url])
+            return
+        try:
+            docs.append(spider.parse(url, html))
+        except Exception as e:
+            self.frontier.mark_failed(url, f'parse error: {e}')
+            stats['failed'] += 1
+
+    def _flush(self, docs: List[Dict]) -> int:
+        """写入存储后再标记已抓取，保证崩溃时不丢文档"""
+        if not docs:
+            return 0
+        self.storage.save_documents(docs)
+        self.frontier.mark_fetched([d['url'] for d in docs])
+        n = len(docs)
+        docs.clear()
+        return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl announcements and news from a persistent frontier")
+    parser.add_argument("--db", type=str, default=None, help="数据库路径，默认 data/text.db")
+    parser.add_argument("--listing", nargs=2, action="append", default=[], metavar=("SOURCE", "URL"), help="列表页（可重复）")
+    parser.add_argument("--url", nargs=2, action="append", default=[], metavar=("SOURCE", "URL"), help="文章页（可重复）")
+    parser.add_argument("--interval", type=float, default=3600.0, help="列表页重抓间隔（秒）")
+    parser.add_argument("--pattern", type=str, default=None, help="列表页文章链接的正则")
+    parser.add_argument("--delay", type=float, default=1.0, help="同站点请求间隔（秒）")
+    parser.add_argument("--max-pages", type=int, default=None, help="本次最多请求的页面数")
+    parser.add_argument("--retry-failed", action="store_true", help="重试此前失败的 URL")
+    args = parser.parse_args()
+
+    from app.data.storage import TextStorage
+    storage = TextStorage(args.db)
+    frontier = CrawlFrontier(storage.db_path, delay=args.delay)
+    for source, url in args.listing:
+        frontier.add_listing(url, source, args.interval, args.pattern)
+    for source, url in args.url:
+        frontier.add([url], source)
+    if args.retry_failed:
+        frontier.retry_failed()
+    stats = FrontierCrawler(frontier, storage).run(args.max_pages)
+    print(f"{stats}, frontier {frontier.stats()}")
+    frontier.close()
+
+
+if __name__ == "__main__":
+    main()
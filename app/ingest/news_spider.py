@@ -9,6 +9,7 @@ from typing import List, Dict
 import requests
 from bs4 import BeautifulSoup
 from app.nlp.clean import clean_html
+from app.utils.metrics import metrics
 
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
 
@@ -18,6 +19,7 @@ class NewsSpider:
     def __init__(self):
         self.headers = HEADERS
 
+    @metrics.timed('http_fetch', source='news')
     def fetch(self, url: str, timeout: int = 10) -> str:
         for i in range(3):
             try:
@@ -28,6 +30,7 @@ class NewsSpider:
                 time.sleep(2 ** i)
         return ''
 
+    @metrics.timed('html_parse', source='news')
     def parse(self, url: str, html: str) -> Dict:
         soup = BeautifulSoup(html, 'lxml')
         title = soup.title.text.strip() if soup.title else ''
@@ -44,6 +47,7 @@ class NewsSpider:
                 items.append(self.parse(u, html))
         return items
 
+@metrics.timed('http_fetch', source='news')
 def fetch(url: str, timeout: int = 10) -> str:
     """抓取页面 HTML（含指数退避重试）"""
     for i in range(3):
@@ -55,6 +59,7 @@ def fetch(url: str, timeout: int = 10) -> str:
             time.sleep(2 ** i)
     return ''
 
+@metrics.timed('html_parse', source='news')
 def parse(url: str, html: str) -> Dict:
     """解析标题、正文与发布日期并结构化输出"""
     soup = BeautifulSoup(html, 'lxml')
@@ -0,0 +1,433 @@
+"""LLM 研究连接器
+
+把技术信号与 `TextStorage` 中的相关文档组装为提示词，经可替换的后端调用大模型，并保证相同输入不会发送两次：
+- 响应缓存：以 模板指纹（名称 + 版本 + 模板文本）+ 输入 + 模型 + 调用参数 的 sha256 为键，持久化在 `data/llm_cache.db`
+- 合并：同一批请求中的相同输入只请求一次；并发调用中正在请求的相同键等待同一结果
+- 批处理：未命中的提示词按后端的 `max_batch` 分批，一次调用处理一批
+- 并发与预算：最多 `max_concurrency` 个批次同时请求；`TokenBudget` 在发送前按估算预留 token，超出预算的批次不发送
+
+后端
+- stub：本地确定性后端（按提示词哈希生成回复并模拟延迟），离线运行整条流水线与基准
+- openai：OpenAI 兼容的 Chat Completions 接口（`TURTLE_LLM_BASE_URL`/`TURTLE_LLM_API_KEY`/`TURTLE_LLM_MODEL`）
+默认后端由环境变量 `TURTLE_LLM_BACKEND` 选择（默认 stub）。
+
+请求失败或预算不足的条目返回 None，并计数 `llm_error`/`llm_budget_rejected`，不写入缓存。
+
+用法：`python -m app.llm.connector --signals signals.json [--backend stub]`（信号文件为守护进程 `/signals` 的输出）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+ENV_BACKEND = 'TURTLE_LLM_BACKEND'
+ENV_BASE_URL = 'TURTLE_LLM_BASE_URL'
+ENV_API_KEY = 'TURTLE_LLM_API_KEY'
+ENV_MODEL = 'TURTLE_LLM_MODEL'
+
+_CJK = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：汉字各计 1 个，其余字符约 4 个 1 个"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class PromptTemplate:
+    """提示词模板（`str.format` 语法）
+
+    参数
+    - name: 模板名称
+    - text: 模板文本
+    - version: 版本号（参与缓存键；模板文本不变但希望旧回复失效时递增）
+    """
+    def __init__(self, name: str, text: str, version: str = '1'):
+        self.name = name
+        self.text = text
+        self.version = version
+        self.fingerprint = hashlib.sha256(f'{name}\0{version}\0{text}'.encode('utf-8')).hexdigest()
+
+    def render(self, inputs: Dict) -> str:
+        return self.text.format(**inputs)
+
+
+def cache_key(template: PromptTemplate, inputs: Dict, model: str, params: Optional[Dict] = None) -> str:
+    """响应缓存键：模板指纹 + 输入 + 模型 + 调用参数的 sha256（输入按键排序序列化，与字典顺序无关）"""
+    payload = json.dumps({'template': template.fingerprint, 'inputs': inputs, 'model': model, 'params': params or {}},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TokenBudget:
+    """线程安全的 token 预算
+
+    发送前按估算 `reserve`，完成后以实际用量 `settle`（失败时实际用量为 0，预留全部退回）。
+    预算暂时不足而仍有在途预留时等待其结算后再判断，只有在途预留全部结算后仍不足才拒绝。
+
+    参数
+    - limit: 总预算（None 表示不限）
+    """
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.used = 0
+        self.reserved = 0
+        self._cond = threading.Condition()
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.limit is None:
+            return None
+        with self._cond:
+            return self.limit - self.used - self.reserved
+
+    def reserve(self, tokens: int) -> bool:
+        with self._cond:
+            if self.limit is None:
+                self.reserved += tokens
+                return True
+            while self.used + self.reserved + tokens > self.limit:
+                if not self.reserved or self.used + tokens > self.limit:
+                    return False
+                self._cond.wait()
+            self.reserved += tokens
+            return True
+
+    def settle(self, reserved: int, actual: int):
+        with self._cond:
+            self.reserved -= reserved
+            self.used += actual
+            self._cond.notify_all()
+
+
+class ResponseCache:
+    """持久化响应缓存（SQLite）
+
+    参数
+    - db_path: 数据库路径，默认 `data/llm_cache.db`
+    """
+    def __init__(self, db_path: Optional[Path] = None):
+        if db_path is None:
+            db_path = Path(__file__).resolve().parents[2] / 'data' / 'llm_cache.db'
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._con.execute('PRAGMA journal_mode=WAL')
+        self._con.execute('PRAGMA synchronous=NORMAL')
+        self._con.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, template TEXT, model TEXT, response TEXT, '
+            'prompt_tokens INTEGER, completion_tokens INTEGER, created_at INTEGER)'
+        )
+        self._con.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """批量查找，返回命中的 键 -> 回复"""
+        out = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                marks = ','.join('?' * len(chunk))
+                out.update(self._con.execute(f'SELECT key, response FROM responses WHERE key IN ({marks})', chunk))
+        return out
+
+    def put_many(self, rows: Sequence[tuple]):
+        """写入 (key, template, model, response, prompt_tokens, completion_tokens)"""
+        now = int(time.time())
+        with self._lock:
+            self._con.executemany('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                  [(*row, now) for row in rows])
+            self._con.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n, prompt, completion = self._con.execute(
+                'SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) FROM responses'
+            ).fetchone()
+        return {'entries': n, 'prompt_tokens': prompt, 'completion_tokens': completion}
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+class StubBackend:
+    """本地确定性后端
+
+    回复由提示词哈希决定（同一提示词总是得到同一回复），每次调用按 `latency + per_prompt * 批大小` 休眠以模拟网络与推理耗时。
+
+    参数
+    - latency: 每次调用的固定耗时（秒）
+    - per_prompt: 批内每条提示词的附加耗时（秒）
+    - max_batch: 单次调用的最大提示词数
+    """
+    def __init__(self, latency: float = 0.2, per_prompt: float = 0.01, max_batch: int = 16, model: str = 'stub'):
+        self.latency = latency
+        self.per_prompt = per_prompt
+        self.max_batch = max_batch
+        self.model = model
+        self.calls = 0
+        self.prompts = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompts: List[str], max_tokens: int = 256, **params) -> List[Dict]:
+        with self._lock:
+            self.calls += 1
+            self.prompts += len(prompts)
+        time.sleep(self.latency + self.per_prompt * len(prompts))
+        out = []
+        for prompt in prompts:
+            digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+            stance = ('看多', '中性', '看空')[int(digest[:8], 16) % 3]
+            text = f'[{self.model}] {stance}：{prompt.splitlines()[0][:60]}（{digest[:12]}）'
+            out.append({'text': text, 'prompt_tokens': estimate_tokens(prompt),
+                        'completion_tokens': min(estimate_tokens(text), max_tokens)})
+        return out
+
+
+class OpenAIBackend:
+    """OpenAI 兼容的 Chat Completions 后端（每次调用一条提示词）
+
+    参数
+    - base_url: 接口地址（默认环境变量 `TURTLE_LLM_BASE_URL` 或 `https://api.openai.com/v1`）
+    - api_key: 密钥（默认环境变量 `TURTLE_LLM_API_KEY`）
+    - model: 模型名（默认环境变量 `TURTLE_LLM_MODEL`）
+    - timeout: 请求超时（秒）
+    """
+    max_batch = 1
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, model: Optional[str] = None,
+                 timeout: float = 60.0):
+        self.base_url = (base_url or os.environ.get(ENV_BASE_URL) or 'https://api.openai.com/v1').rstrip('/')
+        self.api_key = api_key or os.environ.get(ENV_API_KEY)
+        self.model = model or os.environ.get(ENV_MODEL) or 'gpt-4o-mini'
+        self.timeout = timeout
+        if not self.api_key:
+            raise ValueError(f"API key required: pass api_key or set {ENV_API_KEY}")
+
+    @metrics.timed('http_fetch', source='llm')
+    def complete(self, prompts: List[str], max_tokens: int = 256, temperature: float = 0.0, **params) -> List[Dict]:
+        import requests
+        out = []
+        for prompt in prompts:
+            r = requests.post(f'{self.base_url}/chat/completions', timeout=self.timeout,
+                              headers={'Authorization': f'Bearer {self.api_key}'},
+                              json={'model': self.model, 'messages': [{'role': 'user', 'content': prompt}],
+                                    'max_tokens': max_tokens, 'temperature': temperature, **params})
+            r.raise_for_status()
+            body = r.json()
+            usage = body.get('usage') or {}
+            text = body['choices'][0]['message']['content']
+            out.append({'text': text, 'prompt_tokens': usage.get('prompt_tokens', estimate_tokens(prompt)),
+                        'completion_tokens': usage.get('completion_tokens', estimate_tokens(text))})
+        return out
+
+
+def make_backend(name: Optional[str] = None):
+    """按名称创建后端（'stub'/'openai'，默认环境变量 `TURTLE_LLM_BACKEND` 或 stub）"""
+    name = (name or os.environ.get(ENV_BACKEND) or 'stub').lower()
+    if name == 'stub':
+        return StubBackend()
+    if name == 'openai':
+        return OpenAIBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+class LLMConnector:
+    """带缓存、合并、批处理与预算控制的 LLM 调用器
+
+    参数
+    - backend: 后端实例（需提供 `model`、`max_batch` 与 `complete(prompts, **params)`）
+    - cache: 响应缓存（默认 `data/llm_cache.db`，由连接器关闭；传入的实例由调用方关闭；False 关闭缓存）
+    - max_concurrency: 同时进行的后端调用数
+    - budget: token 预算（`TokenBudget` 或整数上限，None 表示不限）
+    - params: 传给后端的调用参数（参与缓存键），如 `max_tokens`、`temperature`
+    """
+    def __init__(self, backend=None, cache=None, max_concurrency: int = 4, budget=None, params: Optional[Dict] = None):
+        self.backend = backend if backend is not None else make_backend()
+        self._owns_cache = cache is None
+        self.cache = ResponseCache() if cache is None else (cache or None)
+        self.max_concurrency = max_concurrency
+        self.budget = budget if isinstance(budget, TokenBudget) else TokenBudget(budget)
+        self.params = {'max_tokens': 256, **(params or {})}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'sent': 0, 'calls': 0, 'errors': 0,
+                      'budget_rejected': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self.log = get_logger('llm')
+        self._executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix='llm')
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, template: PromptTemplate, inputs: Sequence[Dict]) -> List[Optional[str]]:
+        """批量请求
+
+        参数
+        - template: 提示词模板
+        - inputs: 每条请求的模板输入
+
+        返回
+        - List：与 inputs 对齐的回复文本（失败或超出预算时为 None）
+        """
+        keys = [cache_key(template, item, self.backend.model, self.params) for item in inputs]
+        unique = dict(zip(keys, inputs))
+        self._count(requests=len(keys), coalesced=len(keys) - len(unique))
+        results = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        self._count(cache_hits=len(results))
+        metrics.incr('llm_cache_hit', value=len(results))
+
+        prompts = {key: template.render(item) for key, item in unique.items() if key not in results}
+        waiting: Dict[str, Future] = {}
+        todo = []
+        with self._lock:
+            for key, prompt in prompts.items():
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    todo.append((key, prompt))
+                else:
+                    self.stats['coalesced'] += 1
+                waiting[key] = future
+
+        batch = max(1, getattr(self.backend, 'max_batch', 1))
+        for i in range(0, len(todo), batch):
+            self._executor.submit(self._send, template, todo[i:i + batch])
+        for key, future in waiting.items():
+            results[key] = future.result()
+        return [results.get(key) for key in keys]
+
+    def _send(self, template: PromptTemplate, items: List[tuple]):
+        """发送一批提示词，写入缓存并完成对应的 Future（任何失败都以 None 完成，等待方不会挂起）"""
+        keys = [key for key, _ in items]
+        texts = [None] * len(items)
+        try:
+            texts = self._complete(template, items)
+        except Exception as e:
+            self._count(errors=len(items))
+            metrics.incr('llm_error', value=len(items))
+            self.log.warning(f'llm batch of {len(items)} failed: {e}')
+        finally:
+            with self._lock:
+                futures = [self._inflight.pop(key) for key in keys]
+            for future, text in zip(futures, texts):
+                future.set_result(text)
+
+    def _complete(self, template: PromptTemplate, items: List[tuple]) -> List[Optional[str]]:
+        prompts = [prompt for _, prompt in items]
+        estimate = sum(estimate_tokens(p) for p in prompts) + self.params.get('max_tokens', 0) * len(prompts)
+        if not self.budget.reserve(estimate):
+            self._count(budget_rejected=len(items))
+            metrics.incr('llm_budget_rejected', value=len(items))
+            return [None] * len(items)
+        actual = 0
+        try:
+            with metrics.timer('llm_call', model=self.backend.model):
+                replies = self.backend.complete(prompts, **self.params)
+            prompt_tokens = sum(r['prompt_tokens'] for r in replies)
+            completion_tokens = sum(r['completion_tokens'] for r in replies)
+            actual = prompt_tokens + completion_tokens
+        finally:
+            self.budget.settle(estimate, actual)
+        if len(replies) != len(prompts):
+            # 回复与提示词按位置对应，数量不符时无法确定归属，整批按失败处理
+            raise ValueError(f'backend returned {len(replies)} replies for {len(prompts)} prompts')
+        self._count(sent=len(items), calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if self.cache is not None:
+            self.cache.put_many([(key, template.name, self.backend.model, r['text'], r['prompt_tokens'],
+                                  r['completion_tokens']) for (key, _), r in zip(items, replies)])
+        return [r['text'] for r in replies]
+
+    def _count(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                self.stats[name] += value
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._owns_cache:
+            self.cache.close()
+
+
+RESEARCH_TEMPLATE = PromptTemplate('signal_research', '''可转债 {symbol} 研判
+技术信号：{signal}（{date}，收盘 {close}，ATR {atr}，持仓 {position}，最近信号 {last_signal} @ {last_signal_date}）
+相关资讯：
+{documents}
+请结合技术信号与资讯，给出看多/中性/看空的判断与不超过三条理由。''')
+
+
+def research_inputs(signal: Dict, storage=None, docs: int = 5) -> Dict:
+    """由单个标的的最新信号（`SignalDaemon` 的 `/signals/<symbol>` 输出）与相关文档组装模板输入
+
+    参数
+    - signal: 信号字典（`symbol/date/signal/close/atr/position/last_signal/last_signal_date`）
+    - storage: `TextStorage` 实例，按代码检索相关文档；None 时不附带文档
+    - docs: 附带的文档数上限
+
+    返回
+    - Dict：`RESEARCH_TEMPLATE` 的输入（文档列表按 URL 排序，相同文档集合得到相同缓存键）
+    """
+    found = storage.query(signal['symbol'], limit=docs) if storage is not None else []
+    found = sorted(found, key=lambda d: d['url'] or '')
+    lines = [f"- {d['published_at'] or ''} {d['title'] or ''} ({d['url']})" for d in found]
+    inputs = {name: signal.get(name) for name in ('symbol', 'date', 'signal', 'close', 'atr', 'position',
+                                                   'last_signal', 'last_signal_date')}
+    inputs['documents'] = '\n'.join(lines) or '（无）'
+    return inputs
+
+
+_connector: Optional[LLMConnector] = None
+
+
+def _get_connector() -> LLMConnector:
+    global _connector
+    if _connector is None:
+        _connector = LLMConnector()
+    return _connector
+
+
+def research(signals: Dict[str, Dict], storage=None, docs: int = 5) -> Dict[str, Optional[str]]:
+    """对多个标的批量研判（共享连接器与默认缓存）
+
+    参数
+    - signals: 代码 -> 最新信号字典
+    - storage: `TextStorage` 实例
+    - docs: 每个标的附带的文档数上限
+
+    返回
+    - Dict：代码 -> 回复文本（失败或超出预算时为 None）
+    """
+    symbols = list(signals)
+    inputs = [research_inputs(signals[s], storage, docs) for s in symbols]
+    return dict(zip(symbols, _get_connector().run(RESEARCH_TEMPLATE, inputs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM research connector")
+    parser.add_argument("--signals", type=str, required=True, help="信号 JSON（代码 -> 信号字典）")
+    parser.add_argument("--backend", type=str, default=None, choices=["stub", "openai"], help="后端")
+    parser.add_argument("--db", type=str, default=None, help="文本库路径（默认 data/text.db）")
+    parser.add_argument("--docs", type=int, default=5, help="每个标的附带的文档数")
+    parser.add_argument("--budget", type=int, default=None, help="token 预算")
+    args = parser.parse_args()
+
+    from app.data.storage import TextStorage
+    global _connector
+    _connector = LLMConnector(make_backend(args.backend), budget=args.budget)
+    signals = json.loads(Path(args.signals).read_text(encoding='utf-8'))
+    results = research(signals, TextStorage(args.db, dedup=False), args.docs)
+    for symbol, text in results.items():
+        print(f'{symbol}: {text}')
+    print(json.dumps(_connector.stats, ensure_ascii=False))
+    _connector.close()
+
+
+if __name__ == "__main__":
+    main()
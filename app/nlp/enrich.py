@@ -0,0 +1,337 @@
+"""文本富化：分词、关键词、标签与情感
+
+从 `TextStorage` 的 `documents` 表按 id 分批读取尚未处理的文档，在进程池中完成
+- 分词：安装了 jieba 时使用 jieba；否则按内置词表正向最大匹配，未登录的汉字串按双字切分
+- 关键词：词频 × 词长加权（jieba 可用时使用 `jieba.analyse.extract_tags`），过滤停用词与单字
+- 标签：按主题词表匹配（可转债、监管、融资等）
+- 情感：词典法，否定词翻转紧随其后的情感词，得分为 (正面 - 负面) / (正面 + 负面)，取值 [-1, 1]
+结果批量写回同库的 `enrichment` 表。
+
+增量：`nlp_watermark` 记录已处理的最大文档 id，每批结果与水位在同一事务中提交，
+中断后重新运行从水位之后继续。近似重复文档只记录在 `duplicates` 表，不会被重复处理。
+
+用法：`python -m app.nlp.enrich [--db data/text.db] [--batch-size 500] [--workers 4]`
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+# 修改分词、词表或打分口径时递增，`run(reprocess=True)` 重新处理全部文档
+ENRICH_VERSION = '1'
+WATERMARK = 'enrich'
+
+POSITIVE = ('上涨', '增长', '利好', '盈利', '突破', '回升', '提振', '改善', '稳健', '超预期', '增持', '创新高', '优化',
+            '受益', '强劲', '扩大', '复苏', '回暖', '大涨', '涨停', '走强', '向好', '支持', '收益')
+NEGATIVE = ('下跌', '下滑', '亏损', '利空', '风险', '违约', '处罚', '暴跌', '减持', '退市', '下降', '萎缩', '承压', '低迷',
+            '警示', '违规', '调查', '跌停', '拖累', '担忧', '收紧', '放缓', '走弱', '爆雷')
+NEGATORS = ('不', '未', '没有', '无', '非', '并未', '难以', '尚未')
+
+TAG_RULES: Dict[str, Tuple[str, ...]] = {
+    '可转债': ('可转债', '转债', '转股', '强赎', '下修'),
+    '监管': ('监管', '证监会', '交易所', '处罚', '问询', '违规'),
+    '融资': ('融资', '发行', '募集', '增发', '配股'),
+    '货币政策': ('降息', '降准', '利率', '央行', '流动性'),
+    '业绩': ('业绩', '营收', '净利润', '盈利', '亏损', '预告'),
+    '风险': ('风险', '违约', '退市', '爆雷', '警示'),
+}
+
+_DOMAIN = ('市场', '公告', '指数', '资金', '投资者', '政策', '股票', '债券', '基金', '银行', '证券', '公司', '行业',
+           '经济', '价格', '交易', '利率', '上市', '评级', '规模', '同比', '环比')
+# 内置词表含否定词与以否定字开头的常用词，避免“不断”“无论”被拆开后误判为否定
+_LEXICON = frozenset(POSITIVE + NEGATIVE + NEGATORS + _DOMAIN + tuple(t for terms in TAG_RULES.values() for t in terms)
+                     + ('不断', '不少', '不过', '无论', '非常', '未来'))
+_SIZES = sorted({len(w) for w in _LEXICON if len(w) > 1}, reverse=True)
+_FIRST = frozenset(w[0] for w in _LEXICON)
+
+STOPWORDS = frozenset(('的', '了', '和', '是', '在', '与', '及', '对', '将', '等', '为', '也', '就', '都', '而', '或', '但',
+                       '其', '该', '已', '被', '由', '从', '向', '以', '于', '这', '那', '一个', '我们', '表示', '进行',
+                       '相关', '方面', '有关', '以及', '目前', '其中', '通过'))
+
+# 单字停用词在未登录串中作为分隔
+_SEPARATORS = frozenset(w for w in STOPWORDS if len(w) == 1)
+
+_RUNS = re.compile(r'[一-鿿]+|[A-Za-z][A-Za-z0-9.\-]*|\d+(?:\.\d+)?%?')
+_CJK = re.compile(r'[一-鿿]')
+_POS, _NEG, _NOT = frozenset(POSITIVE), frozenset(NEGATIVE), frozenset(NEGATORS)
+
+
+def _jieba():
+    """返回 jieba 模块；未安装时返回 None"""
+    try:
+        import jieba
+    except ImportError:
+        return None
+    jieba.setLogLevel(60)
+    return jieba
+
+
+def segmenter_name() -> str:
+    """当前使用的分词器（写入结果，便于区分口径）"""
+    return 'jieba' if _jieba() is not None else 'builtin'
+
+
+def _max_match(run: str) -> List[str]:
+    """正向最大匹配；未登录的连续汉字（以单字停用词分隔）不超过 4 个时整体保留，否则按双字切分"""
+    tokens, pending = [], []
+
+    def flush():
+        if not pending:
+            return
+        text = ''.join(pending)
+        if len(text) <= 4:
+            tokens.append(text)
+        else:
+            tokens.extend(text[i:i + 2] for i in range(0, len(text), 2))
+        pending.clear()
+
+    i = 0
+    while i < len(run):
+        char = run[i]
+        if char in _FIRST:
+            word = next((run[i:i + size] for size in _SIZES if run[i:i + size] in _LEXICON), None)
+            if word is not None or char in _LEXICON:
+                flush()
+                word = word or char
+                tokens.append(word)
+                i += len(word)
+                continue
+        if char in _SEPARATORS:
+            flush()
+            tokens.append(char)
+        else:
+            pending.append(char)
+        i += 1
+    flush()
+    return tokens
+
+
+def segment(text: str) -> List[str]:
+    """分词，返回词语列表（不含空白与标点）"""
+    jieba = _jieba()
+    if jieba is not None:
+        return [t for t in jieba.lcut(text or '') if t.strip() and _RUNS.match(t)]
+    tokens = []
+    for m in _RUNS.finditer(text or ''):
+        run = m.group()
+        tokens.extend(_max_match(run) if _CJK.match(run) else [run])
+    return tokens
+
+
+def keywords(tokens: Iterable[str], text: Optional[str] = None, topk: int = 10) -> List[str]:
+    """按 词频 × 词长 取前 topk 个关键词（jieba 可用且给出原文时使用 TF-IDF）"""
+    jieba = _jieba() if text is not None else None
+    if jieba is not None:
+        import jieba.analyse
+        return jieba.analyse.extract_tags(text, topK=topk)
+    counts = collections.Counter(t for t in tokens if len(t) > 1 and t not in STOPWORDS and not t[0].isdigit())
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1] * min(len(kv[0]), 4), kv[0]))
+    return [t for t, _ in ranked[:topk]]
+
+
+def tags(text: str) -> List[str]:
+    """命中主题词表的标签"""
+    return [tag for tag, terms in TAG_RULES.items() if any(t in text for t in terms)]
+
+
+def sentiment(tokens: List[str]) -> float:
+    """词典法情感得分，取值 [-1, 1]，无情感词时为 0"""
+    pos = neg = 0
+    for i, token in enumerate(tokens):
+        if token in _POS or token in _NEG:
+            positive = token in _POS
+            if i > 0 and tokens[i - 1] in _NOT:
+                positive = not positive
+            if positive:
+                pos += 1
+            else:
+                neg += 1
+    return 0.0 if pos + neg == 0 else (pos - neg) / (pos + neg)
+
+
+def enrich_text(text: str, topk: int = 10) -> Dict:
+    """单篇文档的富化结果：`tokens`（词数）、`keywords`、`tags`、`sentiment`"""
+    text = text or ''
+    tokens = segment(text)
+    return {'tokens': len(tokens), 'keywords': keywords(tokens, text, topk), 'tags': tags(text),
+            'sentiment': round(sentiment(tokens), 4)}
+
+
+def enrich_batch(rows: List[Tuple[int, str]], topk: int = 10) -> List[Tuple]:
+    """进程池任务：一批 (doc_id, content) -> `enrichment` 表的行"""
+    name = segmenter_name()
+    out = []
+    for doc_id, content in rows:
+        r = enrich_text(content, topk)
+        out.append((doc_id, r['tokens'], json.dumps(r['keywords'], ensure_ascii=False),
+                    json.dumps(r['tags'], ensure_ascii=False), r['sentiment'], name, ENRICH_VERSION))
+    return out
+
+
+class EnrichmentPipeline:
+    """增量文本富化
+
+    参数
+    - db_path: `TextStorage` 的数据库路径，默认 `data/text.db`
+    - batch_size: 每批读取与写回的文档数
+    - workers: 进程数，默认 CPU 核数；1 时在当前进程内执行
+    - topk: 每篇文档保留的关键词数
+    """
+    def __init__(self, db_path: Optional[Path] = None, batch_size: int = 500, workers: Optional[int] = None,
+                 topk: int = 10):
+        if db_path is None:
+            db_path = Path(__file__).resolve().parents[2] / 'data' / 'text.db'
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.topk = topk
+        self.log = get_logger('enrich')
+        self._init()
+
+    def _init(self):
+        con = sqlite3.connect(self.db_path)
+        cur = con.cursor()
+        cur.execute(
+            'CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, url TEXT UNIQUE, title TEXT, published_at TEXT, content TEXT, created_at INTEGER)'
+        )
+        cur.execute(
+            'CREATE TABLE IF NOT EXISTS enrichment (doc_id INTEGER PRIMARY KEY, tokens INTEGER, keywords TEXT, tags TEXT, '
+            'sentiment REAL, segmenter TEXT, version TEXT, processed_at INTEGER)'
+        )
+        cur.execute('CREATE TABLE IF NOT EXISTS nlp_watermark (name TEXT PRIMARY KEY, last_id INTEGER NOT NULL, updated_at INTEGER)')
+        con.commit()
+        con.close()
+
+    def watermark(self) -> int:
+        """已处理的最大文档 id"""
+        con = sqlite3.connect(self.db_path)
+        row = con.execute('SELECT last_id FROM nlp_watermark WHERE name = ?', (WATERMARK,)).fetchone()
+        con.close()
+        return row[0] if row else 0
+
+    def _batches(self, con: sqlite3.Connection, after: int, limit: Optional[int]):
+        """按 id 升序分批读取水位之后的文档"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            rows = con.execute('SELECT id, content FROM documents WHERE id > ? ORDER BY id LIMIT ?', (after, size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _write(self, con: sqlite3.Connection, results: List[Tuple], last_id: int):
+        """批量写回结果并推进水位（同一事务）"""
+        now = int(time.time())
+        with con:
+            con.executemany(
+                'INSERT OR REPLACE INTO enrichment (doc_id, tokens, keywords, tags, sentiment, segmenter, version, processed_at) '
+                'VALUES (?,?,?,?,?,?,?,?)', [r + (now,) for r in results]
+            )
+            con.execute('INSERT OR REPLACE INTO nlp_watermark (name, last_id, updated_at) VALUES (?,?,?)',
+                        (WATERMARK, last_id, now))
+        metrics.incr('enrich_docs', value=len(results))
+
+    def run(self, limit: Optional[int] = None, reprocess: bool = False) -> Dict:
+        """处理水位之后的新文档
+
+        参数
+        - limit: 本次最多处理的文档数
+        - reprocess: 从头重新处理全部文档（口径变化后使用）
+
+        返回
+        - Dict：`processed`（文档数）、`batches`、`elapsed`（秒）、`docs_per_sec`、`watermark`
+        """
+        con = sqlite3.connect(self.db_path)
+        if reprocess:
+            with con:
+                con.execute('DELETE FROM nlp_watermark WHERE name = ?', (WATERMARK,))
+        row = con.execute('SELECT last_id FROM nlp_watermark WHERE name = ?', (WATERMARK,)).fetchone()
+        last_id = row[0] if row else 0
+        processed = batches = 0
+        t0 = time.perf_counter()
+        batch_iter = self._batches(con, last_id, limit)
+        if self.workers == 1:
+            results_iter = ((rows, enrich_batch(rows, self.topk)) for rows in batch_iter)
+        else:
+            results_iter = self._parallel(batch_iter)
+        try:
+            for rows, results in results_iter:
+                last_id = rows[-1][0]
+                self._write(con, results, last_id)
+                processed += len(rows)
+                batches += 1
+        finally:
+            results_iter.close()
+            con.close()
+        elapsed = time.perf_counter() - t0
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        if processed:
+            self.log.info(f'enriched {processed} documents in {elapsed:.2f}s: {rate:,.0f} docs/sec')
+        return {'processed': processed, 'batches': batches, 'elapsed': elapsed, 'docs_per_sec': rate,
+                'watermark': last_id}
+
+    def _parallel(self, batch_iter):
+        """在进程池中处理各批，按读取顺序产出结果（水位只能顺序推进）"""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            inflight = collections.deque()
+            # 在途批数为进程数的两倍，兼顾并行度与内存
+            for rows in batch_iter:
+                inflight.append((rows, pool.submit(enrich_batch, rows, self.topk)))
+                if len(inflight) >= self.workers * 2:
+                    rows, fut = inflight.popleft()
+                    yield rows, fut.result()
+            while inflight:
+                rows, fut = inflight.popleft()
+                yield rows, fut.result()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """返回文档的富化结果（URL 为近似重复文档时返回其代表文档的结果）"""
+        con = sqlite3.connect(self.db_path)
+        cur = con.cursor()
+        cur.execute('SELECT id FROM documents WHERE url = ?', (url,))
+        row = cur.fetchone()
+        if row is None:
+            try:
+                cur.execute('SELECT doc_id FROM duplicates WHERE url = ?', (url,))
+                row = cur.fetchone()
+            except sqlite3.OperationalError:
+                row = None
+        result = None
+        if row is not None:
+            cur.execute('SELECT tokens, keywords, tags, sentiment FROM enrichment WHERE doc_id = ?', (row[0],))
+            found = cur.fetchone()
+            if found:
+                result = {'tokens': found[0], 'keywords': json.loads(found[1]), 'tags': json.loads(found[2]),
+                          'sentiment': found[3]}
+        con.close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrich stored documents with keywords, tags and sentiment")
+    parser.add_argument("--db", type=str, default=None, help="数据库路径，默认 data/text.db")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批文档数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多处理的文档数")
+    parser.add_argument("--reprocess", action="store_true", help="从头重新处理")
+    args = parser.parse_args()
+    pipeline = EnrichmentPipeline(args.db, args.batch_size, args.workers)
+    stats = pipeline.run(args.limit, args.reprocess)
+    print(f"processed {stats['processed']} documents in {stats['batches']} batches, "
+          f"{stats['docs_per_sec']:,.0f} docs/sec, watermark {stats['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
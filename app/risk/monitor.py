@@ -0,0 +1,199 @@
+"""流式风险监控
+
+逐 tick/K线消费若干条权益（或持仓市值、价格）序列，每次更新以 O(1) 维护每条序列的运行状态：
+- 历史峰值与当前回撤 `1 - value / peak`
+- EWMA 已实现波动率：`var = λ·var + (1-λ)·r²`，λ 由半衰期换算；首个收益直接取 r²，与 `ewm(alpha=1-λ, adjust=False)` 一致，按年化换算
+
+由状态给出仓位缩放系数，供 `TurtleStrategy.generate_signals(risk_scale=...)` 调整单位大小：
+- 波动率目标：`target_vol / 年化波动率`，截断到 `[0, max_scale]`，样本不足 `min_periods` 时为 1
+- 回撤减仓：回撤从 `soft_drawdown` 到 `max_drawdown` 线性降到 0
+- 停止交易：回撤达到 `max_drawdown` 时进入停止状态（系数为 0），回撤收窄到 `resume_drawdown` 以下才恢复
+
+全部状态为长度 n 的 NumPy 数组，一次 `update` 对全部序列向量化推进，数千个持仓每 tick 的开销为微秒级；
+缺失值（停牌、未建仓）对应的序列保持原状态不变。
+
+策略接入：`strategy_risk_scale` 按策略未缩放运行的逐K线盯市权益（以收盘价成交，数量为 `unit_size`）推进监控，
+得到可直接传给 `generate_signals(risk_scale=...)` 的逐K线系数；即按策略自身的理论权益曲线决定减仓与停止交易。
+其他权益来源（实盘账户、组合）由调用方逐K线调用 `update` 自行构建系数序列。
+
+示例
+    monitor = RiskMonitor(max_drawdown=0.2, target_vol=0.15)
+    for equity in stream:
+        scale = monitor.update(equity)[0]
+    scales = strategy_risk_scale(strategy, df, 10000.0, monitor=RiskMonitor(max_drawdown=0.15))
+    signals = strategy.generate_signals(df, 10000.0, risk_scale=scales)
+"""
+
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+_STATE_FIELDS = ('peak', 'last', 'var', 'count', 'halted')
+
+
+class RiskMonitor:
+    """n 条序列的增量回撤与波动率监控
+
+    参数
+    - n: 序列数（账户、策略或持仓数）
+    - max_drawdown: 停止交易的回撤阈值（None 表示不限制）
+    - resume_drawdown: 停止后恢复交易的回撤阈值（默认 `max_drawdown / 2`）
+    - soft_drawdown: 开始线性减仓的回撤（None 表示不减仓，仅在 `max_drawdown` 处停止）
+    - target_vol: 年化目标波动率（None 表示不做波动率目标）
+    - halflife: EWMA 半衰期（更新次数）
+    - periods_per_year: 每年的更新次数（日线 250）
+    - min_periods: 波动率目标生效所需的最少收益样本数
+    - max_scale: 波动率目标的缩放上限（1 表示只减不加）
+    """
+    def __init__(self, n: int = 1, max_drawdown: Optional[float] = 0.2, resume_drawdown: Optional[float] = None,
+                 soft_drawdown: Optional[float] = None, target_vol: Optional[float] = 0.15, halflife: float = 20,
+                 periods_per_year: int = 250, min_periods: int = 20, max_scale: float = 1.0):
+        self.n = n
+        self.max_drawdown = max_drawdown
+        self.resume_drawdown = max_drawdown / 2 if resume_drawdown is None and max_drawdown is not None else resume_drawdown
+        self.soft_drawdown = soft_drawdown
+        self.target_vol = target_vol
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.periods_per_year = periods_per_year
+        self.min_periods = min_periods
+        self.max_scale = max_scale
+        self.log = get_logger('risk')
+        self.reset()
+
+    def reset(self):
+        """清空全部序列的状态"""
+        self.peak = np.full(self.n, np.nan)
+        self.last = np.full(self.n, np.nan)
+        self.var = np.zeros(self.n)
+        self.count = np.zeros(self.n, dtype=np.int64)
+        self.halted = np.zeros(self.n, dtype=bool)
+        self.scale = np.ones(self.n)
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        """当前回撤（尚无数据的序列为 0）"""
+        return np.where(self.peak > 0, 1.0 - self.last / self.peak, 0.0)
+
+    @property
+    def volatility(self) -> np.ndarray:
+        """年化 EWMA 波动率（尚无收益样本的序列为 NaN）"""
+        return np.where(self.count > 0, np.sqrt(self.var * self.periods_per_year), np.nan)
+
+    def update(self, values) -> np.ndarray:
+        """推进一个 tick
+
+        参数
+        - values: 长度 n 的当前值（n=1 时可为标量）；NaN 或非正值的序列本次不更新
+
+        返回
+        - ndarray：各序列的缩放系数（0 表示停止交易），同 `self.scale`
+        """
+        values = np.asarray(values, dtype=np.float64)
+        valid = values > 0
+        seen = valid & (self.last > 0)
+        r2 = values / self.last - 1.0
+        r2 *= r2
+        # 原地按掩码更新，未出现有效值的序列保持不变
+        np.copyto(self.var, self.decay * self.var + (1.0 - self.decay) * r2, where=seen)
+        np.copyto(self.var, r2, where=seen & (self.count == 0))
+        self.count += seen
+        np.copyto(self.last, values, where=valid)
+        np.fmax(self.peak, values, out=self.peak, where=valid)
+        self._rescale()
+        return self.scale
+
+    def _rescale(self):
+        scale = np.ones(self.n)
+        if self.target_vol is not None:
+            annual = np.sqrt(self.var * self.periods_per_year)
+            vol_scale = np.divide(self.target_vol, annual, out=np.full(self.n, np.inf), where=annual > 0)
+            np.copyto(scale, np.minimum(vol_scale, self.max_scale), where=self.count >= self.min_periods)
+        if self.max_drawdown is not None:
+            dd = self.drawdown
+            if self.soft_drawdown is not None:
+                taper = (self.max_drawdown - dd) / (self.max_drawdown - self.soft_drawdown)
+                scale *= np.clip(taper, 0.0, 1.0)
+            halted = np.where(self.halted, dd > self.resume_drawdown, dd >= self.max_drawdown)
+            changed = halted != self.halted
+            if changed.any():
+                self._transition(halted, changed, dd)
+            self.halted = halted
+            scale[halted] = 0.0
+        self.scale = scale
+
+    def _transition(self, halted: np.ndarray, changed: np.ndarray, dd: np.ndarray):
+        """记录停止/恢复事件"""
+        stopped = np.flatnonzero(changed & halted)
+        resumed = np.flatnonzero(changed & ~halted)
+        if len(stopped):
+            metrics.incr('risk_halt', value=len(stopped))
+            self.log.warning(f'halt {len(stopped)} stream(s), drawdown up to {dd[stopped].max():.2%}: {stopped[:10].tolist()}')
+        if len(resumed):
+            metrics.incr('risk_resume', value=len(resumed))
+            self.log.info(f'resume {len(resumed)} stream(s): {resumed[:10].tolist()}')
+
+    def get_state(self) -> Dict[str, list]:
+        """返回可 JSON 序列化的状态（用于检查点）"""
+        return {name: getattr(self, name).tolist() for name in _STATE_FIELDS}
+
+    def set_state(self, state: Dict[str, list]):
+        """恢复 `get_state` 保存的状态"""
+        self.peak = np.asarray(state['peak'], dtype=np.float64)
+        self.last = np.asarray(state['last'], dtype=np.float64)
+        self.var = np.asarray(state['var'], dtype=np.float64)
+        self.count = np.asarray(state['count'], dtype=np.int64)
+        self.halted = np.asarray(state['halted'], dtype=bool)
+        self.n = len(self.peak)
+        self._rescale()
+
+
+def equity_curve(signals: pd.DataFrame, equity: float) -> np.ndarray:
+    """由信号结果计算逐K线的盯市权益
+
+    参数
+    - signals: `generate_signals` 的结果（含 `signal, close, unit_size`）
+    - equity: 初始权益
+
+    返回
+    - ndarray：与 signals 等长；进场/加仓以当根收盘价按 `unit_size` 成交，出场/止损以当根收盘价平仓，
+      持仓按每根K线收盘价估值
+    """
+    close = signals['close'].to_numpy(dtype=np.float64)
+    sizes = np.nan_to_num(signals['unit_size'].to_numpy(dtype=np.float64))
+    out = np.empty(len(close))
+    realized, direction, qty, cost = float(equity), 0, 0.0, 0.0
+    for i, s in enumerate(signals['signal'].to_numpy()):
+        price = close[i]
+        if s in ('exit', 'stop_long', 'stop_short') and direction != 0:
+            realized += direction * (qty * price - cost)
+            direction, qty, cost = 0, 0.0, 0.0
+        elif s in ('long', 'short') and direction == 0:
+            direction, qty, cost = (1 if s == 'long' else -1), sizes[i], sizes[i] * price
+        elif s in ('add_long', 'add_short') and direction != 0:
+            qty += sizes[i]
+            cost += sizes[i] * price
+        out[i] = realized + direction * (qty * price - cost)
+    return out
+
+
+def strategy_risk_scale(strategy, df: pd.DataFrame, equity: float, monitor: Optional[RiskMonitor] = None) -> np.ndarray:
+    """按策略自身的盯市权益逐K线推进风险监控，返回 `generate_signals(risk_scale=...)` 的系数序列
+
+    以同参数的新策略实例在 df 上做一次未缩放运行（不改变 `strategy` 的持仓状态），由其权益曲线驱动监控；
+    第 i 根K线的系数只用到第 i 根及之前的收盘价。
+
+    参数
+    - strategy: `TurtleStrategy` 实例（取其参数）
+    - df: `compute_indicators` 的结果
+    - equity: 初始权益
+    - monitor: 单序列的监控（默认 `RiskMonitor()`）；调用后保留最后的状态
+
+    返回
+    - ndarray：与 df 等长的缩放系数
+    """
+    shadow = type(strategy)(**strategy.params())
+    curve = equity_curve(shadow.generate_signals(df.copy(), equity), equity)
+    monitor = monitor if monitor is not None else RiskMonitor()
+    return np.array([monitor.update(value)[0] for value in curve])
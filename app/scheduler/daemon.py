@@ -0,0 +1,344 @@
+"""常驻信号守护进程
+
+在内存中常驻行情、指标与信号，按计划于每个交易日收盘后执行流水线：
+拉取增量行情 → 更新指标 → 生成信号；市场数据并发刷新（可选）与文本爬取与之并行；全部完成后增量更新报表聚合（`app.dashboard.aggregates`）并备份。
+
+最新信号预先序列化为 JSON 字节，经本地 HTTP 端点提供查询：
+- `GET /signals`：全部标的最新信号
+- `GET /signals/<symbol>`：单个标的最新信号
+- `GET /status`：最近一次流水线运行摘要（含各步耗时）
+
+用法：`python -m app.scheduler.daemon --symbols 113001 123456 --run-at 15:30 --port 8765`
+"""
+
+import argparse
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from app.scheduler.dag import Pipeline, PipelineRun
+from app.utils.logging import get_logger
+
+
+class SignalDaemon:
+    """常驻信号服务
+
+    参数
+    - symbols: 跟踪的可转债代码
+    - equity: 信号生成使用的账户权益
+    - run_at: 每日执行时间（HH:MM，本地时间）
+    - history_days: 首次加载的历史天数
+    - gov_urls/news_urls: 需要爬取的公告/新闻页面（经抓取队列去重，已抓取过的不再请求）
+    - gov_listings/news_listings: 公告/新闻列表页，每次运行重新抓取并把新出现的文章链接加入抓取队列
+    - gov_listing_pattern/news_listing_pattern: 列表页中文章链接的正则；未设置时跳过对应的列表页
+      （否则同站点的导航、栏目等全部链接都会进入抓取队列）
+    - backup_paths: 备份的目录或文件，为空则跳过备份
+    - strategy_params: 传给 `TurtleStrategy` 的参数
+    - max_workers: 流水线并行线程数
+    - refresh_market: 是否刷新收盘后市场数据（指数/资金流/融资融券/涨停池等，见 `post_close_calls`）
+    """
+    def __init__(self, symbols: List[str], equity: float = 10000.0, run_at: str = '15:30', history_days: int = 365,
+                 gov_urls: Optional[List[str]] = None, news_urls: Optional[List[str]] = None,
+                 backup_paths: Optional[List[str]] = None, strategy_params: Optional[Dict] = None, max_workers: int = 4,
+                 refresh_market: bool = False, gov_listings: Optional[List[str]] = None,
+                 news_listings: Optional[List[str]] = None, gov_listing_pattern: Optional[str] = None,
+                 news_listing_pattern: Optional[str] = None):
+        self.symbols = list(symbols)
+        self.equity = equity
+        self.run_at = run_at
+        self.history_days = history_days
+        self.gov_urls = gov_urls or []
+        self.news_urls = news_urls or []
+        self.gov_listings = gov_listings or []
+        self.news_listings = news_listings or []
+        self.gov_listing_pattern = gov_listing_pattern
+        self.news_listing_pattern = news_listing_pattern
+        self.backup_paths = backup_paths or []
+        self.strategy_params = strategy_params or {}
+        self.max_workers = max_workers
+        self.refresh_market = refresh_market
+        self.log = get_logger('scheduler')
+
+        # 常驻状态
+        self.data = {}
+        self.indicators = {}
+        self.signals: Dict[str, Dict] = {}
+        self.last_run: Optional[PipelineRun] = None
+        self._payloads: Dict[str, bytes] = {}
+        self._all_payload = b'{}'
+        self._status_payload = b'{}'
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._bond_data = None
+        self._akshare = None
+        self._storage = None
+        self._aggregates = None
+        self._server = None
+
+    # ---- 流水线步骤 ----
+
+    def fetch_deltas(self, inputs: Dict) -> List[str]:
+        """拉取各标的自上次已知日期以来的行情并合并，返回有新数据的标的"""
+        import pandas as pd
+        from app.bond.bond_data import BondData
+        if self._bond_data is None:
+            self._bond_data = BondData()
+        # 代码主表每个交易日收盘后刷新一次，已退市的标的在 `fetch_bond_data` 中跳过
+        self._bond_data.reference.ensure_fresh()
+        changed = []
+        for symbol in self.symbols:
+            cached = self.data.get(symbol)
+            if cached is None or cached.empty:
+                start = (datetime.now() - timedelta(days=self.history_days)).strftime('%Y-%m-%d')
+            else:
+                start = cached.index[-1].strftime('%Y-%m-%d')
+            delta = self._bond_data.fetch_bond_data(symbol, start_date=start, save_csv=False)
+            if delta.empty:
+                continue
+            if cached is not None and not cached.empty:
+                if delta.index[-1] <= cached.index[-1] and delta.iloc[-1].equals(cached.iloc[-1]):
+                    continue
+                merged = pd.concat([cached, delta])
+                delta = merged[~merged.index.duplicated(keep='last')]
+            self.data[symbol] = delta
+            changed.append(symbol)
+        return changed
+
+    def update_indicators(self, inputs: Dict) -> List[str]:
+        """仅对行情有变化的标的重算指标"""
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        changed = inputs['fetch_deltas']
+        strategy = TurtleStrategy(**self.strategy_params)
+        for symbol in changed:
+            self.indicators[symbol] = strategy.compute_indicators(self.data[symbol])
+        return changed
+
+    def generate_signals(self, inputs: Dict) -> Dict[str, Dict]:
+        """生成信号并刷新对外发布的快照"""
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        for symbol in inputs['update_indicators']:
+            strategy = TurtleStrategy(**self.strategy_params)
+            df = strategy.generate_signals(self.indicators[symbol], self.equity)
+            self.indicators[symbol] = df
+            self.signals[symbol] = self._latest_signal(symbol, df, strategy)
+        self._publish()
+        return self.signals
+
+    @staticmethod
+    def _latest_signal(symbol: str, df, strategy) -> Dict:
+        from app.dashboard.aggregates import breakout_strength
+        last = df.iloc[-1]
+        fired = df['signal'].dropna()
+        return {
+            'symbol': symbol,
+            'date': df.index[-1].strftime('%Y-%m-%d'),
+            'signal': last['signal'],
+            'close': float(last['close']),
+            'atr': None if last['atr'] != last['atr'] else float(last['atr']),
+            'breakout': breakout_strength(df),
+            'position': strategy.position,
+            'units': strategy.units,
+            'unit_size': None if last['unit_size'] != last['unit_size'] else float(last['unit_size']),
+            'last_signal': fired.iloc[-1] if len(fired) else None,
+            'last_signal_date': fired.index[-1].strftime('%Y-%m-%d') if len(fired) else None,
+        }
+
+    def refresh_market_data(self, inputs: Dict) -> Dict[str, str]:
+        """并发刷新收盘后市场数据，返回失败明细"""
+        from app.data.akshare_adapters import AkshareClient, post_close_calls
+        if self._akshare is None:
+            self._akshare = AkshareClient()
+        result = self._akshare.refresh(post_close_calls(datetime.now().strftime('%Y%m%d')))
+        return result.errors
+
+    def crawl_text(self, inputs: Dict) -> int:
+        """经抓取队列爬取公告与新闻并入库（只处理新链接，中断后续跑），返回文档数"""
+        if not (self.gov_urls or self.news_urls or self.gov_listings or self.news_listings):
+            return 0
+        from app.data.storage import TextStorage
+        from app.ingest.frontier import CrawlFrontier, FrontierCrawler
+        if self._storage is None:
+            self._storage = TextStorage()
+        frontier = CrawlFrontier(self._storage.db_path)
+        try:
+            frontier.add(self.gov_urls, 'gov')
+            frontier.add(self.news_urls, 'news')
+            # 间隔短于运行周期：本轮只抓一次，下次运行时已到期
+            for source, listings, pattern in (('gov', self.gov_listings, self.gov_listing_pattern),
+                                              ('news', self.news_listings, self.news_listing_pattern)):
+                if listings and not pattern:
+                    self.log.warning(f'skip {len(listings)} {source} listing(s): no article link pattern')
+                    continue
+                for url in listings:
+                    frontier.add_listing(url, source, interval=3600, pattern=pattern)
+            stats = FrontierCrawler(frontier, self._storage, max_wait=5.0).run()
+        finally:
+            frontier.close()
+        return stats['documents']
+
+    def update_aggregates(self, inputs: Dict) -> Dict[str, int]:
+        """增量更新报表与仪表盘的预计算聚合（只处理本轮有变化的标的与新入库的文档）"""
+        from app.dashboard.aggregates import AggregateStore
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        if self._aggregates is None:
+            self._aggregates = AggregateStore()
+        changed = inputs['update_indicators']
+        store = self._aggregates
+        return {
+            'signals': store.update_signals({s: self.signals[s] for s in changed if s in self.signals}),
+            'equity': store.update_equity(TurtleStrategy(**self.strategy_params),
+                                          {s: self.indicators[s] for s in changed}),
+            'temperature': store.update_temperature(),
+            'news': store.update_news(self._storage),
+        }
+
+    def backup(self, inputs: Dict) -> Optional[str]:
+        """备份指定目录"""
+        if not self.backup_paths:
+            return None
+        from app.backup.backup import BackupManager
+        return BackupManager().create_backup(self.backup_paths)
+
+    def build_pipeline(self) -> Pipeline:
+        """构建收盘后流水线"""
+        pipeline = Pipeline(max_workers=self.max_workers)
+        pipeline.add('fetch_deltas', self.fetch_deltas)
+        pipeline.add('update_indicators', self.update_indicators, deps=['fetch_deltas'])
+        pipeline.add('generate_signals', self.generate_signals, deps=['update_indicators'])
+        pipeline.add('crawl_text', self.crawl_text)
+        backup_deps = ['generate_signals', 'crawl_text']
+        if self.refresh_market:
+            pipeline.add('refresh_market', self.refresh_market_data)
+            backup_deps.append('refresh_market')
+        # 聚合失败不影响备份
+        pipeline.add('update_aggregates', self.update_aggregates, deps=['update_indicators', *backup_deps])
+        pipeline.add('backup', self.backup, deps=backup_deps)
+        return pipeline
+
+    def run_once(self) -> PipelineRun:
+        """立即执行一次流水线"""
+        run = self.build_pipeline().run()
+        self.last_run = run
+        with self._lock:
+            self._status_payload = json.dumps(run.summary(), ensure_ascii=False).encode('utf-8')
+        self.log.info(f'pipeline finished ok={run.ok} timings={run.summary()["timings"]}')
+        return run
+
+    # ---- 发布与查询 ----
+
+    def _publish(self):
+        payloads = {s: json.dumps(v, ensure_ascii=False).encode('utf-8') for s, v in self.signals.items()}
+        all_payload = json.dumps(self.signals, ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            self._payloads = payloads
+            self._all_payload = all_payload
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        """按请求路径返回预序列化的 JSON，未知路径返回 None"""
+        if path == '/signals':
+            return self._all_payload
+        if path == '/status':
+            return self._status_payload
+        if path.startswith('/signals/'):
+            return self._payloads.get(path[len('/signals/'):])
+        return None
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+        """在后台线程启动本地 HTTP 服务"""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = daemon.lookup(self.path.rstrip('/') or '/')
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='signal-http', daemon=True).start()
+        bound_host, bound_port = self._server.server_address[:2]
+        self.log.info(f'serving signals on http://{bound_host}:{bound_port}/signals')
+        return self._server
+
+    # ---- 调度 ----
+
+    def next_run_time(self, now: Optional[datetime] = None) -> datetime:
+        """返回下一个交易日的计划执行时间（跳过周末与节假日）"""
+        from app.data.trading_calendar import default_calendar
+        calendar = default_calendar()
+        now = now or datetime.now()
+        hour, minute = (int(x) for x in self.run_at.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while not calendar.is_trading_day(candidate.date()):
+            candidate += timedelta(days=1)
+        return candidate
+
+    def run_forever(self):
+        """按计划循环执行，直至 `stop()`"""
+        while not self._stop.is_set():
+            target = self.next_run_time()
+            self.log.info(f'next pipeline run at {target:%Y-%m-%d %H:%M}')
+            if self._stop.wait(max(0.0, (target - datetime.now()).total_seconds())):
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                self.log.error(f'pipeline crashed: {e}')
+
+    def stop(self):
+        """停止调度与 HTTP 服务"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turtle signal daemon")
+    parser.add_argument("--symbols", nargs="+", required=True, help="可转债代码列表")
+    parser.add_argument("--equity", type=float, default=10000.0, help="账户权益")
+    parser.add_argument("--run-at", type=str, default="15:30", help="每日执行时间 HH:MM")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="HTTP 监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="HTTP 端口")
+    parser.add_argument("--gov-urls", nargs="*", default=[], help="公告页面")
+    parser.add_argument("--news-urls", nargs="*", default=[], help="新闻页面")
+    parser.add_argument("--gov-listings", nargs="*", default=[], help="公告列表页")
+    parser.add_argument("--news-listings", nargs="*", default=[], help="新闻列表页")
+    parser.add_argument("--gov-listing-pattern", type=str, default=None, help="公告列表页文章链接的正则（未设置时跳过公告列表页）")
+    parser.add_argument("--news-listing-pattern", type=str, default=None, help="新闻列表页文章链接的正则（未设置时跳过新闻列表页）")
+    parser.add_argument("--backup-paths", nargs="*", default=[], help="备份目录")
+    parser.add_argument("--refresh-market", action="store_true", help="同时并发刷新收盘后市场数据")
+    parser.add_argument("--run-now", action="store_true", help="启动时立即执行一次")
+    parser.add_argument("--once", action="store_true", help="只执行一次后退出")
+    args = parser.parse_args()
+
+    daemon = SignalDaemon(args.symbols, equity=args.equity, run_at=args.run_at,
+                          gov_urls=args.gov_urls, news_urls=args.news_urls, backup_paths=args.backup_paths,
+                          refresh_market=args.refresh_market, gov_listings=args.gov_listings,
+                          news_listings=args.news_listings, gov_listing_pattern=args.gov_listing_pattern,
+                          news_listing_pattern=args.news_listing_pattern)
+    if args.once:
+        run = daemon.run_once()
+        print(json.dumps({'status': run.summary(), 'signals': daemon.signals}, ensure_ascii=False, indent=2))
+        return
+    daemon.serve(args.host, args.port)
+    if args.run_now:
+        daemon.run_once()
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
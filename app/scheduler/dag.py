@@ -0,0 +1,121 @@
+"""任务依赖图（DAG）执行器
+
+以线程池并行执行相互独立的步骤，依赖满足后立即调度后继步骤，并记录每步耗时；
+任一步骤失败时其全部下游步骤标记为跳过，其余分支照常执行。
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+
+class Step:
+    """流水线步骤
+
+    参数
+    - name: 步骤名称（唯一）
+    - func: 可调用对象，接收 `Dict[str, Any]`（依赖步骤名 -> 其返回值），返回本步结果
+    - deps: 依赖的步骤名称
+    """
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class PipelineRun:
+    """一次流水线运行的结果
+
+    属性
+    - results: 成功步骤的返回值
+    - errors: 失败步骤的异常描述
+    - skipped: 因上游失败而跳过的步骤
+    - timings: 各步骤耗时（秒）
+    - started_at/finished_at: 起止时间戳
+    """
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.timings: Dict[str, float] = {}
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.skipped
+
+    def summary(self) -> Dict:
+        """返回可 JSON 序列化的运行摘要"""
+        return {
+            'ok': self.ok,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'timings': {k: round(v, 6) for k, v in self.timings.items()},
+            'errors': self.errors,
+            'skipped': self.skipped,
+        }
+
+
+class Pipeline:
+    """DAG 流水线
+
+    参数
+    - max_workers: 并行线程数
+    """
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.steps: Dict[str, Step] = {}
+        self.log = get_logger('scheduler')
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()) -> Step:
+        """添加步骤（依赖须已添加，保证无环）"""
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        step = Step(name, func, deps)
+        missing = [d for d in step.deps if d not in self.steps]
+        if missing:
+            raise ValueError(f"Step {name} depends on unknown steps: {', '.join(missing)}")
+        self.steps[name] = step
+        return step
+
+    def _execute(self, step: Step, inputs: Dict[str, Any]):
+        t0 = time.perf_counter()
+        try:
+            return step.func(inputs), None, time.perf_counter() - t0
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", time.perf_counter() - t0
+
+    def run(self) -> PipelineRun:
+        """执行全部步骤并返回运行结果"""
+        run = PipelineRun()
+        pending = dict(self.steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as pool:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    if any(d in run.errors or d in run.skipped for d in step.deps):
+                        run.skipped.append(name)
+                        del pending[name]
+                    elif all(d in run.results for d in step.deps):
+                        inputs = {d: run.results[d] for d in step.deps}
+                        running[pool.submit(self._execute, step, inputs)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    result, error, elapsed = fut.result()
+                    run.timings[name] = elapsed
+                    metrics.observe('pipeline_step', elapsed, step=name)
+                    if error is None:
+                        run.results[name] = result
+                        self.log.info(f'step {name} done in {elapsed:.3f}s')
+                    else:
+                        run.errors[name] = error
+                        self.log.error(f'step {name} failed after {elapsed:.3f}s: {error}')
+        run.finished_at = time.time()
+        return run
@@ -0,0 +1,245 @@
+"""分块（out-of-core）指标与信号计算
+
+`compute_indicators` + `generate_signals` 需要整段历史常驻内存，内存随 历史长度 × 标的数 线性增长。
+本模块以生成器流水线逐块处理：每次只读入一块行情（按时间切分的行，或逐个标的），计算该块的指标与信号后交给下游
+（写入 Parquet、汇总等）再丢弃，峰值内存只取决于块大小，与数据总量无关。
+
+跨块边界携带的状态：
+- 滚动极值：上一块末尾的 `window - 1` 根K线的最高/最低价（与本块拼接后计算，结果与整段计算一致）
+- ATR：上一根K线的收盘价、Wilder 平滑的前值，以及尚未凑满 `atr_period` 个真实波幅时的累计和
+- 策略：`TurtleStrategy` 实例自身的持仓状态，以及上一块最后一行指标（下一块第一根K线的突破参考价来自它）
+
+滚动极值按策略的指标后端计算，与整段计算逐位一致；ATR 按 TA-Lib 口径以 NumPy 递推，
+与整段计算的差异在浮点舍入量级（相对误差约 1e-12），信号与整段计算相同。
+
+用法：`python -m app.turtle_algo.chunked history.parquet --output signals.parquet --chunk-rows 100000`
+"""
+
+import argparse
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.turtle_algo.indicators import true_range, wilder_smooth
+from app.turtle_algo.turtle_strategy import TurtleStrategy
+from app.utils.metrics import metrics
+
+
+class ChunkedTurtle:
+    """逐块推进的海龟策略
+
+    参数
+    - strategy: 策略实例（持仓状态在块之间延续，同一实例不应同时用于其他序列）
+    - equity: 账户权益（单位大小计算）
+    """
+    def __init__(self, strategy: Optional[TurtleStrategy] = None, equity: float = 10000.0):
+        self.strategy = strategy if strategy is not None else TurtleStrategy()
+        self.equity = equity
+        if self.strategy.mode == 'Mode 1':
+            self.entry_length, self.exit_length = self.strategy.entry_length, self.strategy.exit_length
+        else:
+            self.entry_length, self.exit_length = self.strategy.entry_length_mode2, self.strategy.exit_length_mode2
+        self._clear()
+
+    def reset(self):
+        """清空跨块状态，策略持仓一并重置（用于换到另一条序列）"""
+        self._clear()
+        self.strategy._reset_state()
+        self.strategy.last_trade_win = False
+
+    def _clear(self):
+        self.bars = 0
+        self._tail_high = np.empty(0)
+        self._tail_low = np.empty(0)
+        self._prev_bar: Optional[np.ndarray] = None  # 上一根K线的 high, low, close
+        self._tr_sum = 0.0
+        self._tr_count = 0
+        self._atr = np.nan
+        self._last_row: Optional[pd.DataFrame] = None
+
+    def indicators(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """计算一块行情的指标（列与 `compute_indicators` 相同），并推进指标状态"""
+        df = chunk.copy()
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        df['atr'] = self._atr_chunk(high, low, close)
+
+        backend = self.strategy.indicator_backend
+        tail = len(self._tail_high)
+        ext_high = np.concatenate([self._tail_high, high])
+        ext_low = np.concatenate([self._tail_low, low])
+        df['entry_long'] = backend.rolling_max(ext_high, self.entry_length)[tail:]
+        df['entry_short'] = backend.rolling_min(ext_low, self.entry_length)[tail:]
+        df['exit_long'] = backend.rolling_min(ext_low, self.exit_length)[tail:]
+        df['exit_short'] = backend.rolling_max(ext_high, self.exit_length)[tail:]
+
+        keep = max(self.entry_length, self.exit_length) - 1
+        self._tail_high = ext_high[-keep:].copy() if keep else np.empty(0)
+        self._tail_low = ext_low[-keep:].copy() if keep else np.empty(0)
+        if len(df):
+            self._prev_bar = np.array([high[-1], low[-1], close[-1]])
+        self.bars += len(df)
+        return df
+
+    def _atr_chunk(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        """ATR（TA-Lib 口径）：前 `period` 个真实波幅的均值为种子，之后 Wilder 平滑"""
+        period = self.strategy.atr_period
+        n = len(close)
+        out = np.full(n, np.nan)
+        if n == 0:
+            return out
+        if self._prev_bar is None:
+            tr = true_range(high, low, close)
+        else:
+            tr = true_range(np.r_[self._prev_bar[0], high], np.r_[self._prev_bar[1], low],
+                            np.r_[self._prev_bar[2], close])[1:]
+        start = 0
+        if self._tr_count < period:
+            first = 1 if self._prev_bar is None else 0
+            taken = tr[first:first + period - self._tr_count]
+            self._tr_sum += float(taken.sum())
+            self._tr_count += len(taken)
+            if self._tr_count < period:
+                return out
+            start = first + len(taken)
+            self._atr = self._tr_sum / period
+            out[start - 1] = self._atr
+        if start < n:
+            wilder_smooth(tr, period, self._atr, out, start)
+            self._atr = float(out[-1])
+        return out
+
+    @metrics.timed('chunked_signals')
+    def process(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """处理一块行情：计算指标并延续策略状态生成信号
+
+        参数
+        - chunk: 按时间升序、紧接上一块之后的行情（含 `high, low, close`）
+
+        返回
+        - DataFrame：与整段调用 `compute_indicators` + `generate_signals` 结果中对应行相同的列
+        """
+        df = self.indicators(chunk)
+        if df.empty:
+            return df.assign(signal=pd.Series(dtype=object), unit_size=pd.Series(dtype=np.float64))
+        if self._last_row is None:
+            # 首块：与整段计算相同，从第 2 根K线开始
+            out = self.strategy.generate_signals(df, self.equity)
+        else:
+            # 以上一块最后一行作为第 0 行，从本块第一行开始推进
+            out = self.strategy.generate_signals(pd.concat([self._last_row, df]), self.equity).iloc[1:]
+        self._last_row = out.iloc[-1:].drop(columns=['signal', 'unit_size'])
+        return out
+
+    def get_state(self) -> Dict:
+        """跨块状态（含策略状态），可用于中断后续跑"""
+        return {
+            'bars': self.bars, 'tail_high': self._tail_high.tolist(), 'tail_low': self._tail_low.tolist(),
+            'prev_bar': None if self._prev_bar is None else self._prev_bar.tolist(),
+            'tr_sum': self._tr_sum, 'tr_count': self._tr_count, 'atr': self._atr,
+            'last_row': None if self._last_row is None else self._last_row,
+            'strategy': self.strategy.get_state(),
+        }
+
+    def set_state(self, state: Dict):
+        """恢复 `get_state` 的结果"""
+        self.bars = state['bars']
+        self._tail_high = np.asarray(state['tail_high'], dtype=np.float64)
+        self._tail_low = np.asarray(state['tail_low'], dtype=np.float64)
+        self._prev_bar = None if state['prev_bar'] is None else np.asarray(state['prev_bar'], dtype=np.float64)
+        self._tr_sum, self._tr_count, self._atr = state['tr_sum'], state['tr_count'], state['atr']
+        self._last_row = state['last_row']
+        self.strategy.set_state(state['strategy'])
+
+
+def iter_signals(chunks: Iterable[pd.DataFrame], strategy: Optional[TurtleStrategy] = None,
+                 equity: float = 10000.0) -> Iterator[pd.DataFrame]:
+    """逐块生成单个标的的指标与信号
+
+    参数
+    - chunks: 按时间顺序的行情块
+    - strategy: 策略实例（默认参数的新实例）
+    - equity: 账户权益
+
+    返回
+    - 生成器：每块对应的结果
+    """
+    runner = ChunkedTurtle(strategy, equity)
+    for chunk in chunks:
+        yield runner.process(chunk)
+
+
+def iter_universe(sources: Iterable[Tuple[str, Iterable[pd.DataFrame]]], strategy_params: Optional[Dict] = None,
+                  equity: float = 10000.0) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """逐个标的、逐块生成结果，同一时刻只有一个标的的一块行情在内存中
+
+    参数
+    - sources: (代码, 该标的的行情块迭代器) 序列，可以是惰性生成器
+    - strategy_params: `TurtleStrategy` 参数（每个标的使用新实例）
+
+    返回
+    - 生成器：(代码, 结果块)
+    """
+    for symbol, chunks in sources:
+        for out in iter_signals(chunks, TurtleStrategy(**(strategy_params or {})), equity):
+            yield symbol, out
+
+
+def iter_parquet(path, chunk_rows: int = 100_000, index: str = 'date',
+                 columns=('open', 'high', 'low', 'close')) -> Iterator[pd.DataFrame]:
+    """按行分块读取 Parquet 行情（每次只解码 `chunk_rows` 行）
+
+    参数
+    - path: Parquet 文件（按时间升序）
+    - chunk_rows: 每块行数
+    - index: 作为索引的日期列（不存在时使用文件中的 pandas 索引元数据）
+    - columns: 读取的价格列（文件中不存在的列跳过）
+    """
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path)
+    names = set(pf.schema_arrow.names)
+    wanted = [c for c in (index, *columns) if c in names]
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=wanted):
+        df = batch.to_pandas()
+        if index in df:
+            df = df.set_index(index)
+        yield df
+
+
+def write_parquet(chunks: Iterable[pd.DataFrame], path) -> int:
+    """把结果块依次写入同一个 Parquet 文件（每块一个行组），返回总行数"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer, rows = None, 0
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df)
+            if writer is None:
+                # 首块的信号列可能全为空，按字符串列建表结构
+                schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in table.schema],
+                                   metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(path, schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked out-of-core turtle signals")
+    parser.add_argument("input", help="按时间升序的行情 Parquet（含 date, high, low, close）")
+    parser.add_argument("--output", required=True, help="输出的 Parquet")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="每块行数")
+    parser.add_argument("--mode", default='Mode 1', help="策略模式")
+    parser.add_argument("--equity", type=float, default=10000.0, help="账户权益")
+    args = parser.parse_args()
+
+    chunks = iter_signals(iter_parquet(args.input, args.chunk_rows), TurtleStrategy(mode=args.mode), args.equity)
+    rows = write_parquet(chunks, args.output)
+    print(f"wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
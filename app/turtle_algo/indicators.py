@@ -0,0 +1,272 @@
+"""指标计算后端
+
+为海龟策略提供可插拔的 ATR 与滚动极值实现：
+- talib：TA-Lib C 实现（需安装 `ta-lib`）
+- numpy：向量化 NumPy 实现（沿第 0 轴计算，同时支持一维序列与二维 日期×标的 矩阵）
+- pandas：基于 `Series.rolling` / `ewm` 的实现
+
+三种实现统一采用 TA-Lib 的 ATR 口径：首个 ATR 位于第 `period` 根K线，取前 `period` 个真实波幅（TR，从第 2 根开始）的简单平均，
+之后按 Wilder 平滑 `ATR_t = (ATR_{t-1} * (period - 1) + TR_t) / period` 递推。输入应为无缺失值的行情，含 NaN 时各后端的传播方式不保证一致。
+
+后端在运行时选择：显式名称 > 环境变量 `TURTLE_INDICATOR_BACKEND` > 自动（优先 talib，其次 numpy）。
+"""
+
+import os
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+ENV_BACKEND = 'TURTLE_INDICATOR_BACKEND'
+
+# 分块递推的块长；块内用幂级数闭式计算，块长过大会放大 (1-1/period)^-k 的数值范围
+_WILDER_BLOCK = 256
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """真实波幅（沿第 0 轴），首行为 NaN"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = np.full(high.shape, np.nan)
+    if len(high) < 2:
+        return tr
+    prev_close = close[:-1]
+    h, l = high[1:], low[1:]
+    tr[1:] = np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+    return tr
+
+
+def wilder_smooth(values: np.ndarray, period: int, seed: np.ndarray, out: np.ndarray, start: int):
+    """从 `start` 行起以 `seed` 为前值做 Wilder 平滑，结果写入 `out`
+
+    递推 y_t = b * y_{t-1} + a * x_t（a = 1/period, b = 1 - a）在块内展开为
+    y_j = b^j * (y_0 + a * Σ_{l<=j} x_l / b^l)，以 cumsum 向量化计算，块间串接。
+    """
+    n = len(values)
+    prev = np.asarray(seed, dtype=np.float64)
+    if period == 1:
+        out[start:] = values[start:]
+        return
+    a = 1.0 / period
+    b = 1.0 - a
+    powers = b ** np.arange(1, _WILDER_BLOCK + 1, dtype=np.float64)
+    if values.ndim > 1:
+        powers = powers.reshape((-1,) + (1,) * (values.ndim - 1))
+    i = start
+    while i < n:
+        seg = values[i:i + _WILDER_BLOCK]
+        m = len(seg)
+        pw = powers[:m]
+        y = pw * (prev + a * np.cumsum(seg / pw, axis=0))
+        out[i:i + m] = y
+        prev = y[-1]
+        i += m
+
+
+def atr_numpy(high, low, close, period: int) -> np.ndarray:
+    """NumPy 版 ATR（TA-Lib 口径，沿第 0 轴）"""
+    tr = true_range(high, low, close)
+    out = np.full(tr.shape, np.nan)
+    if len(tr) <= period:
+        return out
+    seed = tr[1:period + 1].mean(axis=0)
+    out[period] = seed
+    wilder_smooth(tr, period, seed, out, period + 1)
+    return out
+
+
+def _rolling(values, window: int, ufunc) -> np.ndarray:
+    """van Herk/Gil-Werman 滚动极值：按窗口分块求前缀/后缀累积极值，O(n) 且与窗口长度无关"""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.full(values.shape, np.nan)
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full((blocks * window,) + values.shape[1:], np.nan)
+    padded[:n] = values
+    shaped = padded.reshape((blocks, window) + values.shape[1:])
+    prefix = ufunc.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_max_numpy(values, window: int) -> np.ndarray:
+    """NumPy 版滚动最大值（沿第 0 轴，前 window-1 行为 NaN）"""
+    return _rolling(values, window, np.maximum)
+
+
+def rolling_min_numpy(values, window: int) -> np.ndarray:
+    """NumPy 版滚动最小值（沿第 0 轴，前 window-1 行为 NaN）"""
+    return _rolling(values, window, np.minimum)
+
+
+class IndicatorBackend:
+    """指标后端接口
+
+    所有方法接收一维数组或 Series，返回等长 `numpy.ndarray`。
+    """
+    name = 'base'
+
+    def atr(self, high, low, close, period: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def rolling_max(self, values, window: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def rolling_min(self, values, window: int) -> np.ndarray:
+        raise NotImplementedError
+
+
+class NumpyBackend(IndicatorBackend):
+    """NumPy 向量化实现"""
+    name = 'numpy'
+
+    def atr(self, high, low, close, period: int) -> np.ndarray:
+        return atr_numpy(high, low, close, period)
+
+    def rolling_max(self, values, window: int) -> np.ndarray:
+        return rolling_max_numpy(values, window)
+
+    def rolling_min(self, values, window: int) -> np.ndarray:
+        return rolling_min_numpy(values, window)
+
+
+class PandasBackend(IndicatorBackend):
+    """pandas 实现（rolling / ewm）"""
+    name = 'pandas'
+
+    def atr(self, high, low, close, period: int) -> np.ndarray:
+        high = pd.Series(np.asarray(high, dtype=np.float64))
+        low = pd.Series(np.asarray(low, dtype=np.float64))
+        close = pd.Series(np.asarray(close, dtype=np.float64))
+        prev_close = close.shift(1)
+        tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1, skipna=False)
+        if len(tr) <= period:
+            return np.full(len(tr), np.nan)
+        seeded = tr.copy()
+        seeded.iloc[:period + 1] = np.nan
+        seeded.iloc[period] = tr.iloc[1:period + 1].mean()
+        return seeded.ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+    def rolling_max(self, values, window: int) -> np.ndarray:
+        return pd.Series(np.asarray(values, dtype=np.float64)).rolling(window=window).max().to_numpy()
+
+    def rolling_min(self, values, window: int) -> np.ndarray:
+        return pd.Series(np.asarray(values, dtype=np.float64)).rolling(window=window).min().to_numpy()
+
+
+class TalibBackend(IndicatorBackend):
+    """TA-Lib C 实现"""
+    name = 'talib'
+
+    def __init__(self):
+        import talib
+        self._talib = talib
+
+    def atr(self, high, low, close, period: int) -> np.ndarray:
+        return self._talib.ATR(np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64),
+                               np.asarray(close, dtype=np.float64), timeperiod=period)
+
+    def rolling_max(self, values, window: int) -> np.ndarray:
+        if window == 1:
+            # TA-Lib 的 MAX/MIN 要求 timeperiod >= 2，窗口为 1 时与其他后端一样返回原序列
+            return np.array(values, dtype=np.float64)
+        return self._talib.MAX(np.asarray(values, dtype=np.float64), timeperiod=window)
+
+    def rolling_min(self, values, window: int) -> np.ndarray:
+        if window == 1:
+            return np.array(values, dtype=np.float64)
+        return self._talib.MIN(np.asarray(values, dtype=np.float64), timeperiod=window)
+
+
+_BACKENDS = {
+    'talib': TalibBackend,
+    'numpy': NumpyBackend,
+    'pandas': PandasBackend,
+}
+_AUTO_ORDER = ('talib', 'numpy', 'pandas')
+_instances: Dict[str, IndicatorBackend] = {}
+
+
+def available_backends() -> List[str]:
+    """返回当前环境可用的后端名称（按自动选择优先级排序）"""
+    names = []
+    for name in _AUTO_ORDER:
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_backend(name: Optional[str] = None) -> IndicatorBackend:
+    """获取指标后端
+
+    参数
+    - name: 'talib'/'numpy'/'pandas'/'auto'；为空时读取环境变量 `TURTLE_INDICATOR_BACKEND`，仍为空则自动选择
+
+    返回
+    - IndicatorBackend：后端实例（进程内复用）
+    """
+    if name is None:
+        name = os.environ.get(ENV_BACKEND) or 'auto'
+    name = name.lower()
+    if name == 'auto':
+        for candidate in _AUTO_ORDER:
+            try:
+                return get_backend(candidate)
+            except ImportError:
+                continue
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown indicator backend: {name}")
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+    return _instances[name]
+
+
+def cross_validate(data: pd.DataFrame, period: int = 14, windows=(10, 20, 55), backends: Optional[List[str]] = None,
+                   rtol: float = 1e-9, atol: float = 1e-9) -> Dict[str, float]:
+    """交叉校验各后端输出一致性
+
+    以第一个后端为基准，逐一比较 ATR 与各窗口滚动极值（NaN 位置须一致）。
+
+    参数
+    - data: 包含 `high, low, close` 列的行情数据
+    - period: ATR 周期
+    - windows: 待校验的滚动窗口
+    - backends: 参与比较的后端名称，默认全部可用后端
+    - rtol/atol: 允许的相对/绝对误差
+
+    返回
+    - Dict[str, float]：各后端相对基准的最大绝对误差
+
+    异常
+    - ValueError：任一后端输出超出误差范围
+    """
+    if backends is None:
+        backends = available_backends()
+    high, low, close = data['high'].to_numpy(), data['low'].to_numpy(), data['close'].to_numpy()
+
+    def outputs(backend: IndicatorBackend) -> Dict[str, np.ndarray]:
+        res = {'atr': backend.atr(high, low, close, period)}
+        for w in windows:
+            res[f'max_{w}'] = backend.rolling_max(high, w)
+            res[f'min_{w}'] = backend.rolling_min(low, w)
+        return res
+
+    reference = outputs(get_backend(backends[0]))
+    report = {backends[0]: 0.0}
+    for name in backends[1:]:
+        worst = 0.0
+        for key, got in outputs(get_backend(name)).items():
+            ref = reference[key]
+            if not np.array_equal(np.isnan(ref), np.isnan(got)) or not np.allclose(ref, got, rtol=rtol, atol=atol, equal_nan=True):
+                raise ValueError(f"Indicator backend {name} disagrees with {backends[0]} on {key}")
+            mask = ~np.isnan(ref)
+            if mask.any():
+                worst = max(worst, float(np.max(np.abs(ref[mask] - got[mask]))))
+        report[name] = worst
+    return report
@@ -0,0 +1,182 @@
+"""全市场突破扫描
+
+以 日期×标的 价格矩阵为输入，一次二维向量化计算所有标的的 ATR、唐奇安通道与突破标记，
+返回最新一根K线上的突破候选，按突破幅度相对 ATR 的倍数排序。
+
+突破口径与 `TurtleStrategy.generate_signals` 一致：
+- 多头：`prev_close <= entry_long[t-1] < close[t]`
+- 空头：`prev_close >= entry_short[t-1] > close[t]`
+强度：多头 `(close - entry_long[t-1]) / atr`，空头 `(entry_short[t-1] - close) / atr`。
+
+矩阵中的缺失值（未上市、停牌）在计算前按标的压缩：各列的有效K线下对齐到末行，
+因此每个标的的指标与单独对其调用 `compute_indicators` 的结果一致；最新K线不在扫描日的标的不参与排序。
+"""
+
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from app.turtle_algo.indicators import rolling_max_numpy, rolling_min_numpy, true_range, wilder_smooth
+from app.utils.metrics import metrics
+
+
+def pivot_panel(data: Union[Dict[str, pd.DataFrame], pd.DataFrame], fields=('high', 'low', 'close'),
+                symbol_column: str = 'symbol', date_column: str = 'date') -> Dict[str, pd.DataFrame]:
+    """将行情整理为 日期×标的 矩阵
+
+    参数
+    - data: 代码 -> 按日期索引的 OHLC（如 `BondData.fetch_bond_data` 的返回），或含代码与日期列的长表
+    - fields: 需要的价格字段
+    - symbol_column/date_column: 长表的代码列与日期列
+
+    返回
+    - Dict[str, DataFrame]：字段 -> 日期×标的 矩阵（按日期升序，缺失为 NaN）
+    """
+    if isinstance(data, pd.DataFrame):
+        return {f: data.pivot_table(index=date_column, columns=symbol_column, values=f, aggfunc='last').sort_index()
+                for f in fields}
+    frames = {symbol: df for symbol, df in data.items() if df is not None and not df.empty}
+    return {f: pd.concat({symbol: df[f] for symbol, df in frames.items()}, axis=1).sort_index() for f in fields}
+
+
+def _compact(values: np.ndarray, valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """将各列的有效值下对齐（保持顺序），返回压缩后的矩阵（无效处为 NaN）与对应的原行号（无效处为 -1）"""
+    if valid.all():
+        return values, np.broadcast_to(np.arange(len(values))[:, None], values.shape)
+    # 按 标的×日期 的连续布局排序与取值，避免沿第 0 轴的跨步访问
+    order = np.argsort(valid.T, axis=1, kind='stable')
+    kept = np.take_along_axis(valid.T, order, axis=1)
+    out = np.take_along_axis(values.T, order, axis=1)
+    out[~kept] = np.nan
+    return out.T, np.where(kept, order, -1).T
+
+
+class BreakoutScanner:
+    """二维突破扫描器
+
+    参数
+    - entry_length: 进场通道长度
+    - exit_length: 出场通道长度
+    - atr_period: ATR周期
+    """
+    def __init__(self, entry_length: int = 20, exit_length: int = 10, atr_period: int = 14):
+        self.entry_length = entry_length
+        self.exit_length = exit_length
+        self.atr_period = atr_period
+
+    @classmethod
+    def from_strategy(cls, strategy) -> 'BreakoutScanner':
+        """按 `TurtleStrategy` 的参数（含 Mode 2 通道长度）构造"""
+        if strategy.mode == 'Mode 1':
+            return cls(strategy.entry_length, strategy.exit_length, strategy.atr_period)
+        return cls(strategy.entry_length_mode2, strategy.exit_length_mode2, strategy.atr_period)
+
+    def compute(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """计算无缺失（或仅含前导缺失）矩阵的指标
+
+        参数
+        - high/low/close: 形状为 (日期, 标的) 的矩阵，各列缺失值只能出现在开头
+
+        返回
+        - Dict[str, ndarray]：`atr, entry_long, entry_short, exit_long, exit_short`，形状与输入相同
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        return {
+            'atr': self._atr(high, low, close),
+            'entry_long': rolling_max_numpy(high, self.entry_length),
+            'entry_short': rolling_min_numpy(low, self.entry_length),
+            'exit_long': rolling_min_numpy(low, self.exit_length),
+            'exit_short': rolling_max_numpy(high, self.exit_length),
+        }
+
+    def _atr(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        """各列起始行不同的 ATR（TA-Lib 口径），一次递推完成
+
+        第 s 行开始有效的列，其首个 ATR 位于第 s + period 行。将该行的输入置为 `seed * period`、之前置 0，
+        从 0 起递推即在该行得到 seed，之后与 Wilder 平滑相同。
+        """
+        period = self.atr_period
+        n = len(close)
+        out = np.full(close.shape, np.nan)
+        tr = np.nan_to_num(true_range(high, low, close))
+        starts = np.isnan(close).sum(axis=0)
+        seed_rows = starts + period
+        cols = np.flatnonzero(seed_rows < n)
+        if len(cols) == 0:
+            return out
+        tr, starts, seed_rows = tr[:, cols], starts[cols], seed_rows[cols]
+        csum = np.cumsum(tr, axis=0)
+        seed = (np.take_along_axis(csum, seed_rows[None, :], axis=0)[0]
+                - np.take_along_axis(csum, starts[None, :], axis=0)[0]) / period
+        before = np.arange(n)[:, None] <= seed_rows[None, :]
+        tr[before] = 0.0
+        tr[seed_rows, np.arange(len(cols))] = seed * period
+        smoothed = np.empty_like(tr)
+        wilder_smooth(tr, period, np.zeros(len(cols)), smoothed, 0)
+        smoothed[np.arange(n)[:, None] < seed_rows[None, :]] = np.nan
+        out[:, cols] = smoothed
+        return out
+
+    @metrics.timed('scanner_scan')
+    def scan(self, high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, as_of=None,
+             top: Optional[int] = None) -> pd.DataFrame:
+        """扫描最新K线上的突破
+
+        参数
+        - high/low/close: 日期×标的 矩阵（行列需一致，见 `pivot_panel`）
+        - as_of: 扫描日期，默认矩阵最后一行；最新K线不在该日的标的被忽略
+        - top: 仅返回强度最高的前若干个
+
+        返回
+        - DataFrame：`symbol, direction('long'/'short'), close, channel, atr, strength`，按强度降序
+        """
+        columns = ['symbol', 'direction', 'close', 'channel', 'atr', 'strength']
+        if close.empty:
+            return pd.DataFrame(columns=columns)
+        high = high.reindex(index=close.index, columns=close.columns)
+        low = low.reindex(index=close.index, columns=close.columns)
+        if as_of is not None:
+            as_of = pd.Timestamp(as_of)
+            high, low, close = high.loc[:as_of], low.loc[:as_of], close.loc[:as_of]
+            if close.empty:
+                return pd.DataFrame(columns=columns)
+        c = close.to_numpy(dtype=np.float64)
+        h = high.to_numpy(dtype=np.float64)
+        l = low.to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(c) | np.isnan(h) | np.isnan(l))
+        c, rows = _compact(c, valid)
+        h, _ = _compact(h, valid)
+        l, _ = _compact(l, valid)
+        if len(c) <= self.entry_length:
+            return pd.DataFrame(columns=columns)
+
+        # ATR 需要完整历史；通道只需前一根K线上的值
+        last, prev = c[-1], c[-2]
+        atr = self._atr(h, l, c)[-1]
+        entry_long = h[-1 - self.entry_length:-1].max(axis=0)
+        entry_short = l[-1 - self.entry_length:-1].min(axis=0)
+        current = rows[-1] == len(close) - 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            long_ = current & (prev <= entry_long) & (entry_long < last) & (atr > 0)
+            short = current & (prev >= entry_short) & (entry_short > last) & (atr > 0)
+            strength = np.where(long_, (last - entry_long) / atr, (entry_short - last) / atr)
+        hit = long_ | short
+        result = pd.DataFrame({
+            'symbol': close.columns[hit],
+            'direction': np.where(long_[hit], 'long', 'short'),
+            'close': last[hit],
+            'channel': np.where(long_[hit], entry_long[hit], entry_short[hit]),
+            'atr': atr[hit],
+            'strength': strength[hit],
+        }, columns=columns)
+        result = result.sort_values('strength', ascending=False, kind='stable').reset_index(drop=True)
+        return result.head(top) if top is not None else result
+
+
+def scan(data: Union[Dict[str, pd.DataFrame], pd.DataFrame], entry_length: int = 20, exit_length: int = 10,
+         atr_period: int = 14, as_of=None, top: Optional[int] = None) -> pd.DataFrame:
+    """扫描全市场突破候选（参数与返回见 `BreakoutScanner.scan`，`data` 见 `pivot_panel`）"""
+    panel = pivot_panel(data)
+    return BreakoutScanner(entry_length, exit_length, atr_period).scan(panel['high'], panel['low'], panel['close'],
+                                                                        as_of=as_of, top=top)
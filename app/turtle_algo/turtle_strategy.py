@@ -5,7 +5,13 @@
 
 import pandas as pd
 import numpy as np
-import pandas_ta as ta  # 使用 pandas-ta 作为 ta-lib 的纯 Python 替代
+from app.turtle_algo.indicators import get_backend
+from app.utils.metrics import metrics
+
+# generate_signals 逐K线推进的内部状态字段（用于检查点与增量续算）
+STATE_FIELDS = ('units', 'position', 'avg_price', 'last_trade_win',
+                'trailing_stop_long', 'trailing_stop_short', 'real_entry_price_long', 'real_entry_price_short',
+                'add_unit_price_long', 'add_unit_price_short')
 
 class TurtleStrategy:
     """海龟交易策略的面向对象实现
@@ -21,11 +27,12 @@ class TurtleStrategy:
     - mode: 'Mode 1' 或 'Mode 2'
     - entry_length_mode2: 系统2进场长度
     - exit_length_mode2: 系统2出场长度
+    - indicator_backend: 指标后端（'talib'/'numpy'/'pandas'/'auto'，默认按环境自动选择）
     """
 
     def __init__(self, entry_length=20, exit_length=10, atr_period=14, risk_per_trade=0.02,
                  initial_stop_atr_multiple=2, pyramid_atr_multiple=0.5, max_units=4,
-                 mode='Mode 1', entry_length_mode2=55, exit_length_mode2=20):
+                 mode='Mode 1', entry_length_mode2=55, exit_length_mode2=20, indicator_backend=None):
         """
         初始化策略参数
         :param entry_length: 系统1进场长度
@@ -38,6 +45,7 @@ class TurtleStrategy:
         :param mode: 'Mode 1' 或 'Mode 2'
         :param entry_length_mode2: 系统2进场长度
         :param exit_length_mode2: 系统2出场长度
+        :param indicator_backend: 指标后端名称
         """
         self.entry_length = entry_length
         self.exit_length = exit_length
@@ -49,6 +57,7 @@ class TurtleStrategy:
         self.mode = mode
         self.entry_length_mode2 = entry_length_mode2
         self.exit_length_mode2 = exit_length_mode2
+        self.indicator_backend = get_backend(indicator_backend)
 
         # 内部状态
         self.units = 0
@@ -62,6 +71,7 @@ class TurtleStrategy:
         self.position = 0  # 0: 无仓位, 1: 多头, -1: 空头
         self.avg_price = np.nan
 
+    @metrics.timed('strategy_indicators')
     def compute_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """计算策略所需指标
 
@@ -72,37 +82,72 @@ class TurtleStrategy:
         - DataFrame：新增 ATR、进出场参考价列
         """
         df = data.copy()
+        backend = self.indicator_backend
+        high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
 
         # 计算ATR
-        df['atr'] = ta.volatility.atr(df['high'], df['low'], df['close'], window=self.atr_period)
+        df['atr'] = backend.atr(high, low, close, self.atr_period)
 
         # 根据模式计算进出场价格
         if self.mode == 'Mode 1':
-            df['entry_long'] = df['high'].rolling(window=self.entry_length).max()
-            df['entry_short'] = df['low'].rolling(window=self.entry_length).min()
-            df['exit_long'] = df['low'].rolling(window=self.exit_length).min()
-            df['exit_short'] = df['high'].rolling(window=self.exit_length).max()
+            entry_length, exit_length = self.entry_length, self.exit_length
         else:
-            df['entry_long'] = df['high'].rolling(window=self.entry_length_mode2).max()
-            df['entry_short'] = df['low'].rolling(window=self.entry_length_mode2).min()
-            df['exit_long'] = df['low'].rolling(window=self.exit_length_mode2).min()
-            df['exit_short'] = df['high'].rolling(window=self.exit_length_mode2).max()
+            entry_length, exit_length = self.entry_length_mode2, self.exit_length_mode2
+        df['entry_long'] = backend.rolling_max(high, entry_length)
+        df['entry_short'] = backend.rolling_min(low, entry_length)
+        df['exit_long'] = backend.rolling_min(low, exit_length)
+        df['exit_short'] = backend.rolling_max(high, exit_length)
 
         return df
 
-    def generate_signals(self, df: pd.DataFrame, equity: float) -> pd.DataFrame:
+    def params(self) -> dict:
+        """返回影响计算结果的策略参数"""
+        return {
+            'entry_length': self.entry_length, 'exit_length': self.exit_length, 'atr_period': self.atr_period,
+            'risk_per_trade': self.risk_per_trade, 'initial_stop_atr_multiple': self.initial_stop_atr_multiple,
+            'pyramid_atr_multiple': self.pyramid_atr_multiple, 'max_units': self.max_units, 'mode': self.mode,
+            'entry_length_mode2': self.entry_length_mode2, 'exit_length_mode2': self.exit_length_mode2,
+        }
+
+    def get_state(self) -> dict:
+        """返回当前内部状态（见 `STATE_FIELDS`）"""
+        return {name: getattr(self, name) for name in STATE_FIELDS}
+
+    def set_state(self, state: dict):
+        """恢复内部状态"""
+        for name in STATE_FIELDS:
+            setattr(self, name, state[name])
+
+    @metrics.timed('strategy_signals')
+    def generate_signals(self, df: pd.DataFrame, equity: float, start: int = 1, states: list = None,
+                         risk_scale=None) -> pd.DataFrame:
         """生成交易信号
 
         参数
         - df: 指标数据帧（需包含 ATR 与进出场参考价）
         - equity: 当前账户权益（用于单位大小计算）
+        - start: 起始K线位置；大于 1 时保留此前的 `signal`/`unit_size`，调用方需先用 `set_state` 恢复第 start-1 根K线后的状态
+        - states: 可选列表，逐K线追加处理后的内部状态（`get_state()`），用于检查点
+        - risk_scale: 可选的单位大小缩放系数，标量或与 df 等长的逐K线序列，由调用方构建：
+          按策略自身权益可用 `app.risk.monitor.strategy_risk_scale`，其他权益来源逐K线取 `RiskMonitor.update` 的输出；
+          系数为 0 的K线不开新仓、不加仓，出场与止损照常执行
 
         返回
-        - DataFrame：`signal` 列包含 'long'/'short'/'exit'/'add_long'/'add_short'/'stop_long'/'stop_short'
+        - DataFrame：`signal` 列包含 'long'/'short'/'exit'/'add_long'/'add_short'/'stop_long'/'stop_short'，
+          `unit_size` 列为各K线上进场/加仓使用的单位大小
         """
-        df['signal'] = None
+        start = max(start, 1)
+        if start == 1 or 'signal' not in df:
+            df['signal'] = None
+        else:
+            df.iloc[start:, df.columns.get_loc('signal')] = None
+        if start > 1 and 'unit_size' in df:
+            unit_sizes = df['unit_size'].to_numpy(dtype=np.float64, copy=True)
+        else:
+            unit_sizes = np.full(len(df), np.nan)
+        scales = np.broadcast_to(np.asarray(1.0 if risk_scale is None else risk_scale, dtype=np.float64), (len(df),))
 
-        for i in range(1, len(df)):
+        for i in range(start, len(df)):
             close = df['close'].iloc[i]
             prev_close = df['close'].iloc[i-1]
             atr = df['atr'].iloc[i]
@@ -111,11 +156,13 @@ class TurtleStrategy:
             exit_long = df['exit_long'].iloc[i-1]
             exit_short = df['exit_short'].iloc[i-1]
 
-            # 单位大小
-            unit_size = (equity * self.risk_per_trade) / (self.initial_stop_atr_multiple * atr) if atr > 0 else 0
+            # 单位大小（按风险系数缩放）
+            scale = scales[i]
+            unit_size = (equity * self.risk_per_trade) / (self.initial_stop_atr_multiple * atr) * scale if atr > 0 else 0
+            unit_sizes[i] = unit_size
 
-            # 模式信号（Mode 1 跳过失败交易）
-            mode_signal = self.last_trade_win or self.mode != 'Mode 1'
+            # 模式信号（Mode 1 跳过失败交易；风险系数为 0 时停止开仓）
+            mode_signal = (self.last_trade_win or self.mode != 'Mode 1') and scale > 0
 
             # 长信号
             if self.position == 0 and prev_close <= entry_long < close and mode_signal:
@@ -152,7 +199,7 @@ class TurtleStrategy:
                 self._reset_state()
 
             # 加仓
-            if self.units < self.max_units:
+            if self.units < self.max_units and scale > 0:
                 if self.position > 0 and close > self.add_unit_price_long:
                     df.at[df.index[i], 'signal'] = 'add_long'
                     self.units += 1
@@ -180,6 +227,10 @@ class TurtleStrategy:
                 self.last_trade_win = self.avg_price > close
                 self._reset_state()
 
+            if states is not None:
+                states.append(self.get_state())
+
+        df['unit_size'] = unit_sizes
         return df
 
     def _reset_state(self):
@@ -1,11 +1,188 @@
 """日志工具
 
 提供统一的应用级日志记录器，带滚动文件与控制台输出。
+
+两种模式（`configure_logging` 或环境变量 `TURTLE_LOG_MODE`）：
+- sync（默认）：记录器直接挂接滚动文件与控制台处理器，调用方线程完成格式化与写入
+- queue：记录器只挂接 `QueueHandler`，调用方仅把记录放入内存队列；由后台 `QueueListener` 线程统一格式化与写入，
+  热路径上没有文件 I/O，滚动也只发生在一个线程中
+所有记录器共享同一组处理器（同一个文件句柄）。
+
+输出格式（`TURTLE_LOG_FORMAT`）：text（默认）或 json（每行一个 JSON 对象，`extra=` 传入的字段一并输出）。
+
+多进程：主进程调用 `worker_queue()` 取得跨进程队列，作为进程池初始化参数传给 `init_worker`；
+子进程的记录经该队列交由主进程的监听线程写入，避免多个进程同时写、滚动同一个文件。
 """
 
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Dict, List, Optional
+
+ENV_MODE = 'TURTLE_LOG_MODE'
+ENV_FORMAT = 'TURTLE_LOG_FORMAT'
+MODES = ('sync', 'queue')
+FORMATS = ('text', 'json')
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# LogRecord 的标准属性，其余属性视为 `extra=` 传入的结构化字段
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+_PLAIN = (str, int, float, bool, type(None), list, tuple, dict)
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出一行 JSON：`time, level, logger, message, process` 及 `extra=` 字段，异常时含 `exc`"""
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """只合并消息参数、保留 `extra=` 字段的队列处理器
+
+    标准实现会复制记录并在入队前用格式化器生成整行文本，这里只做 `msg % args` 并把异常转为文本，
+    时间戳与行格式留给监听线程处理，调用方的开销更小。queue 模式下每个记录器只挂接这一个处理器，
+    记录不会再交给其他处理器，因此原地修改而不复制。跨进程队列要求记录可序列化，
+    `extra=` 中非基础类型的值转为 repr。
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        fields = record.__dict__
+        for key in fields.keys() - _RESERVED:
+            if not isinstance(fields[key], _PLAIN):
+                fields[key] = repr(fields[key])
+        return record
+
+
+_lock = threading.RLock()
+_config: Dict = {}
+_loggers: Dict[str, logging.Logger] = {}
+_state: Dict = {}
+
+
+def _defaults() -> Dict:
+    mode = (os.environ.get(ENV_MODE) or 'sync').lower()
+    fmt = (os.environ.get(ENV_FORMAT) or 'text').lower()
+    return {
+        'mode': mode if mode in MODES else 'sync',
+        'format': fmt if fmt in FORMATS else 'text',
+        'level': logging.INFO,
+        'log_dir': Path(__file__).resolve().parents[2] / 'logs',
+        'console': True,
+    }
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if _config['format'] == 'json' else logging.Formatter(TEXT_FORMAT)
+
+
+def _handlers() -> List[logging.Handler]:
+    """共享的滚动文件与控制台处理器（首次使用时创建）"""
+    if 'handlers' not in _state:
+        log_dir = Path(_config['log_dir'])
+        log_dir.mkdir(parents=True, exist_ok=True)
+        formatter = _formatter()
+        handler = RotatingFileHandler(log_dir / 'app.log', maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
+        handler.setFormatter(formatter)
+        handlers = [handler]
+        if _config['console']:
+            stream = logging.StreamHandler()
+            stream.setFormatter(formatter)
+            handlers.append(stream)
+        _state['handlers'] = handlers
+    return _state['handlers']
+
+
+def _start_listener(q) -> QueueListener:
+    listener = QueueListener(q, *_handlers(), respect_handler_level=True)
+    listener.start()
+    _state.setdefault('listeners', []).append(listener)
+    return listener
+
+
+def _queue_handler() -> logging.Handler:
+    """当前进程记录器共用的队列处理器"""
+    if 'queue_handler' not in _state:
+        if 'worker_queue' in _state:
+            # 子进程：记录交给主进程的监听线程
+            q = _state['worker_queue']
+        else:
+            q = queue.SimpleQueue()
+            _start_listener(q)
+        _state['queue_handler'] = _QueueHandler(q)
+    return _state['queue_handler']
+
+
+def _attach(logger: logging.Logger):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.setLevel(_config['level'])
+    # 每个记录器都挂接了完整的处理器，向上传递会使带层级的名称（如 `a.b`）重复输出
+    logger.propagate = False
+    if _config['mode'] == 'queue' or 'worker_queue' in _state:
+        logger.addHandler(_queue_handler())
+    else:
+        for handler in _handlers():
+            logger.addHandler(handler)
+
+
+def shutdown():
+    """停止监听线程（写完队列中剩余的记录）并关闭文件"""
+    for listener in _state.pop('listeners', []):
+        listener.stop()
+    _state.pop('mp_queue', None)
+    _state.pop('queue_handler', None)
+    for handler in _state.pop('handlers', []):
+        handler.close()
+
+
+def configure_logging(mode: Optional[str] = None, fmt: Optional[str] = None, level: int = logging.INFO,
+                      log_dir: Optional[Path] = None, console: bool = True):
+    """设置日志模式，已通过 `get_logger` 创建的记录器会重新挂接处理器
+
+    参数
+    - mode: 'sync' 或 'queue'，为空时读取 `TURTLE_LOG_MODE`
+    - fmt: 'text' 或 'json'，为空时读取 `TURTLE_LOG_FORMAT`
+    - level: 日志级别
+    - log_dir: 日志目录，默认项目根下 `logs/`
+    - console: 是否同时输出到控制台
+    """
+    defaults = _defaults()
+    mode = (mode or defaults['mode']).lower()
+    fmt = (fmt or defaults['format']).lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown log mode: {mode}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}")
+    with _lock:
+        shutdown()
+        _config.update(mode=mode, format=fmt, level=level, log_dir=Path(log_dir or defaults['log_dir']), console=console)
+        for logger in _loggers.values():
+            _attach(logger)
+
 
 def get_logger(name: str) -> logging.Logger:
     """获取命名日志记录器
@@ -14,19 +191,66 @@ def get_logger(name: str) -> logging.Logger:
     - name: 日志记录器名称
 
     返回
-    - logging.Logger：已配置的记录器（INFO 级别，滚动文件与控制台双渠道）
+    - logging.Logger：已配置的记录器（INFO 级别，滚动文件与控制台双渠道；queue 模式下经后台线程写入）
     """
     logger = logging.getLogger(name)
-    if logger.handlers:
-        return logger
-    logger.setLevel(logging.INFO)
-    log_dir = Path(__file__).resolve().parents[2] / 'logs'
-    log_dir.mkdir(parents=True, exist_ok=True)
-    handler = RotatingFileHandler(log_dir / 'app.log', maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
-    formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    stream = logging.StreamHandler()
-    stream.setFormatter(formatter)
-    logger.addHandler(stream)
-    return logger
\ No newline at end of file
+    with _lock:
+        if name in _loggers:
+            return logger
+        if logger.handlers:
+            # 由外部配置过的记录器保持原样
+            return logger
+        if not _config:
+            _config.update(_defaults())
+        _attach(logger)
+        _loggers[name] = logger
+    return logger
+
+
+def worker_queue():
+    """主进程中取得供子进程使用的跨进程队列（首次调用时启动对应的监听线程）
+
+    返回
+    - multiprocessing.Queue：作为 `init_worker` 的参数传给进程池（进程池需使用默认的启动方式）
+    """
+    with _lock:
+        if not _config:
+            _config.update(_defaults())
+        if 'mp_queue' not in _state:
+            import multiprocessing
+            q = multiprocessing.get_context().Queue()
+            _start_listener(q)
+            _state['mp_queue'] = q
+        return _state['mp_queue']
+
+
+def init_worker(q, level: int = logging.INFO):
+    """子进程初始化：本进程的记录器只写入 `q`，由主进程统一落盘
+
+    用法：`ProcessPoolExecutor(initializer=init_worker, initargs=(worker_queue(),))`
+    """
+    with _lock:
+        # fork 启动时 `_after_fork` 可能已为本进程创建了处理器，关闭后改为写入 q
+        shutdown()
+        if not _config:
+            _config.update(_defaults())
+        _config['level'] = level
+        _state['worker_queue'] = q
+        for logger in _loggers.values():
+            _attach(logger)
+
+
+def _after_fork():
+    """fork 出的子进程未调用 `init_worker` 时，丢弃继承的监听线程状态，首次写日志时重新创建"""
+    global _lock
+    _lock = threading.RLock()
+    if not _state or 'worker_queue' in _state:
+        return
+    _state.clear()
+    for logger in _loggers.values():
+        _attach(logger)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+atexit.register(shutdown)
@@ -0,0 +1,226 @@
+"""轻量指标与性能剖析
+
+提供进程内计数器与计时器，可导出为 Prometheus 文本格式或 JSON，并支持按次运行的 cProfile/pyinstrument 剖析。
+
+默认关闭：关闭时 `timer` 返回共享的空上下文、`incr` 直接返回，热路径开销仅为一次属性判断。
+通过 `metrics.enable()` 或环境变量 `TURTLE_METRICS=1` 开启。
+
+示例
+    from app.utils.metrics import metrics
+    with metrics.timer('cache_read', category='a_spot_em'):
+        ...
+    metrics.incr('cache_hit', category='a_spot_em')
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+ENV_METRICS = 'TURTLE_METRICS'
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _NullTimer:
+    """关闭状态下的空计时器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_registry', '_key', '_t0')
+
+    def __init__(self, registry: 'Metrics', key: _Key):
+        self._registry = registry
+        self._key = key
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._registry._record(self._key, time.perf_counter() - self._t0)
+        return False
+
+
+def _key(name: str, labels: Dict) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """指标注册表
+
+    参数
+    - enabled: 是否开启；为空时读取环境变量 `TURTLE_METRICS`
+    """
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.environ.get(ENV_METRICS, '').lower() in ('1', 'true', 'yes', 'on')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._timers: Dict[_Key, list] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """清空已采集的数据"""
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """计数器累加"""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def timer(self, name: str, **labels):
+        """计时上下文管理器"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, _key(name, labels))
+
+    def observe(self, name: str, seconds: float, **labels):
+        """记录一次外部测得的耗时"""
+        if self.enabled:
+            self._record(_key(name, labels), seconds)
+
+    def _record(self, key: _Key, seconds: float):
+        with self._lock:
+            stat = self._timers.get(key)
+            if stat is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                if seconds > stat[2]:
+                    stat[2] = seconds
+
+    def timed(self, name: str, **labels):
+        """计时装饰器（关闭时仅多一次判断）"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, _key(name, labels)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict:
+        """返回可 JSON 序列化的快照"""
+        with self._lock:
+            counters = [{'name': k[0], 'labels': dict(k[1]), 'value': v} for k, v in self._counters.items()]
+            timers = [{'name': k[0], 'labels': dict(k[1]), 'count': s[0], 'sum_seconds': s[1], 'max_seconds': s[2]}
+                      for k, s in self._timers.items()]
+        return {'timestamp': time.time(), 'counters': counters, 'timers': timers}
+
+    def to_json(self, path):
+        """导出 JSON 文件"""
+        Path(path).write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def to_prometheus(self, path=None) -> str:
+        """导出 Prometheus 文本格式（可供 node_exporter textfile collector 读取），返回文本"""
+        snap = self.snapshot()
+        lines = []
+        for c in sorted(snap['counters'], key=lambda x: x['name']):
+            lines.append(f"turtle_{_metric_name(c['name'])}_total{_labels(c['labels'])} {c['value']}")
+        for t in sorted(snap['timers'], key=lambda x: x['name']):
+            base = f"turtle_{_metric_name(t['name'])}_seconds"
+            labels = _labels(t['labels'])
+            lines.append(f"{base}_count{labels} {t['count']}")
+            lines.append(f"{base}_sum{labels} {t['sum_seconds']:.9f}")
+            lines.append(f"{base}_max{labels} {t['max_seconds']:.9f}")
+        text = '\n'.join(lines) + '\n'
+        if path is not None:
+            Path(path).write_text(text, encoding='utf-8')
+        return text
+
+    def export(self, path):
+        """按扩展名导出：`.json` 为 JSON，其余为 Prometheus 文本"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.json':
+            self.to_json(path)
+        else:
+            self.to_prometheus(path)
+
+
+def _metric_name(name: str) -> str:
+    return ''.join(ch if ch.isalnum() or ch == '_' else '_' for ch in name)
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    inner = ','.join(f'{_metric_name(k)}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return '{' + inner + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profile_run(path=None, top: int = 30):
+    """对代码块做性能剖析
+
+    参数
+    - path: 输出路径；`.html` 且已安装 pyinstrument 时输出其 HTML 报告，否则输出 cProfile 的 `.prof`（同名 `.txt` 为按累计耗时排序的摘要）；为空则不剖析
+    - top: 文本摘要保留的函数数
+    """
+    if path is None:
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.html':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path.write_text(profiler.output_html(), encoding='utf-8')
+            return
+        path = path.with_suffix('.prof')
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
+        with open(path.with_suffix('.txt'), 'w', encoding='utf-8') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(top)
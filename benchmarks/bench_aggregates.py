@@ -0,0 +1,136 @@
+"""报表聚合基准
+
+在临时目录中用合成数据（多标的行情、涨停池/融资融券/全市场快照缓存、提及标的代码的文档）比较：
+- 重算：每次出报表都对全部标的重跑指标与信号、提取交易，并从缓存与文档库重算温度与相关文档（朴素做法）
+- 预计算：首次全量构建聚合表，之后只读取聚合表生成报表
+- 增量：一部分标的有新K线、新增一天缓存与一批文档时的聚合更新耗时
+并核对两种方式得到的触发信号与策略汇总一致。
+
+用法：`python -m benchmarks.bench_aggregates --symbols 200 --bars 1000`
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from app.backtest.robustness import extract_trades, summarize
+from app.cache.cache_manager import CacheManager
+from app.dashboard.aggregates import AggregateStore
+from app.data.storage import TextStorage
+from app.scheduler.daemon import SignalDaemon
+from app.turtle_algo.turtle_strategy import TurtleStrategy
+from benchmarks.synthetic import generate_documents, generate_margin, generate_ohlc, generate_spot_snapshot, \
+    generate_universe, generate_zt_pool
+
+
+def _signals(data):
+    frames, latest = {}, {}
+    for symbol, df in data.items():
+        strategy = TurtleStrategy()
+        frames[symbol] = strategy.generate_signals(strategy.compute_indicators(df), 10000.0)
+        latest[symbol] = SignalDaemon._latest_signal(symbol, frames[symbol], strategy)
+    return frames, latest
+
+
+def _recompute(data, cache, storage, days):
+    """朴素报表：从原始数据重算全部内容"""
+    frames, latest = _signals(data)
+    summaries = [summarize(extract_trades(df)['return'].to_numpy(dtype=float)) for df in frames.values()]
+    limit_up = [len(cache.read('zt_pool_em', d, 0)) for d in days]
+    margin = [cache.read('margin_sse', f'{d}_{d}', 0)['融资余额'].iloc[-1] for d in days]
+    news = {s: storage.query(s, limit=5) for s in latest}
+    fired = sorted(s for s, v in latest.items() if v['signal'] is not None)
+    return fired, sum(x['trades'] for x in summaries), len(limit_up) + len(margin) + len(news)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report aggregates benchmark")
+    parser.add_argument("--symbols", type=int, default=200, help="标的数")
+    parser.add_argument("--bars", type=int, default=1000, help="每个标的的K线数")
+    parser.add_argument("--days", type=int, default=250, help="缓存的交易日数")
+    parser.add_argument("--docs", type=int, default=5000, help="文档数")
+    parser.add_argument("--changed", type=float, default=0.05, help="增量更新中有新K线的标的比例")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='turtle_agg_') as tmp:
+        tmp = Path(tmp)
+        data = generate_universe(args.symbols, args.bars)
+        symbols = list(data)
+        cache = CacheManager(tmp / 'cache')
+        days = [d.strftime('%Y%m%d') for d in pd.bdate_range('2023-01-02', periods=args.days + 1)]
+        for i, day in enumerate(days[:-1]):
+            cache.write('zt_pool_em', day, generate_zt_pool(day, seed=i))
+            cache.write('margin_sse', f'{day}_{day}', generate_margin(day, seed=i))
+        cache.write('a_spot_em', 'all', generate_spot_snapshot(5000))
+        storage = TextStorage(tmp / 'text.db', dedup=False)
+        docs = generate_documents(args.docs)
+        for i, doc in enumerate(docs):
+            doc['content'] = f"{symbols[i % len(symbols)]} " + doc['content']
+        storage.save_documents(docs)
+        aliases = {s: [] for s in symbols}
+
+        t0 = time.perf_counter()
+        fired, trades, _ = _recompute(data, cache, storage, days[:-1])
+        recompute = time.perf_counter() - t0
+
+        store = AggregateStore(tmp / 'aggregates')
+        t0 = time.perf_counter()
+        frames, latest = _signals(data)
+        store.update_signals(latest)
+        store.update_equity(TurtleStrategy(), frames)
+        store.update_temperature(cache, as_of=pd.Timestamp(days[-2]).date())
+        store.update_news(storage, aliases)
+        build = time.perf_counter() - t0
+
+        store = AggregateStore(tmp / 'aggregates')
+        t0 = time.perf_counter()
+        report = store.report(top=len(symbols))
+        cold = time.perf_counter() - t0
+        runs = 50
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            report = store.report(top=len(symbols))
+        warm = (time.perf_counter() - t0) / runs
+        assert sorted(r['symbol'] for r in report['fired']) == fired
+        strength = [abs(r['breakout']) for r in report['fired'] if r['breakout'] == r['breakout']]
+        assert strength == sorted(strength, reverse=True)
+        assert report['strategies'][0]['trades'] == trades
+
+        # 增量：部分标的多一根K线，多一天缓存，新增一批文档
+        changed = symbols[:max(1, int(len(symbols) * args.changed))]
+        for symbol in changed:
+            df = data[symbol]
+            bar = generate_ohlc(1, seed=int(symbol), start_price=float(df['close'].iloc[-1]))
+            bar.index = [df.index[-1] + pd.offsets.BDay()]
+            data[symbol] = pd.concat([df, bar])
+        day = days[-1]
+        cache.write('zt_pool_em', day, generate_zt_pool(day, seed=len(days)))
+        cache.write('margin_sse', f'{day}_{day}', generate_margin(day, seed=len(days)))
+        new_docs = generate_documents(200, seed=1)
+        for i, doc in enumerate(new_docs):
+            doc['content'] = f"{changed[i % len(changed)]} " + doc['content']
+        storage.save_documents(new_docs)
+
+        t0 = time.perf_counter()
+        frames, latest = _signals({s: data[s] for s in changed})
+        counts = {'signals': store.update_signals(latest), 'equity': store.update_equity(TurtleStrategy(), frames),
+                  'temperature': store.update_temperature(cache, as_of=pd.Timestamp(day).date()),
+                  'news': store.update_news(storage, aliases)}
+        incremental = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        _recompute(data, cache, storage, days)
+        recompute_after = time.perf_counter() - t0
+
+        size = sum(p.stat().st_size for p in (tmp / 'aggregates').iterdir())
+        print(f"{args.symbols} symbols x {args.bars} bars, {args.days} cached days, {args.docs:,} docs")
+        print(f"recompute report      {recompute * 1e3:>9.1f}ms")
+        print(f"build aggregates      {build * 1e3:>9.1f}ms  ({size / 1024:.0f} KiB on disk)")
+        print(f"report (cold read)    {cold * 1e3:>9.1f}ms")
+        print(f"report (warm)         {warm * 1e3:>9.2f}ms  fired {len(report['fired'])}, "
+              f"temperature {report['temperature']['score'] if report['temperature'] else None}")
+        print(f"incremental update    {incremental * 1e3:>9.1f}ms  {counts}  vs recompute {recompute_after * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
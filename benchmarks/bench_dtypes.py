@@ -0,0 +1,69 @@
+"""紧凑类型的内存与文件体积对比
+
+分别以默认类型（当前行为）与 `app.data.schema.optimize` 转换后的类型写入 Parquet，
+报告内存占用、文件体积与读取耗时。默认使用合成的全市场快照；`--cache-dir` 指定时额外统计已有缓存文件。
+
+用法
+- `python -m benchmarks.bench_dtypes --rows 5000`
+- `python -m benchmarks.bench_dtypes --cache-dir data/cache`
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import pandas as pd
+from app.data.schema import footprint, optimize
+from benchmarks.synthetic import generate_spot_snapshot
+
+
+def measure(df: pd.DataFrame, category: Optional[str], workdir: Path, repeat: int = 5) -> Dict:
+    """返回原始与紧凑类型的内存（字节）、文件体积（字节）与读取耗时（秒）"""
+    result = {}
+    for label, frame in (('raw', df), ('compact', optimize(df, category))):
+        path = workdir / f'{label}.parquet'
+        frame.to_parquet(path, index=False)
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            pd.read_parquet(path)
+            best = min(best, time.perf_counter() - t0)
+        result[label] = {'memory': footprint(frame), 'file': path.stat().st_size, 'read': best}
+    return result
+
+
+def _report(name: str, res: Dict):
+    raw, compact = res['raw'], res['compact']
+    print(f"{name:<24} memory {raw['memory'] / 1024:>9,.0f}KB -> {compact['memory'] / 1024:>9,.0f}KB "
+          f"({1 - compact['memory'] / raw['memory']:>4.0%} saved)  "
+          f"file {raw['file'] / 1024:>8,.0f}KB -> {compact['file'] / 1024:>8,.0f}KB "
+          f"({1 - compact['file'] / raw['file']:>4.0%} saved)  "
+          f"read {raw['read'] * 1000:.1f}ms -> {compact['read'] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact dtype savings benchmark")
+    parser.add_argument("--rows", type=int, default=5000, help="合成快照行数")
+    parser.add_argument("--repeat", type=int, default=5, help="读取重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--cache-dir", type=str, default=None, help="统计已有缓存目录（<分类>/<键>.parquet）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='turtle_dtypes_') as tmp:
+        workdir = Path(tmp)
+        _report('synthetic a_spot_em', measure(generate_spot_snapshot(args.rows, args.seed), 'a_spot_em', workdir, args.repeat))
+        if args.cache_dir:
+            for path in sorted(Path(args.cache_dir).glob('*/*.parquet')):
+                try:
+                    df = pd.read_parquet(path)
+                except Exception as e:
+                    print(f"skip {path}: {e}")
+                    continue
+                if df.empty:
+                    continue
+                _report(f'{path.parent.name}/{path.stem}'[:24], measure(df, path.parent.name, workdir, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
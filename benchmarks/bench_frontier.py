@@ -0,0 +1,127 @@
+"""抓取队列基准
+
+用内存中的合成站点（若干列表页，每页链接若干文章）驱动 `FrontierCrawler`，不发起网络请求：
+1. 首轮抓取在中途中断，重新启动后从队列状态续跑，报告启动到领取首个 URL 的耗时，并检查没有页面被抓取两次
+2. 站点新增文章后再次运行，检查只抓取列表页与新文章
+3. 报告队列开销（pages/sec，不含网络）与不同队列规模下单次领取的耗时
+
+用法：`python -m benchmarks.bench_frontier --listings 20 --per-listing 200`
+"""
+
+import argparse
+import collections
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from app.data.storage import TextStorage
+from app.ingest.frontier import CrawlFrontier, FrontierCrawler
+from app.ingest.gov_spider import GovSpider
+from benchmarks.synthetic import generate_html
+
+
+class _Interrupted(BaseException):
+    pass
+
+
+class SyntheticSite:
+    """内存站点：`/list/<i>` 为列表页，`/article/<i>/<j>` 为文章页；记录每个 URL 的请求次数"""
+    def __init__(self, host: str, listings: int, per_listing: int):
+        self.host = host
+        self.listings = listings
+        self.per_listing = per_listing
+        self.requests = collections.Counter()
+        self.fail_after = None
+        self._parser = GovSpider()
+        self._article = generate_html(seed=0, paragraphs=5)
+
+    def listing_urls(self):
+        return [f'https://{self.host}/list/{i}' for i in range(self.listings)]
+
+    def fetch(self, url: str) -> str:
+        if self.fail_after is not None and sum(self.requests.values()) >= self.fail_after:
+            raise _Interrupted()
+        self.requests[url] += 1
+        path = url.split(self.host, 1)[1]
+        if path.startswith('/list/'):
+            i = int(path.rsplit('/', 1)[1])
+            links = ''.join(f'<li><a href="/article/{i}/{j}">公告{j}</a></li>' for j in range(self.per_listing))
+            return f'<html><body><ul>{links}</ul><a href="https://other.example.com/x">外链</a></body></html>'
+        return self._article
+
+    def parse(self, url: str, html: str):
+        doc = self._parser.parse(url, html)
+        doc['content'] = f'{url}\n' + doc['content']
+        return doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl frontier benchmark")
+    parser.add_argument("--listings", type=int, default=20, help="列表页数")
+    parser.add_argument("--per-listing", type=int, default=200, help="每个列表页的文章数")
+    parser.add_argument("--growth", type=int, default=20, help="第二轮每个列表页新增的文章数")
+    args = parser.parse_args()
+
+    site = SyntheticSite('www.example.gov.cn', args.listings, args.per_listing)
+    total = args.listings * (args.per_listing + 1)
+    with tempfile.TemporaryDirectory(prefix='turtle_frontier_') as tmp:
+        db = Path(tmp) / 'text.db'
+        storage = TextStorage(db, dedup=False)
+        frontier = CrawlFrontier(db, delay=0)
+        for url in site.listing_urls():
+            frontier.add_listing(url, 'gov', interval=0.5, pattern=r'/article/')
+
+        # 1. 中途中断后续跑
+        site.fail_after = total // 2
+        t0 = time.perf_counter()
+        try:
+            FrontierCrawler(frontier, storage, {'gov': site}, max_wait=0).run()
+        except _Interrupted:
+            pass
+        first = time.perf_counter() - t0
+        frontier.close()
+        print(f"run 1 interrupted after {sum(site.requests.values()):,} requests, frontier {CrawlFrontier(db).stats()}")
+
+        site.fail_after = None
+        t0 = time.perf_counter()
+        frontier = CrawlFrontier(db, delay=0)
+        crawler = FrontierCrawler(frontier, storage, {'gov': site}, max_wait=0)
+        frontier.release_leases()
+        resume = time.perf_counter() - t0
+        first_claim = frontier.claim() is not None
+        frontier.release_leases()
+        t0 = time.perf_counter()
+        stats = crawler.run()
+        second = time.perf_counter() - t0
+        repeated = sum(1 for url, n in site.requests.items() if n > 1 and '/article/' in url)
+        docs = sqlite3.connect(db).execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+        print(f"resumed in {resume * 1e3:.1f}ms (claimable: {first_claim}); run 2 {stats}")
+        print(f"documents {docs:,}/{args.listings * args.per_listing:,}, articles fetched twice: {repeated}")
+        pages = sum(site.requests.values())
+        print(f"frontier throughput (no network): {pages / (first + second):,.0f} pages/sec")
+
+        # 2. 站点新增文章后只抓新链接
+        site.per_listing += args.growth
+        site.requests.clear()
+        time.sleep(0.5)
+        stats = crawler.run()
+        new_articles = sum(1 for url in site.requests if '/article/' in url)
+        print(f"incremental: {stats}, new articles fetched {new_articles}/{args.listings * args.growth}, "
+              f"listing polls {sum(1 for url in site.requests if '/list/' in url)}")
+        frontier.close()
+
+        # 3. 单次领取耗时随队列规模的变化
+        print(f"{'frontier':>10} {'claim':>10}")
+        for size in (1000, 10000, 100000):
+            f = CrawlFrontier(Path(tmp) / f'claim_{size}.db', delay=0)
+            f.add((f'https://host{i % 50}.example.com/a/{i}' for i in range(size)), 'gov')
+            t0 = time.perf_counter()
+            for _ in range(200):
+                item = f.claim()
+                f.mark_fetched([item['url']])
+            print(f"{size:>10,} {(time.perf_counter() - t0) / 200 * 1e6:>8,.0f}µs")
+            f.close()
+
+
+if __name__ == "__main__":
+    main()
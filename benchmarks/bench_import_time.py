@@ -0,0 +1,124 @@
+"""导入耗时回归基准
+
+以 `python -X importtime` 在独立子进程中导入目标模块，汇总累计导入耗时，并检查：
+- 禁止在导入期加载的重依赖（如 `main` 不应导入 akshare/pandas）
+- 与 JSON 基线相比的耗时回归（超过阈值则以非零状态退出）
+
+另测量 `python main.py --help` 的端到端墙钟时间。
+
+用法：
+- `python -m benchmarks.bench_import_time`：对比基线
+- `python -m benchmarks.bench_import_time --save-baseline`：写入/更新基线
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = ROOT / 'benchmarks' / 'baselines' / 'import_time.json'
+
+# 目标模块 -> 导入期不得出现的顶层包
+TARGETS = {
+    'main': ['akshare', 'pandas', 'pandas_ta', 'talib'],
+    'app.data.akshare_adapters': ['akshare'],
+    'app.bond.bond_data': ['akshare'],
+    'app.turtle_algo.turtle_strategy': ['akshare', 'pandas_ta'],
+}
+
+
+def measure_import(module: str) -> Dict:
+    """在子进程中导入模块，返回累计耗时（微秒）与已加载的顶层包"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    total_us = 0
+    packages = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        packages.add(stripped.split('.')[0])
+        # 缩进为 1 个空格者为顶层导入，其累计耗时已包含子导入
+        if len(name) - len(stripped) == 1:
+            total_us += int(parts[1])
+    return {'cumulative_us': total_us, 'packages': sorted(packages)}
+
+
+def measure_help(repeat: int = 3) -> float:
+    """返回 `main.py --help` 的最短墙钟耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, 'main.py', '--help'], cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(repeat: int = 3) -> Dict:
+    """采集全部目标的导入耗时（取多次最小值）"""
+    results = {}
+    for module, forbidden in TARGETS.items():
+        samples = [measure_import(module) for _ in range(repeat)]
+        loaded = set(samples[0]['packages'])
+        results[module] = {
+            'cumulative_us': min(s['cumulative_us'] for s in samples),
+            'forbidden_loaded': sorted(loaded.intersection(forbidden)),
+        }
+    results['main --help'] = {'wall_s': measure_help(repeat)}
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """返回违规描述列表：禁止依赖被加载或耗时超过基线 (1 + threshold) 倍"""
+    problems = []
+    for name, res in results.items():
+        if res.get('forbidden_loaded'):
+            problems.append(f"{name}: heavy imports loaded eagerly: {', '.join(res['forbidden_loaded'])}")
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ('cumulative_us', 'wall_s'):
+            if metric in res and metric in base and base[metric] > 0 and res[metric] > base[metric] * (1 + threshold):
+                problems.append(f"{name}: {metric} {res[metric]} exceeds baseline {base[metric]} by more than {threshold:.0%}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression benchmark")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE), help="基线 JSON 路径")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对回归比例")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基线")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, res in results.items():
+        value = f"{res['cumulative_us'] / 1000:.1f} ms" if 'cumulative_us' in res else f"{res['wall_s'] * 1000:.1f} ms"
+        print(f"{name:<36} {value:>12}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"基线已写入: {baseline_path}")
+        return
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+    problems = compare(results, baseline, args.threshold)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""指标后端微基准
+
+对每个可用后端测量 ATR 与滚动极值的吞吐（bars/sec），并在计时前交叉校验输出一致。
+
+用法：`python -m benchmarks.bench_indicators --bars 100000 --repeat 5`
+"""
+
+import argparse
+import time
+from app.turtle_algo.indicators import available_backends, cross_validate, get_backend
+from benchmarks.synthetic import generate_ohlc
+
+
+def bench_backend(name: str, data, period: int = 14, windows=(10, 20), repeat: int = 5) -> float:
+    """返回单个后端的吞吐（bars/sec，取多次运行中的最快一次）"""
+    backend = get_backend(name)
+    high, low, close = data['high'].to_numpy(), data['low'].to_numpy(), data['close'].to_numpy()
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        backend.atr(high, low, close, period)
+        for w in windows:
+            backend.rolling_max(high, w)
+            backend.rolling_min(low, w)
+        best = min(best, time.perf_counter() - t0)
+    return len(data) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indicator backend micro-benchmark")
+    parser.add_argument("--bars", type=int, default=100000, help="K线数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument("--period", type=int, default=14, help="ATR周期")
+    args = parser.parse_args()
+
+    data = generate_ohlc(args.bars, freq='min')
+    backends = available_backends()
+    errors = cross_validate(data, period=args.period, backends=backends)
+    print(f"{'backend':<8} {'bars/sec':>14} {'max_abs_err':>12}")
+    for name in backends:
+        rate = bench_backend(name, data, period=args.period, repeat=args.repeat)
+        print(f"{name:<8} {rate:>14,.0f} {errors[name]:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
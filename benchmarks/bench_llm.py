@@ -0,0 +1,109 @@
+"""LLM 连接器基准
+
+用本地 stub 后端（模拟每次调用的固定延迟与逐条开销）离线比较：
+- 逐条串行：每个标的单独调用，不缓存、不合并（朴素做法）
+- 连接器首轮：合并相同输入、按批调用、并发发送并写入缓存
+- 连接器次轮：同样的输入全部命中缓存，不发起调用
+- 部分更新：少量标的的文档变化，只为变化的标的发起调用
+- 并发合并：多个线程同时请求重叠的标的集合，相同输入只发送一次
+- 预算：token 预算不足时超出部分不发送
+输入由合成信号与 `TextStorage` 中的合成文档组装，其中一部分标的的信号与文档相同（合并的对象）。
+
+用法：`python -m benchmarks.bench_llm --symbols 200 --latency 0.2`
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from app.data.storage import TextStorage
+from app.llm.connector import RESEARCH_TEMPLATE, LLMConnector, ResponseCache, StubBackend, research_inputs
+from benchmarks.synthetic import generate_documents
+
+
+def _signals(n: int, distinct: int):
+    """n 个请求，只有 distinct 种不同的输入（模拟多个调用方请求相同标的）"""
+    out = []
+    for i in range(n):
+        k = i % distinct
+        out.append({'symbol': f'11{k:04d}', 'date': '2024-06-28', 'signal': ('long', None, 'exit')[k % 3],
+                    'close': 100 + k % 17, 'atr': 1.5, 'position': k % 2, 'last_signal': 'long',
+                    'last_signal_date': '2024-06-20'})
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM connector benchmark")
+    parser.add_argument("--symbols", type=int, default=200, help="请求数")
+    parser.add_argument("--distinct", type=int, default=150, help="不同输入数")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub 每次调用的延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发调用数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='turtle_llm_') as tmp:
+        storage = TextStorage(Path(tmp) / 'text.db', dedup=False)
+        docs = generate_documents(2000)
+        for i, doc in enumerate(docs):
+            doc['content'] = f"11{i % args.distinct:04d} " + doc['content']
+        storage.save_documents(docs)
+        signals = _signals(args.symbols, args.distinct)
+        t0 = time.perf_counter()
+        inputs = [research_inputs(s, storage) for s in signals]
+        print(f"assembled {len(inputs)} prompts in {(time.perf_counter() - t0) * 1e3:.0f}ms")
+
+        backend = StubBackend(latency=args.latency)
+        t0 = time.perf_counter()
+        for item in inputs:
+            backend.complete([RESEARCH_TEMPLATE.render(item)])
+        naive = time.perf_counter() - t0
+        print(f"naive sequential      {naive:>7.2f}s  calls {backend.calls}")
+
+        def report(label, connector, started, before):
+            stats = connector.stats
+            print(f"{label:<21} {time.perf_counter() - started:>7.2f}s  calls {stats['calls'] - before['calls']}, "
+                  f"sent {stats['sent'] - before['sent']}, cache hits {stats['cache_hits'] - before['cache_hits']}, "
+                  f"coalesced {stats['coalesced'] - before['coalesced']}")
+
+        cache = ResponseCache(Path(tmp) / 'llm_cache.db')
+        connector = LLMConnector(StubBackend(latency=args.latency), cache, max_concurrency=args.concurrency)
+        for label, batch in (('connector first run', inputs), ('connector rerun', inputs)):
+            before, t0 = dict(connector.stats), time.perf_counter()
+            first = connector.run(RESEARCH_TEMPLATE, batch)
+            report(label, connector, t0, before)
+        assert all(first) and first == connector.run(RESEARCH_TEMPLATE, inputs)
+
+        # 少量标的有新文档：只有这些标的的缓存键变化
+        changed = [dict(item, documents=item['documents'] + '\n- 新公告') if i % 20 == 0 else item
+                   for i, item in enumerate(inputs)]
+        before, t0 = dict(connector.stats), time.perf_counter()
+        connector.run(RESEARCH_TEMPLATE, changed)
+        report('partial update', connector, t0, before)
+        connector.close()
+
+        # 并发调用方请求重叠的新输入：相同键只发送一次
+        fresh = [dict(item, date='2024-07-01') for item in inputs]
+        connector = LLMConnector(StubBackend(latency=args.latency), cache, max_concurrency=args.concurrency)
+        before, t0 = dict(connector.stats), time.perf_counter()
+        threads = [threading.Thread(target=connector.run, args=(RESEARCH_TEMPLATE, fresh[i::2] + fresh[:20]))
+                   for i in range(2)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        report('concurrent callers', connector, t0, before)
+        connector.close()
+
+        # 预算：不足以覆盖全部输入（按估算预留、按实际用量结算）
+        budget_inputs = [dict(item, date='2024-07-02') for item in inputs]
+        connector = LLMConnector(StubBackend(latency=args.latency), False, max_concurrency=args.concurrency,
+                                 budget=12000)
+        results = connector.run(RESEARCH_TEMPLATE, budget_inputs)
+        print(f"budget 12k tokens: answered {sum(r is not None for r in results)}/{len(results)}, "
+              f"rejected {connector.stats['budget_rejected']}, used {connector.budget.used:,} tokens")
+        connector.close()
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
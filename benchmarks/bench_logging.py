@@ -0,0 +1,74 @@
+"""日志开销基准
+
+对比 sync 与 queue 模式、text 与 json 格式下单次日志调用在调用方线程上的耗时，以及写完全部记录的总耗时；
+随后用多个子进程经跨进程队列写日志，检查记录无丢失、每行完整。日志写入临时目录，不输出到控制台。
+
+用法：`python -m benchmarks.bench_logging --calls 50000 --workers 4`
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.utils.logging import configure_logging, get_logger, init_worker, shutdown, worker_queue
+
+
+def _emit(n: int, log) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        log.info('processed %d bars for %s', i, 'sh600000', extra={'symbol': 'sh600000', 'bars': i})
+    return time.perf_counter() - t0
+
+
+def _worker_task(task: int, n: int) -> int:
+    log = get_logger('bench.worker')
+    for i in range(n):
+        log.info('task %d record %d', task, i, extra={'task': task, 'seq': i})
+    return n
+
+
+def _lines(log_dir: Path) -> list:
+    """全部日志行（含滚动出的备份文件）"""
+    return [line for path in sorted(log_dir.glob('app.log*')) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--calls", type=int, default=50000, help="每种配置的日志调用次数")
+    parser.add_argument("--workers", type=int, default=4, help="多进程检查的进程数")
+    parser.add_argument("--per-task", type=int, default=5000, help="每个子进程任务写入的记录数")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'format':<6} {'caller':>10} {'total':>10}")
+    with tempfile.TemporaryDirectory(prefix='turtle_log_') as tmp:
+        for mode in ('sync', 'queue'):
+            for fmt in ('text', 'json'):
+                log_dir = Path(tmp) / f'{mode}_{fmt}'
+                configure_logging(mode, fmt, log_dir=log_dir, console=False)
+                log = get_logger('bench')
+                t0 = time.perf_counter()
+                caller = _emit(args.calls, log)
+                shutdown()
+                total = time.perf_counter() - t0
+                lines = _lines(log_dir)
+                assert len(lines) == args.calls, f"{mode}/{fmt}: {len(lines)} of {args.calls} records written"
+                print(f"{mode:<6} {fmt:<6} {caller / args.calls * 1e6:>8.2f}µs {total / args.calls * 1e6:>8.2f}µs")
+
+        # 多进程：子进程只写队列，由主进程的监听线程落盘
+        log_dir = Path(tmp) / 'workers'
+        configure_logging('queue', 'json', log_dir=log_dir, console=False)
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(worker_queue(),)) as pool:
+            written = sum(pool.map(_worker_task, range(args.workers * 2), [args.per_task] * (args.workers * 2)))
+        shutdown()
+        elapsed = time.perf_counter() - t0
+        records = [json.loads(line) for line in _lines(log_dir)]
+        seen = {(r['task'], r['seq']) for r in records}
+        print(f"workers={args.workers}: {len(records):,}/{written:,} records, {len(seen):,} unique, "
+              f"{len({r['process'] for r in records})} processes, {written / elapsed:,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""数据提供者录制/回放基准
+
+离线用模拟 akshare 的慢速数据源（每次调用固定延迟，返回与 `bond_zh_hs_cov_daily` 同样列与类型的行情）比较：
+- live：每次直接调用数据源
+- record：调用数据源并写入归档
+- replay：只读归档（数据源替换为不可调用的对象，确保不会回源），首次读盘与进程内重复调用
+随后经 `BondData.fetch_bond_data` + `TurtleStrategy` 做一次参数扫描，两次扫描的信号逐字节一致。
+
+用法：`python -m benchmarks.bench_provider --symbols 100 --latency 0.2`
+"""
+
+import argparse
+import hashlib
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app.bond.bond_data import BondData
+from app.bond.reference import SymbolMaster
+from app.data.provider import DataProvider, ReplayMissError, set_provider
+from app.turtle_algo.turtle_strategy import TurtleStrategy
+from benchmarks.synthetic import generate_ohlc
+
+
+class SlowSource:
+    """模拟 akshare：`bond_zh_hs_cov_daily` 返回 date 列为 `datetime.date` 对象的 RangeIndex 行情"""
+    def __init__(self, latency: float, bars: int):
+        self.latency = latency
+        self.bars = bars
+        self.calls = 0
+
+    def bond_zh_hs_cov_daily(self, symbol: str) -> pd.DataFrame:
+        time.sleep(self.latency)
+        self.calls += 1
+        df = generate_ohlc(self.bars, seed=int(symbol[2:]), start_price=100.0).reset_index()
+        df['date'] = df['date'].dt.date
+        df['volume'] = np.round(np.random.default_rng(int(symbol[2:])).lognormal(10, 1, len(df)))
+        return df
+
+
+def _digest(frames) -> str:
+    h = hashlib.sha256()
+    for df in frames:
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _fetch_all(provider, symbols):
+    t0 = time.perf_counter()
+    frames = [provider.bond_zh_hs_cov_daily(symbol=f'sh{s}') for s in symbols]
+    return frames, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay data provider benchmark")
+    parser.add_argument("--symbols", type=int, default=100, help="标的数")
+    parser.add_argument("--bars", type=int, default=1500, help="每个标的的K线数")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟的单次请求延迟（秒）")
+    args = parser.parse_args()
+    symbols = [str(113000 + i) for i in range(args.symbols)]
+
+    with tempfile.TemporaryDirectory(prefix='turtle_provider_') as tmp:
+        archive = Path(tmp) / 'archive'
+        source = SlowSource(args.latency, args.bars)
+        _, live = _fetch_all(DataProvider('live', archive, source), symbols)
+        recorded, record = _fetch_all(DataProvider('record', archive, source), symbols)
+
+        replayer = DataProvider('replay', archive, source=object())
+        replayed, cold = _fetch_all(replayer, symbols)
+        _, warm = _fetch_all(replayer, symbols)
+        assert _digest(recorded) == _digest(replayed)
+        assert all(a.equals(b) for a, b in zip(recorded, replayed))
+        try:
+            replayer.bond_zh_hs_cov_daily(symbol='sh999999')
+            raise AssertionError('expected a replay miss')
+        except ReplayMissError:
+            pass
+
+        entries = replayer.entries()
+        raw = sum(df.memory_usage(deep=True).sum() for df in recorded)
+        print(f"{args.symbols} symbols x {args.bars} bars, {args.latency * 1e3:.0f}ms simulated latency")
+        print(f"live                  {live:>8.2f}s  ({source.calls} source calls in total)")
+        print(f"record                {record:>8.2f}s  archive {entries['bytes'].sum() / 1024:.0f} KiB "
+              f"({raw / 1024:.0f} KiB in memory)")
+        print(f"replay (cold)         {cold:>8.3f}s  {cold / len(symbols) * 1e3:.2f}ms per call")
+        print(f"replay (warm)         {warm:>8.3f}s  identical to recorded frames")
+
+        # 参数扫描：经 BondData 回放行情，两次扫描的信号一致
+        set_provider(replayer)
+        try:
+            bond_data = BondData(Path(tmp) / 'bond', reference=SymbolMaster(Path(tmp) / 'reference.parquet',
+                                                                            calendar=False))
+            start, end = '2000-01-01', '2030-01-01'
+            digests = []
+            for _ in range(2):
+                t0 = time.perf_counter()
+                frames = []
+                for symbol in symbols:
+                    df = bond_data.fetch_bond_data(symbol, start, end, save_csv=False)
+                    for entry, exit_ in ((20, 10), (55, 20)):
+                        strategy = TurtleStrategy(entry_length=entry, exit_length=exit_)
+                        frames.append(strategy.generate_signals(strategy.compute_indicators(df), 10000.0))
+                digests.append(_digest(frames))
+                print(f"sweep {len(frames)} runs        {time.perf_counter() - t0:>8.2f}s  digest {digests[-1]}")
+            assert digests[0] == digests[1]
+        finally:
+            set_provider(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""分析查询层基准
+
+在临时目录中按缓存的实际布局生成多年的 `zt_pool_em`（每日一个文件）与 `margin_sse` 缓存、若干可转债历史 CSV
+与文本库，然后用两种方式回答“近两年融资余额日变化与涨停家数”：
+- pandas：逐个读取缓存文件后拼接过滤（现有做法）
+- DuckDB：`QueryEngine` 视图上的一条 SQL（分别报告首次建快照、快照查询与直接扫描源文件的耗时）
+并核对两者结果一致。
+
+用法：`python -m benchmarks.bench_query --years 5`
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app.cache.cache_manager import CacheManager
+from app.data.query import QueryEngine
+from app.data.schema import optimize
+from app.data.storage import TextStorage
+from benchmarks.synthetic import generate_documents, generate_margin, generate_universe, generate_zt_pool
+
+SQL = """
+SELECT z._date AS date, m.融资余额 - lag(m.融资余额) OVER (ORDER BY z._date) AS margin_change, z.n AS limit_up
+FROM (SELECT _date, count(*) AS n FROM zt_pool_em WHERE _date >= ? GROUP BY 1) z
+JOIN (SELECT CAST(信用交易日期 AS DATE) AS d, 融资余额 FROM margin_sse WHERE _date >= ?) m ON m.d = z._date
+ORDER BY date
+"""
+
+
+def _pandas(cache_dir: Path, since: pd.Timestamp) -> pd.DataFrame:
+    """现有做法：读入全部缓存文件后在 pandas 中过滤与关联"""
+    zt = pd.concat([pd.read_parquet(p).assign(_key=p.stem) for p in sorted((cache_dir / 'zt_pool_em').glob('*.parquet'))])
+    margin = pd.concat([pd.read_parquet(p) for p in sorted((cache_dir / 'margin_sse').glob('*.parquet'))])
+    zt['date'] = pd.to_datetime(zt['_key'], format='%Y%m%d')
+    counts = zt[zt['date'] >= since].groupby('date').size().rename('limit_up')
+    margin['date'] = pd.to_datetime(margin['信用交易日期'])
+    margin = margin[margin['date'] >= since].set_index('date')['融资余额']
+    out = pd.concat([margin, counts], axis=1, join='inner').sort_index()
+    return pd.DataFrame({'date': out.index, 'margin_change': out['融资余额'].diff().to_numpy(), 'limit_up': out['limit_up'].to_numpy()})
+
+
+def _best(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytical query layer benchmark")
+    parser.add_argument("--years", type=int, default=5, help="缓存覆盖的年数")
+    parser.add_argument("--bonds", type=int, default=200, help="可转债数")
+    parser.add_argument("--docs", type=int, default=5000, help="文本库文档数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    days = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=args.years * 250)
+    since = days[-1] - pd.DateOffset(years=2)
+    with tempfile.TemporaryDirectory(prefix='turtle_query_') as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        cache = CacheManager(root / 'cache')
+        for i, day in enumerate(days):
+            key = day.strftime('%Y%m%d')
+            cache.write('zt_pool_em', key, optimize(generate_zt_pool(key, seed=i), 'zt_pool_em'))
+            cache.write('margin_sse', f'{key}_{key}', optimize(generate_margin(key, seed=i), 'margin_sse'))
+        csv_dir = root / 'bond' / 'csv'
+        csv_dir.mkdir(parents=True)
+        for symbol, df in generate_universe(args.bonds, 500).items():
+            df.index = pd.bdate_range(end=days[-1], periods=len(df), name='date')
+            # 两次保存、区间重叠，模拟 `fetch_bond_data` 的历史文件
+            df.iloc[:400].to_csv(csv_dir / f'{symbol}_{df.index[399]:%Y-%m-%d}.csv', encoding='utf-8-sig')
+            df.to_csv(csv_dir / f'{symbol}_{df.index[-1]:%Y-%m-%d}.csv', encoding='utf-8-sig')
+        TextStorage(root / 'text.db', dedup=False).save_documents(generate_documents(args.docs))
+        print(f"generated {len(days) * 2:,} cache files, {args.bonds * 2} bond CSVs, {args.docs:,} documents "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+        params = [since.date(), since.date()]
+        expected = _pandas(root / 'cache', since)
+        print(f"pandas (read all files)   {_best(lambda: _pandas(root / 'cache', since), args.repeat) * 1e3:>9.1f}ms")
+
+        t0 = time.perf_counter()
+        engine = QueryEngine(root / 'cache', root / 'bond', root / 'text.db', root / 'query')
+        print(f"duckdb first open         {(time.perf_counter() - t0) * 1e3:>9.1f}ms  (builds snapshots: {', '.join(engine.views())})")
+        result = engine.query(SQL, params)
+        np.testing.assert_allclose(result['margin_change'].to_numpy(), expected['margin_change'].to_numpy(), rtol=1e-9)
+        assert (result['limit_up'].to_numpy() == expected['limit_up'].to_numpy()).all()
+        print(f"duckdb snapshot query     {_best(lambda: engine.query(SQL, params), args.repeat) * 1e3:>9.1f}ms  ({len(result)} rows, matches pandas)")
+        t0 = time.perf_counter()
+        reopened = QueryEngine(root / 'cache', root / 'bond', root / 'text.db', root / 'query')
+        print(f"duckdb reopen (no rebuild){(time.perf_counter() - t0) * 1e3:>9.1f}ms")
+        reopened.close()
+
+        direct = QueryEngine(root / 'cache', root / 'bond', root / 'text.db', root / 'query', compact=False)
+        print(f"duckdb scan source files  {_best(lambda: direct.query(SQL, params), args.repeat) * 1e3:>9.1f}ms")
+        direct.close()
+
+        symbol = engine.query('SELECT min(symbol) AS s FROM bond_daily')['s'][0]
+        bond_sql = 'SELECT date, close FROM bond_daily WHERE symbol = ? AND date >= ? ORDER BY date'
+        rows = engine.query(bond_sql, [symbol, since.date()])
+        print(f"bond_daily one symbol     {_best(lambda: engine.query(bond_sql, [symbol, since.date()]), args.repeat) * 1e3:>9.1f}ms  ({len(rows)} rows)")
+        doc_sql = 'SELECT source, count(*) AS n FROM documents WHERE content LIKE ? GROUP BY 1'
+        print(f"documents LIKE            {_best(lambda: engine.query(doc_sql, ['%可转债%']), args.repeat) * 1e3:>9.1f}ms")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""风险监控基准
+
+1. 正确性：对 n 条几何随机游走（含停牌缺失）逐 tick 推进 `RiskMonitor`，与 pandas 对完整历史重算的
+   峰值回撤（cummax）与 EWMA 波动率（`ewm(adjust=False)`）核对
+2. 开销：不同序列数下单次 `update` 的耗时，对比每 tick 从历史重算的耗时
+3. 策略接入：以策略自身盯市权益（`strategy_risk_scale`）的缩放系数驱动 `TurtleStrategy.generate_signals(risk_scale=...)`，报告停止交易的K线数与被拦截的进场
+
+用法：`python -m benchmarks.bench_risk --streams 5000 --ticks 1000`
+"""
+
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from app.risk.monitor import RiskMonitor, strategy_risk_scale
+from app.turtle_algo.turtle_strategy import TurtleStrategy
+from app.utils.logging import get_logger
+from benchmarks.synthetic import generate_ohlc
+
+
+def _paths(n: int, ticks: int, seed: int = 0, missing: float = 0.02) -> np.ndarray:
+    """ticks×n 的权益序列（年化波动 10%~60%，随机缺失）"""
+    rng = np.random.default_rng(seed)
+    vol = rng.uniform(0.1, 0.6, n) / np.sqrt(250)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 1, (ticks, n)) * vol, axis=0))
+    values[rng.random((ticks, n)) < missing] = np.nan
+    return values
+
+
+def _reference(values: np.ndarray, halflife: float, periods_per_year: int):
+    """pandas 从完整历史重算最终回撤与波动率（缺失值跳过）"""
+    dd, vol = [], []
+    for j in range(values.shape[1]):
+        s = pd.Series(values[:, j]).dropna()
+        dd.append(1 - s.iloc[-1] / s.cummax().iloc[-1])
+        r2 = s.pct_change().dropna() ** 2
+        vol.append(np.sqrt(r2.ewm(halflife=halflife, adjust=False).mean().iloc[-1] * periods_per_year))
+    return np.array(dd), np.array(vol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk monitor benchmark")
+    parser.add_argument("--streams", type=int, default=5000, help="序列数（持仓/账户）")
+    parser.add_argument("--ticks", type=int, default=1000, help="tick 数")
+    parser.add_argument("--check", type=int, default=200, help="与 pandas 核对的序列数")
+    args = parser.parse_args()
+    # 数千条序列的停止/恢复事件只计数，不逐条输出
+    get_logger('risk').setLevel(logging.ERROR)
+
+    # 1. 正确性
+    values = _paths(args.streams, args.ticks)
+    monitor = RiskMonitor(args.streams)
+    t0 = time.perf_counter()
+    for row in values:
+        monitor.update(row)
+    stream = time.perf_counter() - t0
+    dd, vol = _reference(values[:, :args.check], 20, 250)
+    np.testing.assert_allclose(monitor.drawdown[:args.check], dd, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(monitor.volatility[:args.check], vol, rtol=1e-9)
+    print(f"{args.streams:,} streams x {args.ticks:,} ticks in {stream:.2f}s, matches pandas on {args.check} streams; "
+          f"halted {int(monitor.halted.sum()):,}, mean scale {monitor.scale.mean():.2f}")
+
+    # 2. 单次更新耗时 vs 每 tick 从历史重算
+    print(f"{'streams':>8} {'update':>10} {'recompute':>11}")
+    for n in sorted({n for n in (1, 100, 1000, args.streams) if n <= args.streams}):
+        sample = values[:, :n]
+        m = RiskMonitor(n)
+        t0 = time.perf_counter()
+        for row in sample:
+            m.update(row)
+        per_tick = (time.perf_counter() - t0) / len(sample)
+        frame = pd.DataFrame(sample)
+        t0 = time.perf_counter()
+        filled = frame.ffill()
+        _ = 1 - filled.iloc[-1] / filled.cummax().iloc[-1]
+        _ = (filled.pct_change() ** 2).ewm(halflife=20, adjust=False).mean().iloc[-1]
+        recompute = time.perf_counter() - t0
+        print(f"{n:>8,} {per_tick * 1e6:>8.1f}µs {recompute * 1e3:>9.2f}ms")
+
+    # 3. 策略接入：策略自身盯市权益回撤期间停止进场
+    data = generate_ohlc(2000, seed=3)
+    strategy = TurtleStrategy(mode='Mode 2')
+    df = strategy.compute_indicators(data)
+    base = TurtleStrategy(mode='Mode 2').generate_signals(df.copy(), 10000.0)
+    scales = strategy_risk_scale(strategy, df, 10000.0, RiskMonitor(max_drawdown=0.15, target_vol=0.2))
+    scaled = strategy.generate_signals(df.copy(), 10000.0, risk_scale=scales)
+    entries = lambda s: int(s['signal'].isin(['long', 'short', 'add_long', 'add_short']).sum())
+    print(f"strategy: halted on {int((scales == 0).sum())}/{len(scales)} bars, entries/adds {entries(base)} -> {entries(scaled)}, "
+          f"median unit size {np.nanmedian(base['unit_size']):.1f} -> {np.nanmedian(scaled['unit_size']):.1f}")
+
+
+if __name__ == "__main__":
+    main()
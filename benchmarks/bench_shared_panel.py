@@ -0,0 +1,106 @@
+"""共享内存面板基准
+
+在进程池中对每个标的计算海龟指标与突破次数，比较行情传给工作进程的三种方式：
+- 逐任务 pickle：每个任务携带该标的的 DataFrame
+- 逐进程 pickle：进程池初始化时把全部行情 pickle 给每个工作进程（各进程一份副本）
+- 共享内存：`SharedPanel` 发布一次，初始化时只传句柄，工作进程以只读视图访问
+报告墙钟耗时、传给工作进程的序列化字节数与各工作进程的匿名常驻内存（RssAnon，Linux）之和，
+并核对三种方式的结果一致。工作进程以 spawn 方式启动（不继承父进程内存）。
+
+用法：`python -m benchmarks.bench_shared_panel --symbols 500 --bars 5000 --workers 4`
+"""
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.data.shared_panel import PanelHandle, SharedPanel
+from app.turtle_algo.turtle_strategy import TurtleStrategy
+from benchmarks.synthetic import generate_universe
+
+_DATA = None
+
+
+def _init(data):
+    global _DATA
+    _DATA = SharedPanel.attach(data) if isinstance(data, PanelHandle) else data
+
+
+def _breakouts(df) -> int:
+    ind = TurtleStrategy(indicator_backend='numpy').compute_indicators(df)
+    close, entry = ind['close'].to_numpy(), ind['entry_long'].to_numpy()
+    return int((close[1:] > entry[:-1]).sum())
+
+
+def _rss_anon() -> int:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _task_frame(symbol, df):
+    return symbol, _breakouts(df), os.getpid(), _rss_anon()
+
+
+def _task_shared(symbol):
+    return symbol, _breakouts(_DATA[symbol]), os.getpid(), _rss_anon()
+
+
+def _run(label, workers, submit, initargs, payload_bytes, reference=None):
+    t0 = time.perf_counter()
+    # spawn：工作进程不继承父进程内存，数据只能经序列化或共享内存到达（forkserver 与 Windows/macOS 的默认方式同理）
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init, initargs=initargs) as pool:
+        results = [f.result() for f in submit(pool)]
+    elapsed = time.perf_counter() - t0
+    counts = {symbol: n for symbol, n, _, _ in results}
+    rss = {}
+    for _, _, pid, value in results:
+        rss[pid] = max(rss.get(pid, 0), value)
+    if reference is not None:
+        assert counts == reference
+    print(f"{label:<20} {elapsed:>7.2f}s  sent {payload_bytes / 2**20:>8.1f}MB  "
+          f"worker RssAnon {sum(rss.values()) / 2**20:>7.1f}MB")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory panel benchmark")
+    parser.add_argument("--symbols", type=int, default=500, help="标的数")
+    parser.add_argument("--bars", type=int, default=5000, help="每个标的的K线数")
+    parser.add_argument("--workers", type=int, default=4, help="进程数")
+    args = parser.parse_args()
+
+    data = generate_universe(args.symbols, args.bars)
+    symbols = sorted(data)
+    print(f"{args.symbols} symbols x {args.bars} bars, {args.workers} workers")
+
+    frame_bytes = sum(len(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)) for df in data.values())
+    reference = _run('pickle per task', args.workers,
+                     lambda pool: [pool.submit(_task_frame, s, data[s]) for s in symbols], (None,), frame_bytes)
+
+    whole = len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    _run('pickle per worker', args.workers, lambda pool: [pool.submit(_task_shared, s) for s in symbols], (data,),
+         whole * args.workers, reference)
+
+    t0 = time.perf_counter()
+    with SharedPanel.create(data) as panel:
+        publish = time.perf_counter() - t0
+        handle_bytes = len(pickle.dumps(panel.handle))
+        _run('shared memory', args.workers, lambda pool: [pool.submit(_task_shared, s) for s in symbols],
+             (panel.handle,), handle_bytes * args.workers, reference)
+        print(f"published {panel.handle.nbytes / 2**20:.1f}MB once in {publish * 1e3:.0f}ms; "
+              f"handle {handle_bytes / 1024:.1f}KB")
+        name = panel.handle.name
+    print(f"segment removed after close: {not os.path.exists(f'/dev/shm/{name}')}")
+
+
+if __name__ == "__main__":
+    main()
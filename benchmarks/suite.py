@@ -0,0 +1,228 @@
+"""离线基准测试套件
+
+基于合成数据测量策略层与数据层的吞吐，结果以 JSON 保存为基线，后续运行与基线对比，吞吐下降超过阈值即以非零状态退出。
+全部用例在临时目录中运行，不访问网络。
+
+用例
+- indicators: `TurtleStrategy.compute_indicators`（bars/sec）
+- signals: `TurtleStrategy.generate_signals`（bars/sec）
+- scanner: `BreakoutScanner.scan` 全市场二维扫描（bars/sec）
+- cache_write / cache_read: `CacheManager` 写入/读取（frames/sec）
+- storage_insert / storage_query: `TextStorage` 批量写入（docs/sec）与关键词查询（queries/sec）
+- html_parse: 公告页面解析（pages/sec）
+
+用法
+- `python -m benchmarks.suite --save-baseline`：写入基线
+- `python -m benchmarks.suite --threshold 0.2`：与基线对比
+- `python -m benchmarks.suite --only indicators signals --symbols 20 --bars 2000`
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from benchmarks.synthetic import generate_documents, generate_html, generate_universe
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = ROOT / 'benchmarks' / 'baselines' / 'suite.json'
+
+
+def _best(func: Callable[[], None], repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+class BenchmarkSuite:
+    """基准用例集合
+
+    参数
+    - n_symbols: 合成标的数
+    - n_bars: 每个标的K线数
+    - n_docs: 文本用例的文档数
+    - repeat: 每个用例的重复次数
+    - seed: 随机种子
+    """
+    def __init__(self, n_symbols: int = 20, n_bars: int = 2000, n_docs: int = 2000, repeat: int = 5, seed: int = 0):
+        self.n_symbols = n_symbols
+        self.n_bars = n_bars
+        self.n_docs = n_docs
+        self.repeat = repeat
+        self.seed = seed
+        self.universe = generate_universe(n_symbols, n_bars, seed=seed)
+        self.cases: Dict[str, Callable[[Path], Dict]] = {
+            'indicators': self.bench_indicators,
+            'signals': self.bench_signals,
+            'scanner': self.bench_scanner,
+            'cache_write': self.bench_cache_write,
+            'cache_read': self.bench_cache_read,
+            'storage_insert': self.bench_storage_insert,
+            'storage_query': self.bench_storage_query,
+            'enrich': self.bench_enrich,
+            'html_parse': self.bench_html_parse,
+        }
+
+    def _bars(self) -> int:
+        return sum(len(df) for df in self.universe.values())
+
+    def bench_indicators(self, workdir: Path) -> Dict:
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        strategy = TurtleStrategy()
+        elapsed = _best(lambda: [strategy.compute_indicators(df) for df in self.universe.values()], self.repeat)
+        return {'throughput': self._bars() / elapsed, 'unit': 'bars/sec', 'backend': strategy.indicator_backend.name}
+
+    def bench_signals(self, workdir: Path) -> Dict:
+        from app.turtle_algo.turtle_strategy import TurtleStrategy
+        frames = [TurtleStrategy().compute_indicators(df) for df in self.universe.values()]
+
+        def run():
+            for df in frames:
+                TurtleStrategy().generate_signals(df.copy(), 10000.0)
+        return {'throughput': self._bars() / _best(run, self.repeat), 'unit': 'bars/sec'}
+
+    def bench_scanner(self, workdir: Path) -> Dict:
+        from app.turtle_algo.scanner import BreakoutScanner, pivot_panel
+        panel = pivot_panel(self.universe)
+        scanner = BreakoutScanner()
+        elapsed = _best(lambda: scanner.scan(panel['high'], panel['low'], panel['close']), self.repeat)
+        return {'throughput': self._bars() / elapsed, 'unit': 'bars/sec'}
+
+    def bench_cache_write(self, workdir: Path) -> Dict:
+        from app.cache.cache_manager import CacheManager
+        cache = CacheManager(workdir / 'cache')
+
+        def run():
+            for symbol, df in self.universe.items():
+                cache.write('bench', symbol, df)
+        return {'throughput': len(self.universe) / _best(run, self.repeat), 'unit': 'frames/sec'}
+
+    def bench_cache_read(self, workdir: Path) -> Dict:
+        from app.cache.cache_manager import CacheManager
+        cache = CacheManager(workdir / 'cache')
+        for symbol, df in self.universe.items():
+            cache.write('bench', symbol, df)
+
+        def run():
+            for symbol in self.universe:
+                if cache.read('bench', symbol, 3600) is None:
+                    raise RuntimeError(f"cache miss for {symbol}")
+        return {'throughput': len(self.universe) / _best(run, self.repeat), 'unit': 'frames/sec'}
+
+    def bench_storage_insert(self, workdir: Path) -> Dict:
+        from app.data.storage import TextStorage
+        batches = [generate_documents(self.n_docs, seed=self.seed + i) for i in range(self.repeat)]
+        best = float('inf')
+        for i, docs in enumerate(batches):
+            storage = TextStorage(workdir / f'insert_{i}.db')
+            t0 = time.perf_counter()
+            storage.save_documents(docs)
+            best = min(best, time.perf_counter() - t0)
+        return {'throughput': self.n_docs / best, 'unit': 'docs/sec'}
+
+    def bench_storage_query(self, workdir: Path) -> Dict:
+        from app.data.storage import TextStorage
+        storage = TextStorage(workdir / 'query.db')
+        storage.save_documents(generate_documents(self.n_docs, seed=self.seed))
+        keywords = ['可转债', '监管', '融资', '风险', '不存在的词']
+        elapsed = _best(lambda: [storage.query(k) for k in keywords], self.repeat)
+        return {'throughput': len(keywords) / elapsed, 'unit': 'queries/sec'}
+
+    def bench_enrich(self, workdir: Path) -> Dict:
+        from app.data.storage import TextStorage
+        from app.nlp.enrich import EnrichmentPipeline, segmenter_name
+        storage = TextStorage(workdir / 'enrich.db', dedup=False)
+        storage.save_documents(generate_documents(self.n_docs, seed=self.seed))
+        pipeline = EnrichmentPipeline(storage.db_path, workers=1)
+        elapsed = _best(lambda: pipeline.run(reprocess=True), self.repeat)
+        return {'throughput': self.n_docs / elapsed, 'unit': 'docs/sec', 'segmenter': segmenter_name()}
+
+    def bench_html_parse(self, workdir: Path) -> Dict:
+        from app.ingest.gov_spider import GovSpider
+        spider = GovSpider()
+        pages = [generate_html(seed=self.seed + i) for i in range(100)]
+        elapsed = _best(lambda: [spider.parse(f'https://example.com/{i}', html) for i, html in enumerate(pages)], self.repeat)
+        return {'throughput': len(pages) / elapsed, 'unit': 'pages/sec'}
+
+    def run(self, only: Optional[List[str]] = None) -> Dict:
+        """运行用例并返回结果（含运行参数）"""
+        names = only or list(self.cases)
+        unknown = [n for n in names if n not in self.cases]
+        if unknown:
+            raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}")
+        results = {}
+        with tempfile.TemporaryDirectory(prefix='turtle_bench_') as tmp:
+            for name in names:
+                workdir = Path(tmp) / name
+                workdir.mkdir()
+                results[name] = self.cases[name](workdir)
+        return {
+            'params': {'symbols': self.n_symbols, 'bars': self.n_bars, 'docs': self.n_docs, 'seed': self.seed},
+            'results': results,
+        }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """返回吞吐低于基线 (1 - threshold) 倍的用例描述"""
+    problems = []
+    if baseline.get('params') and baseline['params'] != current['params']:
+        problems.append(f"baseline params {baseline['params']} differ from current {current['params']}")
+        return problems
+    for name, res in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base and res['throughput'] < base['throughput'] * (1 - threshold):
+            drop = 1 - res['throughput'] / base['throughput']
+            problems.append(f"{name}: {res['throughput']:,.0f} {res['unit']} is {drop:.0%} below baseline {base['throughput']:,.0f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--symbols", type=int, default=20, help="合成标的数")
+    parser.add_argument("--bars", type=int, default=2000, help="每个标的K线数")
+    parser.add_argument("--docs", type=int, default=2000, help="文本用例文档数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--only", nargs="*", default=None, help="仅运行指定用例")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE), help="基线 JSON 路径")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的吞吐下降比例")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基线")
+    parser.add_argument("--output", type=str, default=None, help="另存本次结果的 JSON 路径")
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(args.symbols, args.bars, args.docs, args.repeat, args.seed)
+    current = suite.run(args.only)
+    for name, res in current['results'].items():
+        print(f"{name:<16} {res['throughput']:>16,.1f} {res['unit']}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        if baseline_path.exists() and args.only:
+            merged = json.loads(baseline_path.read_text(encoding='utf-8'))
+            if merged.get('params') == current['params']:
+                merged['results'].update(current['results'])
+                current = merged
+        baseline_path.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"基线已写入: {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"未找到基线 {baseline_path}，使用 --save-baseline 创建")
+        return
+    problems = compare(current, json.loads(baseline_path.read_text(encoding='utf-8')), args.threshold)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""合成数据生成
+
+生成可复现的合成数据，供基准测试离线使用：
+- 带行情状态切换（上涨/下跌/震荡，漂移与波动率各不相同）的随机游走 OHLC
+- 多标的行情集合
+- 公告/新闻样式的 HTML 页面与文档记录
+"""
+
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+# 行情状态：(日漂移, 日波动率)
+REGIMES = (
+    (0.0015, 0.008),   # 上涨
+    (-0.0015, 0.012),  # 下跌
+    (0.0, 0.005),      # 震荡
+)
+
+
+def generate_ohlc(n_bars: int = 5000, seed: int = 0, start_price: float = 100.0, freq: str = 'B',
+                  regimes: bool = True, mean_regime_length: int = 60) -> pd.DataFrame:
+    """生成单标的随机游走 OHLC
+
+    参数
+    - n_bars: K线数量
+    - seed: 随机种子
+    - start_price: 起始价格
+    - freq: 索引频率（长序列可用 'min' 避免日期越界）
+    - regimes: 是否启用行情状态切换；关闭时为无漂移、1% 波动的随机游走
+    - mean_regime_length: 状态平均持续K线数（几何分布）
+
+    返回
+    - DataFrame：按时间索引的 `open, high, low, close`
+    """
+    rng = np.random.default_rng(seed)
+    if regimes and n_bars > 0:
+        drift = np.empty(n_bars)
+        vol = np.empty(n_bars)
+        i = 0
+        while i < n_bars:
+            length = int(rng.geometric(1.0 / mean_regime_length))
+            mu, sigma = REGIMES[rng.integers(len(REGIMES))]
+            drift[i:i + length] = mu
+            vol[i:i + length] = sigma
+            i += length
+    else:
+        drift = np.zeros(n_bars)
+        vol = np.full(n_bars, 0.01)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, vol)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.5, n_bars)) * vol * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    index = pd.date_range('2000-01-03', periods=n_bars, freq=freq, name='date')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}, index=index)
+
+
+def generate_universe(n_symbols: int = 50, n_bars: int = 1000, seed: int = 0, freq: str = 'B') -> Dict[str, pd.DataFrame]:
+    """生成多标的行情集合
+
+    参数
+    - n_symbols: 标的数量（代码形如 `110000`、`110001`...）
+    - n_bars: 每个标的的K线数量
+    - seed: 随机种子（各标的种子依次递增）
+    - freq: 索引频率
+
+    返回
+    - Dict[str, DataFrame]：代码 -> OHLC
+    """
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(90.0, 130.0, n_symbols)
+    return {f'{110000 + i}': generate_ohlc(n_bars, seed=seed + i + 1, start_price=float(prices[i]), freq=freq)
+            for i in range(n_symbols)}
+
+
+_WORDS = ('市场', '监管', '可转债', '发行', '公告', '融资', '风险', '收益', '政策', '指数', '资金', '上涨', '下跌', '交易所', '投资者')
+
+
+def generate_html(seed: int = 0, paragraphs: int = 20) -> str:
+    """生成公告样式的 HTML 页面（含标题、日期、脚本与样式噪声）"""
+    rng = np.random.default_rng(seed)
+    body = ''.join(
+        '<p>' + ''.join(_WORDS[j] for j in rng.integers(len(_WORDS), size=40)) + '</p>\n'
+        for _ in range(paragraphs)
+    )
+    date = pd.Timestamp('2024-01-01') + pd.Timedelta(days=int(rng.integers(365)))
+    return (
+        f'<html><head><title>公告{seed}</title><style>p {{ margin: 0 }}</style>'
+        f'<script>var s = {seed};</script></head><body><div class="date">{date:%Y-%m-%d}</div>\n{body}</body></html>'
+    )
+
+
+def generate_documents(n_docs: int = 1000, seed: int = 0) -> List[Dict]:
+    """生成 `TextStorage.save_documents` 所需的文档记录"""
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(n_docs):
+        content = ''.join(_WORDS[j] for j in rng.integers(len(_WORDS), size=200))
+        docs.append({'source': 'news', 'url': f'https://example.com/{seed}/{i}', 'title': f'新闻{i}',
+                     'published_at': '2024-01-01', 'content': content})
+    return docs
+
+
+_INDUSTRIES = ('银行', '证券', '保险', '医药', '电子', '计算机', '汽车', '化工', '有色金属', '食品饮料', '电力', '房地产')
+
+
+def generate_spot_snapshot(n_rows: int = 5000, seed: int = 0) -> pd.DataFrame:
+    """生成 `stock_zh_a_spot_em` 样式的全市场快照（列名与 akshare 一致，类型为默认的 float64/object）"""
+    rng = np.random.default_rng(seed)
+    prev = np.round(rng.lognormal(2.5, 0.8, n_rows), 2)
+    pct = np.round(np.clip(rng.normal(0.0, 2.5, n_rows), -10, 10), 2)
+    last = np.round(prev * (1 + pct / 100), 2)
+    high = np.round(np.maximum(last, prev) * (1 + np.abs(rng.normal(0, 0.01, n_rows))), 2)
+    low = np.round(np.minimum(last, prev) * (1 - np.abs(rng.normal(0, 0.01, n_rows))), 2)
+    volume = np.round(rng.lognormal(11, 1.5, n_rows)).astype(float)
+    shares = rng.lognormal(20, 1.0, n_rows)
+    codes = np.sort(rng.choice(np.arange(1, 700000), n_rows, replace=False))
+    return pd.DataFrame({
+        '序号': np.arange(1, n_rows + 1),
+        '代码': [f'{c:06d}' for c in codes],
+        '名称': [f'股票{c}' for c in codes],
+        '最新价': last,
+        '涨跌幅': pct,
+        '涨跌额': np.round(last - prev, 2),
+        '成交量': volume,
+        '成交额': np.round(volume * last * 100, 2),
+        '振幅': np.round((high - low) / prev * 100, 2),
+        '最高': high,
+        '最低': low,
+        '今开': np.round(prev * (1 + rng.normal(0, 0.005, n_rows)), 2),
+        '昨收': prev,
+        '量比': np.round(rng.lognormal(0, 0.4, n_rows), 2),
+        '换手率': np.round(rng.lognormal(0.5, 0.8, n_rows), 2),
+        '市盈率-动态': np.round(rng.normal(30, 20, n_rows), 2),
+        '市净率': np.round(rng.lognormal(1, 0.5, n_rows), 2),
+        '总市值': np.round(shares * last, 0),
+        '流通市值': np.round(shares * last * 0.8, 0),
+        '涨速': np.round(rng.normal(0, 0.3, n_rows), 2),
+        '5分钟涨跌': np.round(rng.normal(0, 0.5, n_rows), 2),
+        '60日涨跌幅': np.round(rng.normal(0, 15, n_rows), 2),
+        '年初至今涨跌幅': np.round(rng.normal(0, 25, n_rows), 2),
+        '所属行业': [_INDUSTRIES[j] for j in rng.integers(len(_INDUSTRIES), size=n_rows)],
+        '日期': ['2024-06-28'] * n_rows,
+    })
+
+
+def generate_zt_pool(date: str, seed: int = 0) -> pd.DataFrame:
+    """生成 `stock_zt_pool_em` 样式的单日涨停池（家数随机）"""
+    rng = np.random.default_rng(seed)
+    n_rows = int(rng.integers(20, 150))
+    codes = np.sort(rng.choice(np.arange(1, 700000), n_rows, replace=False))
+    last = np.round(rng.lognormal(2.5, 0.8, n_rows), 2)
+    return pd.DataFrame({
+        '序号': np.arange(1, n_rows + 1),
+        '代码': [f'{c:06d}' for c in codes],
+        '名称': [f'股票{c}' for c in codes],
+        '涨跌幅': np.round(rng.uniform(9.9, 10.1, n_rows), 2),
+        '最新价': last,
+        '成交额': np.round(rng.lognormal(19, 1, n_rows), 0),
+        '流通市值': np.round(rng.lognormal(22, 1, n_rows), 0),
+        '换手率': np.round(rng.lognormal(1.5, 0.6, n_rows), 2),
+        '封板资金': np.round(rng.lognormal(18, 1, n_rows), 0),
+        '炸板次数': rng.integers(0, 4, n_rows).astype(float),
+        '涨停统计': [f'{k}/{k}' for k in rng.integers(1, 5, n_rows)],
+        '连板数': rng.integers(1, 6, n_rows).astype(float),
+        '所属行业': [_INDUSTRIES[j] for j in rng.integers(len(_INDUSTRIES), size=n_rows)],
+    })
+
+
+def generate_margin(date: str, seed: int = 0) -> pd.DataFrame:
+    """生成 `stock_margin_sse` 样式的单日融资融券汇总（余额随 seed 缓慢变化）"""
+    rng = np.random.default_rng(seed)
+    balance = 1.5e12 * (1 + 0.0005 * seed) + rng.normal(0, 5e9)
+    return pd.DataFrame({
+        '信用交易日期': [date],
+        '融资余额': [balance],
+        '融资买入额': [rng.normal(6e10, 5e9)],
+        '融券余量': [rng.normal(2e10, 1e9)],
+        '融券余量金额': [rng.normal(9e10, 5e9)],
+        '融券卖出量': [rng.normal(5e8, 5e7)],
+        '融资融券余额': [balance + 9e10],
+    })
+
+
+_OUTLETS = ('新华社', '证券时报', '中国证券报', '上海证券报', '财新', '第一财经')
+
+
+def _random_text(rng, n_chars: int) -> str:
+    """从常用汉字区间随机取字组成的正文（词汇丰富度接近真实新闻）"""
+    return ''.join(map(chr, 0x4E00 + rng.integers(3000, size=n_chars)))
+
+
+def generate_syndicated(n_stories: int = 200, copies: int = 5, seed: int = 0, edits: int = 3,
+                        length: int = 800) -> List[Dict]:
+    """生成转载场景的文档：每篇原稿被多个媒体转载，转载稿更换来源署名并有少量单字改动
+
+    参数
+    - n_stories: 原稿数
+    - copies: 每篇原稿的份数（含原稿）
+    - seed: 随机种子
+    - edits: 每份转载稿的单字改动数
+    - length: 正文字数
+
+    返回
+    - List[Dict]：`TextStorage.save_documents` 所需的文档记录，额外带 `story`（原稿编号）便于评估；按随机顺序排列
+    """
+    rng = np.random.default_rng(seed)
+    docs = []
+    for story in range(n_stories):
+        body = _random_text(rng, length)
+        for c in range(copies):
+            text = list(body)
+            for pos in rng.integers(len(text), size=edits if c else 0):
+                text[pos] = chr(0x4E00 + int(rng.integers(3000)))
+            outlet = _OUTLETS[c % len(_OUTLETS)]
+            docs.append({'source': 'news', 'url': f'https://example.com/{outlet}/{seed}/{story}/{c}', 'title': f'新闻{story}',
+                         'published_at': '2024-01-01', 'content': f'来源：{outlet}\n' + ''.join(text) + f'\n（责任编辑：{outlet}）',
+                         'story': story})
+    order = rng.permutation(len(docs))
+    return [docs[i] for i in order]
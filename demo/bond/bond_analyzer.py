@@ -1,4 +1,3 @@
-import akshare as ak
 import pandas as pd
 import numpy as np
 import mplfinance as mpf
@@ -7,6 +6,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from pathlib import Path
 import os
+from app.bond.reference import get_master
+from app.data.provider import ak
 
 class BondAnalyzer:
     def __init__(self, symbol: str, data_dir: Optional[str] = None, name: Optional[str] = None, save_csv: bool = True):
@@ -67,21 +68,14 @@ class BondAnalyzer:
         if end_date is None:
             end_date = datetime.now().strftime('%Y-%m-%d')
             
+        # 区间内未上市或已退市的代码不发起请求
+        if get_master().is_listed(self.symbol, start_date, end_date) is False:
+            print(f"{self.symbol} 在 {start_date} 至 {end_date} 期间未上市或已退市")
+            return None
+            
         try:
-            # 添加交易所前缀
-            if self.symbol.startswith('11'):
-                symbol = f"sh{self.symbol}"  # 上交所可转债
-            elif self.symbol.startswith('12'):
-                symbol = f"sz{self.symbol}"  # 深交所可转债
-            else:
-                # 尝试根据代码前缀判断交易所
-                if len(self.symbol) == 6:
-                    if self.symbol.startswith('1'):
-                        symbol = f"sh{self.symbol}"
-                    else:
-                        symbol = f"sz{self.symbol}"
-                else:
-                    raise ValueError(f"不支持的可转债代码格式: {self.symbol}")
+            # 添加交易所前缀（按代码主表，主表中没有时按代码段推断）
+            symbol = get_master().prefixed(self.symbol)
             
             try:
                 df = ak.bond_zh_hs_cov_daily(symbol=symbol)
@@ -170,6 +164,15 @@ class BondAnalyzer:
             traceback.print_exc()
             return None
             
+    def set_data(self, df: pd.DataFrame):
+        """
+        直接设置行情数据（不经 fetch_data 拉取）
+        
+        参数:
+        df: DataFrame, 按日期索引的行情，可以是多进程中共享内存面板（app.data.shared_panel）的只读视图，计算时会先复制
+        """
+        self.data = df
+        
     def calculate_main_force_indicator(self) -> pd.DataFrame:
         """
         计算主力资金进出场指标
@@ -1,8 +1,8 @@
-import akshare as ak
 import pandas as pd
 from pathlib import Path
 import os
 import time
+from app.bond.reference import get_master
 
 class BondUtils:
     """可转债工具类，用于获取和处理可转债列表数据"""
@@ -19,25 +19,27 @@ class BondUtils:
         DataFrame: 包含可转债代码和名称的DataFrame
         """
         try:
-            # 获取全部可转债列表数据
-            bond_df = ak.bond_zh_cov()
+            # 从代码主表获取（主表过期时增量刷新一次，否则不发起请求）
+            master = get_master()
+            master.ensure_fresh()
+            bond_df = master.to_frame(listed_only=False)
             
             # 仅保留需要的列：代码、名称、上市时间、发行规模和信用评级
-            bond_df = bond_df[['债券代码', '债券简称', '上市时间', '发行规模', '信用评级']]
+            bond_df = bond_df[['symbol', 'name', 'listing_date', 'issue_size', 'credit_rating', 'delisting_date']]
             
             # 重命名列
             bond_df = bond_df.rename(columns={
-                '债券代码': 'bond_id',
-                '债券简称': 'bond_name',
-                '上市时间': 'listing_date',
-                '发行规模': 'issue_size',
-                '信用评级': 'credit_rating'
+                'symbol': 'bond_id',
+                'name': 'bond_name',
             })
             
-            # 去除未上市的可转债（上市时间为NaN或为空字符串的记录）
+            # 去除未上市与已退市的可转债
             print(f"过滤前的可转债数量: {len(bond_df)}")
-            bond_df = bond_df[bond_df['listing_date'].notna() & (bond_df['listing_date'] != '')]
+            bond_df = bond_df[bond_df['listing_date'].notna() & bond_df['delisting_date'].isna()]
+            bond_df = bond_df.drop(columns=['delisting_date'])
             print(f"过滤后的可转债数量: {len(bond_df)}")
+            if bond_df.empty:
+                return None
             
             # 保存到文件
             if save_path:
@@ -82,13 +84,14 @@ class BondUtils:
         """
         确保可转债列表文件存在，如果不存在则创建
         
+        代码主表可用时直接返回主表中的列表（不重复读取文件），主表不可用时退回读取文件。
+        
         参数:
         file_path: str, 文件路径
         
         返回:
         DataFrame: 包含可转债代码和名称的DataFrame
         """
-        if os.path.exists(file_path):
-            return BondUtils.read_bonds_from_file(file_path)
-        else:
-            return BondUtils.get_all_bonds(file_path) 
\ No newline at end of file
+        if get_master().ensure_fresh():
+            return BondUtils.get_all_bonds(None if os.path.exists(file_path) else file_path)
+        return BondUtils.read_bonds_from_file(file_path)
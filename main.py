@@ -1,12 +1,12 @@
 """命令行入口
 
 提供基础运行模式：回测/实时，当前支持债券资产的数据获取与海龟策略信号演示。
+
+akshare/pandas 等重依赖在参数解析之后按需导入，`--help` 与参数错误不承担其导入开销。
 """
 
 import argparse
-import pandas as pd
-from app.bond.bond_data import BondData
-from app.turtle_algo.turtle_strategy import TurtleStrategy
+from app.utils.metrics import metrics, profile_run
 
 def main():
     """命令行主函数
@@ -16,17 +16,35 @@ def main():
     - symbol: 资产代码
     - mode: 运行模式（backtest/live）
     - equity: 初始权益
+    - metrics: 指标导出路径（`.json` 为 JSON，否则为 Prometheus 文本）
+    - profile: 性能剖析输出路径（`.prof` 为 cProfile，`.html` 优先使用 pyinstrument）
+    - no_cache: 不使用回测结果缓存
     """
     parser = argparse.ArgumentParser(description="Turtle Trading System")
     parser.add_argument("--asset", type=str, default="bond", choices=["bond", "stock", "etf"], help="资产类型")
     parser.add_argument("--symbol", type=str, required=True, help="资产代码")
     parser.add_argument("--mode", type=str, default="backtest", choices=["backtest", "live"], help="运行模式")
     parser.add_argument("--equity", type=float, default=10000.0, help="初始权益")
+    parser.add_argument("--metrics", type=str, default=None, help="指标导出路径（.json/.prom）")
+    parser.add_argument("--profile", type=str, default=None, help="性能剖析输出路径（.prof/.html）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用回测结果缓存")
 
     args = parser.parse_args()
 
+    if args.metrics:
+        metrics.enable()
+    try:
+        with profile_run(args.profile):
+            run(args)
+    finally:
+        if args.metrics:
+            metrics.export(args.metrics)
+
+def run(args):
+    """按解析后的参数执行一次数据获取、指标计算与信号输出"""
     # 数据获取
     if args.asset == "bond":
+        from app.bond.bond_data import BondData
         data_handler = BondData()
         data = data_handler.fetch_bond_data(args.symbol)
     else:
@@ -39,13 +57,16 @@ def main():
         return
 
     # 策略初始化
+    from app.turtle_algo.turtle_strategy import TurtleStrategy
     strategy = TurtleStrategy()
 
-    # 计算指标
-    df = strategy.compute_indicators(data)
-
-    # 生成信号（对于回测，使用固定权益；实时可动态更新）
-    signals = strategy.generate_signals(df, args.equity)
+    # 计算指标并生成信号（对于回测，使用固定权益；实时可动态更新）
+    if args.no_cache:
+        df = strategy.compute_indicators(data)
+        signals = strategy.generate_signals(df, args.equity)
+    else:
+        from app.backtest.result_cache import run_cached
+        signals = run_cached(strategy, data, args.equity)
 
     if args.mode == "backtest":
         # 简单回测逻辑：打印信号